@@ -2,22 +2,37 @@
 # -*- coding: utf-8 -*-
 
 import csv
+import math
 import os
 import re
 import sys
 
+# danger_regions.py / kernel_domains.py / register_sampling.py live in gpufi-instinject; they own the
+# danger.idx, kernel_domains.txt and register_width.txt formats
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "gpufi-instinject"))
+import danger_regions  # noqa: E402
+import kernel_domains  # noqa: E402
+import register_sampling  # noqa: E402
 
-def parse_csv(csv_path):
+# two-sided 95% normal quantile for the confidence interval of p
+Z_95 = 1.959964
+
+
+def parse_csv(csv_path, by_kernel=False):
     """
     Parse the CSV file and accumulate for each register r:
       - N_r: number of injections (from the reg_names column, like "%r2:5")
       - SDC_r: number of SDCs (from the SDC column)
+    Injections pruned by equivalence class carry their representative's outcome
+    in the CSV, so each simulated class is weighted by its sampled size.
 
     Returns:
       reg_stats: dict, key is register name (e.g. "%r2"),
                  value is {"N": N_r, "SDC": SDC_r}
+      With by_kernel=True: {kernel: reg_stats} from the kernel column.
     """
     reg_stats = {}
+    per_kernel = {}
 
     with open(csv_path, "r", encoding="utf-8", newline="") as f:
         reader = csv.DictReader(f)
@@ -51,13 +66,14 @@ def parse_csv(csv_path):
             except ValueError:
                 SDC_r_row = 0
 
-            if reg_name not in reg_stats:
-                reg_stats[reg_name] = {"N": 0, "SDC": 0}
+            stats = per_kernel.setdefault(row.get("kernel", ""), {}) if by_kernel else reg_stats
+            if reg_name not in stats:
+                stats[reg_name] = {"N": 0, "SDC": 0}
 
-            reg_stats[reg_name]["N"] += N_r_row
-            reg_stats[reg_name]["SDC"] += SDC_r_row
+            stats[reg_name]["N"] += N_r_row
+            stats[reg_name]["SDC"] += SDC_r_row
 
-    return reg_stats
+    return per_kernel if by_kernel else reg_stats
 
 
 def parse_danger_log(danger_path):
@@ -74,7 +90,17 @@ def parse_danger_log(danger_path):
       danger_stats: dict, key is register name (e.g. "%rs55"),
                     value is d_r
     """
-    danger_stats = {}
+    return {reg_name: interval_length(ranges) for reg_name, ranges in parse_danger_intervals(danger_path).items()}
+
+
+def parse_danger_intervals(danger_path):
+    """
+    Parse danger.log into the closed cycle intervals of each register.
+
+    Returns:
+      dict, key is register name, value is a list of (start, end)
+    """
+    danger_intervals = {}
 
     # The regex allows digits, commas, and hyphens in cycles
     pattern = re.compile(r"reg=(%\S+)\s+cycles=([0-9,\-]+)")
@@ -92,7 +118,7 @@ def parse_danger_log(danger_path):
             reg_name = m.group(1)
             cycles_part = m.group(2)
 
-            total_len = 0
+            ranges = danger_intervals.setdefault(reg_name, [])
             # There may be multiple ranges separated by commas
             for seg in cycles_part.split(","):
                 seg = seg.strip()
@@ -107,15 +133,136 @@ def parse_danger_log(danger_path):
                     # Single cycle, treat as length 1
                     start = end = int(seg)
 
-                # Closed interval length
-                total_len += (end - start + 1)
+                ranges.append((start, end))
+
+    return danger_intervals
 
-            danger_stats[reg_name] = total_len
 
-    return danger_stats
+def interval_length(ranges):
+    """Total length of closed intervals, e.g. 959-2905 -> 2905 - 959 + 1 = 1947."""
+    return sum(end - start + 1 for start, end in ranges)
 
 
-def compute_p(csv_filename, T, R_user):
+def fresh_danger_index(danger_path):
+    """danger.idx next to danger.log, or None if it is missing or danger.log was edited after it was written."""
+    index_path = os.path.splitext(danger_path)[0] + ".idx"
+    if os.path.exists(index_path) and (
+        not os.path.exists(danger_path)
+        or os.path.getmtime(index_path) >= os.path.getmtime(danger_path)
+    ):
+        return index_path
+    return None
+
+
+def load_danger_stats(danger_path):
+    """d_r per register from danger.idx when it is up to date, else from danger.log; also returns the path read."""
+    index_path = fresh_danger_index(danger_path)
+    if index_path:
+        regions = danger_regions.read_index(index_path)
+        return {reg_name: interval_length(ranges) for reg_name, ranges in regions.items()}, index_path
+    return parse_danger_log(danger_path), danger_path
+
+
+def load_danger_intervals(danger_path):
+    """Danger intervals per register, from danger.idx when it is up to date, else from danger.log."""
+    index_path = fresh_danger_index(danger_path)
+    if index_path:
+        return danger_regions.read_index(index_path)
+    return parse_danger_intervals(danger_path)
+
+
+def load_kernel_domains(domains_path):
+    """
+    Read kernel_domains.txt (written by gpufi-instinject/kernel_domains.py).
+
+    Returns:
+      dict, key is kernel name, value is the sorted, merged list of the
+      (start, end) cycle intervals of its launches
+    """
+    return kernel_domains.kernel_intervals(kernel_domains.read_domains(domains_path))
+
+
+def drop_narrow_registers(danger, widths_path, bits):
+    """
+    danger (d_r or intervals per register) without the registers narrower than bits:
+    campaign_exec.sh never injects them, so they are not strata with N_r = 0.
+    """
+    if bits <= 1:
+        return danger
+    keep = register_sampling.flippable(danger, register_sampling.read_widths(widths_path), bits)
+    return {reg_name: danger[reg_name] for reg_name in keep}
+
+
+def overlap_length(ranges, domain):
+    """Number of cycles of ranges that fall inside the sorted, disjoint intervals of domain."""
+    total = 0
+    for start, end in ranges:
+        for d_start, d_end in domain:
+            if d_start > end:
+                break
+            lo = max(start, d_start)
+            hi = min(end, d_end)
+            if lo <= hi:
+                total += hi - lo + 1
+    return total
+
+
+def stratified_estimate(reg_stats, danger_stats, T, R, smoothing=0.0):
+    """
+    Per-register (stratified) estimate of p and its variance.
+
+    Each register r is a stratum with weight d_r / (T * R) and within-stratum
+    SDC rate SDC_r / N_r, so the estimate stays unbiased for any allocation of
+    injections across registers (uniform, danger-length proportional or
+    Neyman, see gpufi-instinject/register_sampling.py) as long as N_r > 0:
+      p   = (1 / R) * Σ_r ( d_r / T ) * p_r
+      Var = (1 / R^2) * Σ_r ( d_r / T )^2 * p_r * (1 - p_r) / N_r
+
+    smoothing > 0 uses (SDC_r + s) / (N_r + 2s) inside the variance only, so
+    registers with 0 or N_r SDCs so far do not report zero variance (used by the
+    sequential stopping rules in gpufi-instinject/stop_rules.py).
+
+    Returns:
+      dict with p, var, used_regs, sum_terms, terms (reg, d_r, N_r, SDC_r, term)
+      and missing (registers with d_r > 0 but no usable injections)
+    """
+    T = float(T)
+    R = float(R)
+    sum_terms = 0.0
+    sum_var = 0.0
+    terms = []
+    missing = []
+
+    for reg_name in sorted(danger_stats.keys()):
+        d_r = danger_stats[reg_name]
+        stats = reg_stats.get(reg_name)
+        if stats is None or stats["N"] <= 0:
+            missing.append(reg_name)
+            continue
+
+        N_r = stats["N"]
+        SDC_r = stats["SDC"]
+        p_r = SDC_r / N_r
+        w_r = d_r / T
+        term = w_r * p_r
+        sum_terms += term
+        p_v = (SDC_r + smoothing) / (N_r + 2.0 * smoothing)
+        sum_var += w_r * w_r * p_v * (1.0 - p_v) / N_r
+        terms.append((reg_name, d_r, N_r, SDC_r, term))
+
+    p = sum_terms / R if R != 0 else 0.0
+    var = sum_var / (R * R) if R != 0 else 0.0
+    return {
+        "p": p,
+        "var": var,
+        "used_regs": len(terms),
+        "sum_terms": sum_terms,
+        "terms": terms,
+        "missing": missing,
+    }
+
+
+def compute_p(csv_filename, T, R_user, bits=1):
     """
     Compute:
       p = (1 / R) * Σ_r ( d_r * SDC_r / (T * N_r) )
@@ -125,6 +272,10 @@ def compute_p(csv_filename, T, R_user):
       - d_r: from danger.log
       - N_r, SDC_r: from the CSV
       - T is the total number of cycles
+      - registers narrower than bits (bits flipped per injection, register_width.txt)
+        are left out of the sum
+
+    Also prints the standard error and a 95% confidence interval of p.
 
     Returns:
       p, R_user, used_regs, sum_terms
@@ -134,42 +285,39 @@ def compute_p(csv_filename, T, R_user):
     danger_path = os.path.join(base_dir, "danger.log")
 
     reg_stats = parse_csv(csv_path)
-    danger_stats = parse_danger_log(danger_path)
+    danger_stats, danger_path = load_danger_stats(danger_path)
+    widths_path = os.path.join(base_dir, "register_width.txt")
+    danger_stats = drop_narrow_registers(danger_stats, widths_path, bits)
 
     T = float(T)
     R = float(R_user)
 
     print("========== Computation starts ==========")
     print(f"Reading CSV file: {csv_path}")
-    print(f"Reading danger.log file: {danger_path}")
+    print(f"Reading danger regions from: {danger_path}")
     print(f"Total cycles T = {T}")
     print(f"User specified R = {R}")
+    if bits > 1:
+        print(f"Bits flipped per injection = {bits} (narrower registers in {widths_path} are skipped)")
     print()
     print("=== Per-register calculation (only registers that appear in both CSV and danger.log and have N_r > 0 are summed) ===")
 
-    sum_terms = 0.0
-    used_regs = 0
+    est = stratified_estimate(reg_stats, danger_stats, T, R)
+    used_regs = est["used_regs"]
+    sum_terms = est["sum_terms"]
 
     # For more aligned output, sort by register name
+    terms = {t[0]: t for t in est["terms"]}
     for reg_name in sorted(danger_stats.keys()):
-        d_r = danger_stats[reg_name]
-        stats = reg_stats.get(reg_name)
-
-        if stats is None:
-            print(f"{reg_name}: No injection record found in CSV, skip (contribution considered 0)")
-            continue
-
-        N_r = stats["N"]
-        SDC_r = stats["SDC"]
-
-        if N_r <= 0:
-            print(f"{reg_name}: N_r = {N_r} (<=0), cannot compute this register term, skip (contribution considered 0)")
+        if reg_name not in terms:
+            stats = reg_stats.get(reg_name)
+            if stats is None:
+                print(f"{reg_name}: No injection record found in CSV, skip (contribution considered 0)")
+            else:
+                print(f"{reg_name}: N_r = {stats['N']} (<=0), cannot compute this register term, skip (contribution considered 0)")
             continue
 
-        term = (d_r * SDC_r) / (T * N_r)
-        sum_terms += term
-        used_regs += 1
-
+        _, d_r, N_r, SDC_r, term = terms[reg_name]
         print(
             f"{reg_name}: d_r = {d_r:6d}, N_r = {N_r:4d}, SDC_r = {SDC_r:4d}, "
             f"term = d_r * SDC_r / (T * N_r) = {term:.6e}"
@@ -183,14 +331,70 @@ def compute_p(csv_filename, T, R_user):
         print("Warning: R = 0, cannot compute p, return p = 0")
         return 0.0, R, used_regs, sum_terms
 
-    p = sum_terms / R
+    p = est["p"]
+    se = math.sqrt(est["var"])
     print(f"R (user specified) = {R}")
     print(f"Final result p = Σ / R = {p:.6e}")
+    print(f"Standard error = {se:.6e}, 95% CI = [{max(p - Z_95 * se, 0.0):.6e}, {p + Z_95 * se:.6e}]")
+    if est["missing"]:
+        print(
+            f"Warning: {len(est['missing'])} registers with a danger region have no injections; "
+            "p is biased low by their missing contribution"
+        )
+    domains_path = os.path.join(base_dir, "kernel_domains.txt")
+    if os.path.exists(domains_path):
+        report_per_kernel(csv_path, danger_path, domains_path, R, widths_path, bits)
     print("========== Computation ends ==========")
 
     return p, R, used_regs, sum_terms
 
 
+def report_per_kernel(csv_path, danger_path, domains_path, R, widths_path="", bits=1):
+    """
+    Per-kernel strata: for kernel k with cycle domain of length T_k,
+      d_r,k = danger cycles of r inside the kernel's launches
+      p_k   = (1 / R) * Σ_r ( d_r,k * SDC_r,k / (T_k * N_r,k) )
+    with N_r,k, SDC_r,k from the CSV rows of kernel k. The aggregate weights each
+    kernel by its share of the in-kernel cycles: p = Σ_k (T_k / Σ T_k) * p_k.
+
+    Returns:
+      {kernel: (T_k, p_k, var_k)}
+    """
+    domains = load_kernel_domains(domains_path)
+    intervals = drop_narrow_registers(load_danger_intervals(danger_path), widths_path, bits)
+    per_kernel_stats = parse_csv(csv_path, by_kernel=True)
+    T_total = float(sum(interval_length(ranges) for ranges in domains.values()))
+
+    print()
+    print(f"=== Per-kernel calculation (kernel domains from {domains_path}) ===")
+    results = {}
+    p_agg = var_agg = 0.0
+    for kernel in sorted(domains.keys()):
+        T_k = interval_length(domains[kernel])
+        danger_k = {reg_name: overlap_length(ranges, domains[kernel]) for reg_name, ranges in intervals.items()}
+        danger_k = {reg_name: d for reg_name, d in danger_k.items() if d > 0}
+        est = stratified_estimate(per_kernel_stats.get(kernel, {}), danger_k, T_k, R)
+        se = math.sqrt(est["var"])
+        results[kernel] = (T_k, est["p"], est["var"])
+        print(
+            f"{kernel}: T_k = {T_k}, registers with danger cycles = {len(danger_k)}, "
+            f"used_regs = {est['used_regs']}, p_k = {est['p']:.6e}, "
+            f"95% CI = [{max(est['p'] - Z_95 * se, 0.0):.6e}, {est['p'] + Z_95 * se:.6e}]"
+        )
+        if T_total > 0:
+            w = T_k / T_total
+            p_agg += w * est["p"]
+            var_agg += w * w * est["var"]
+
+    se = math.sqrt(var_agg)
+    print(f"In-kernel cycles Σ T_k = {T_total:.0f}")
+    print(
+        f"Aggregate p = Σ_k (T_k / Σ T_k) * p_k = {p_agg:.6e}, "
+        f"95% CI = [{max(p_agg - Z_95 * se, 0.0):.6e}, {p_agg + Z_95 * se:.6e}]"
+    )
+    return results
+
+
 if __name__ == "__main__":
     """
     Usage example:
@@ -200,13 +404,15 @@ if __name__ == "__main__":
       - 1st argument: CSV filename (in the same directory as this script)
       - 2nd argument: total number of cycles T
       - 3rd argument: R (specified by yourself, e.g. 71)
+      - optional 4th argument: bits flipped per injection (INJECT_BIT_FLIP_COUNT, default 1)
     """
-    if len(sys.argv) != 4:
-        print(f"Usage: {os.path.basename(sys.argv[0])} <csv_filename> <T> <R>")
+    if len(sys.argv) not in (4, 5):
+        print(f"Usage: {os.path.basename(sys.argv[0])} <csv_filename> <T> <R> [bit_flip_count]")
         sys.exit(1)
 
     csv_filename = sys.argv[1]
     T = sys.argv[2]
     R_user = sys.argv[3]
+    bits = int(sys.argv[4]) if len(sys.argv) == 5 else 1
 
-    compute_p(csv_filename, T, R_user)
+    compute_p(csv_filename, T, R_user, bits)
@@ -0,0 +1,259 @@
+#!/usr/bin/env python
+
+# Headless rendering of time lapse plots, for machines without a display.
+#
+#   batchrender.py [options] LOGFILE STAT[:TYPE] ...
+#
+# TYPE is line, intensity (parallel intensity) or stackedbar; without it a
+# stat gets the plot the GUI offers first for it.  The log is indexed and only
+# the requested stats are read (see lazyload.py), then every plot is drawn by
+# a worker process with matplotlib's Agg backend and written to the output
+# directory as <log>.<stat>.<type>.png / .svg, together with
+# <log>.<stat>.<type>.npz holding the arrays that were drawn: lines and images
+# are downsampled to the width of the figure in pixels through lod.py, lines
+# as a min/max envelope per bin, images as the mean of each bin.
+#
+# As in the GUI, the x axis (globalCycle unless -x says otherwise) and the
+# stats that restart at every kernel are made continuous across kernels.
+# "--list" prints the stats found in the log.
+#
+# This module is kept valid for both Python 2 and Python 3.
+
+import argparse
+import multiprocessing
+import os
+import os.path
+import sys
+
+import matplotlib
+matplotlib.use('Agg')
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+import numpy
+
+import lazyload
+import lexyacc
+import lod
+import organizedata
+
+PLOT_TYPES = ['line', 'intensity', 'stackedbar']
+
+# the plot types the GUI offers for each stat type, the first one is the default
+TYPE_PLOTS = {1: ['line', 'intensity'], 2: ['intensity', 'line'], 3: ['stackedbar'], 4: ['intensity']}
+
+
+def kernelStarts(x):
+    """Sample numbers where the x axis starts over, i.e. where a kernel starts."""
+    x = numpy.asarray(x)
+    return numpy.flatnonzero(x[1:] <= x[:-1]) + 1
+
+
+def acrossKernels(var, starts):
+    """var with every kernel continuing from the last value of the previous one (graphManager.updateVarKernal)."""
+    var = numpy.asarray(var)
+    if len(starts) == 0:
+        return var
+    offset = numpy.zeros(len(var), var.dtype)
+    offset[starts] = var[starts - 1]
+    return var + numpy.cumsum(offset)
+
+
+def plotData(fileVars, stat, xStat):
+    """(x, rows, row labels) of a stat, rows being a units x samples matrix."""
+    var = fileVars[stat]
+    x = numpy.asarray(fileVars[xStat].data)
+    starts = kernelStarts(x)
+    if var.type == 1:
+        y = numpy.asarray(var.data)
+        if var.bool:
+            y = acrossKernels(y, starts)
+        rows, labels = y.reshape(1, -1), [stat]
+    elif var.type in (2, 3):
+        rows = numpy.array([numpy.asarray(row) for row in var.data])
+        labels = list(range(len(rows)))
+    elif var.type == 4:
+        labels = sorted(var.data.keys())
+        rows = numpy.array([numpy.asarray(var.data[key]) for key in labels])
+    else:
+        raise ValueError("stat '%s' is of type %d, which has no batch plot" % (stat, var.type))
+    return acrossKernels(x, starts), rows, labels
+
+
+def stackLabels(stat, numRows):
+    """Legend names of the rows and the order they are stacked in (graphManager.type3Variable)."""
+    if stat == 'WarpDivergenceBreakdown':
+        names = ['Idle', 'Data Hazard', 'Stall'] + ['W%d:%d' % (4 * (c - 2) + 1, 4 * (c - 1)) for c in range(2, numRows)]
+    elif stat == 'WarpIssueSlotBreakdown':
+        names = ['W%d' % c for c in range(numRows)]
+    elif stat == 'WarpIssueDynamicIdBreakdown':
+        names = ['W%d:%d' % (32 * c, 32 * (c + 1)) for c in range(numRows)]
+    else:
+        names = ['N/A', 'N/A', 'N/A', 'IcntInpBuf', 'N/A', 'Icnt2DRAM', 'N/A', 'N/A', 'N/A', 'DRAM',
+                 '2Sh_IcntInpBuf', 'N/A', 'Icnt2shd', 'N/A', 'N/A']
+        return (names + ['N/A'] * numRows)[:numRows], list(range(numRows - 1, -1, -1))
+    return names[:numRows], list(range(numRows))
+
+
+def render(job):
+    """Draw one plot and write its files; runs in a worker process."""
+    stat, plotType, xStat, x, rows, labels, options = job
+    figure = Figure(figsize=(options['width'], options['height']), dpi=options['dpi'])
+    FigureCanvasAgg(figure)
+    axes = figure.add_subplot(111)
+    pixels = int(figure.bbox.width * axes.get_position().width)
+    arrays = {}
+
+    if plotType == 'line':
+        samples = min(len(x), rows.shape[1])
+        for n in range(len(rows)):
+            xs, ys = lod.lineData(x[:samples], lod.Pyramid(rows[n, :samples]), 0, samples, pixels)
+            axes.plot(xs, ys)
+            arrays['x%d' % n] = xs
+            arrays['y%d' % n] = ys
+        axes.set_xlim(0, x[-1])
+        axes.set_ylabel(stat)
+
+    elif plotType == 'intensity':
+        pyramid = lod.Pyramid(rows)
+        level, first, low, high, mean = pyramid.window(0, pyramid.nsamples, pixels)
+        image = axes.imshow(mean, cmap='gist_heat_r', interpolation='nearest', aspect='auto',
+                            vmin=pyramid.dataRange()[0], vmax=pyramid.dataRange()[1],
+                            extent=lod.imageExtent(level, first, mean))
+        figure.colorbar(image, ax=axes).set_label('Scale: ' + stat)
+        # columns are samples; the x tick labels come from the x axis stat, as in the GUI
+        ticks = numpy.arange(0, rows.shape[1], max(rows.shape[1] // 8, 1))
+        axes.set_xticks(ticks)
+        axes.set_xticklabels([str(v) for v in x[numpy.minimum(ticks, len(x) - 1)]])
+        step = max(len(rows) // 8, 1)
+        axes.set_yticks(range(0, len(rows), step))
+        axes.set_yticklabels([str(v) for v in labels[::step]])
+        axes.set_ylabel(stat)
+        arrays['x'] = x[numpy.minimum(numpy.arange(first, first + mean.shape[1]) << level, len(x) - 1)]
+        arrays['mean'] = mean
+        arrays['min'] = low
+        arrays['max'] = high
+        arrays['rows'] = numpy.array([str(v) for v in labels])
+
+    else:
+        colours = matplotlib.cm.RdBu(numpy.linspace(0, 1, len(rows)))
+        names, sequence = stackLabels(stat, len(rows))
+        ind = numpy.arange(rows.shape[1])
+        bottom = rows.sum(axis=0).astype(numpy.float64)
+        for row in sequence:
+            bottom = bottom - rows[row]
+            axes.bar(ind, rows[row], 1.0, bottom=bottom, color=colours[row], edgecolor=colours[row], label=names[row])
+        axes.legend(loc=(1.01, 0.1), fontsize='small')
+        # the stacked bar organizer bins the samples down to at most 512 columns
+        binning = len(x) // 512 + 1
+        ticks = ind[::max(len(ind) // 8, 1)]
+        axes.set_xticks(ticks)
+        axes.set_xticklabels([str(x[min(t * binning, len(x) - 1)]) for t in ticks])
+        axes.set_xlim(0, len(ind))
+        axes.set_ylabel(stat)
+        arrays['x'] = x[numpy.minimum(ind * binning, len(x) - 1)]
+        arrays['bars'] = rows
+        arrays['rows'] = numpy.array(names)
+
+    axes.set_xlabel(xStat)
+    axes.set_title('%s vs %s ...%s' % (stat, xStat, options['log'][-80:]))
+    base = os.path.join(options['outdir'], '%s.%s.%s' % (os.path.basename(options['log']), stat, plotType))
+    written = []
+    for format in options['formats']:
+        figure.savefig(base + '.' + format, format=format, dpi=options['dpi'], bbox_inches='tight')
+        written.append(base + '.' + format)
+    numpy.savez(base + '.npz', **arrays)
+    written.append(base + '.npz')
+    return written
+
+
+def parsePlots(specs):
+    plots = []
+    for spec in specs:
+        stat, sep, plotType = spec.partition(':')
+        if plotType and plotType not in PLOT_TYPES:
+            raise ValueError("unknown plot type '%s' (%s)" % (plotType, ', '.join(PLOT_TYPES)))
+        plots.append((stat, plotType))
+    return plots
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Render AerialVision time lapse plots without a display.')
+    parser.add_argument('log', help='visualizer log file (plain or .gz)')
+    parser.add_argument('plots', nargs='*', metavar='STAT[:TYPE]', help='TYPE: ' + ', '.join(PLOT_TYPES))
+    parser.add_argument('-x', '--xaxis', default='globalCycle', help='x axis stat (default: globalCycle)')
+    parser.add_argument('-o', '--outdir', default='.', help='output directory (default: .)')
+    parser.add_argument('-f', '--formats', default='png', help='comma separated image formats (default: png)')
+    parser.add_argument('-j', '--jobs', type=int, default=multiprocessing.cpu_count(), help='worker processes')
+    parser.add_argument('--width', type=float, default=12.0, help='figure width in inches')
+    parser.add_argument('--height', type=float, default=4.0, help='figure height in inches')
+    parser.add_argument('--dpi', type=int, default=100)
+    parser.add_argument('--cflog', action='store_true', help='parse the CFLOG PC histograms')
+    parser.add_argument('--cflog-ptx', default='', help='PTX file, to add CUDA source line histograms')
+    parser.add_argument('--cflog-stats', default='', help='per-PTX-line stats file of the same run')
+    parser.add_argument('--list', action='store_true', help='list the stats of the log and exit')
+    args = parser.parse_args(argv)
+
+    if args.cflog:
+        lexyacc.skipCFLOGParsing = 0
+        organizedata.skipCFLog = 0
+        if args.cflog_ptx and args.cflog_stats:
+            organizedata.convertCFLog2CUDAsrc = 1
+            organizedata.CFLOGptxFile = args.cflog_ptx
+            organizedata.CFLOGInsnInfoFile = args.cflog_stats
+    else:
+        lexyacc.skipCFLOGParsing = 1
+        organizedata.skipCFLog = 1
+
+    log = lazyload.LazyLog(args.log)
+    fileVars = log.fileVars
+    if args.list:
+        for stat in sorted(fileVars):
+            print("%-32s type %d" % (stat, fileVars[stat].type))
+        return 0
+
+    try:
+        plots = parsePlots(args.plots)
+    except ValueError as e:
+        parser.error(str(e))
+    for stat, plotType in plots + [(args.xaxis, '')]:
+        if stat not in fileVars:
+            parser.error("'%s' is not in %s (see --list)" % (stat, args.log))
+    lazyload.load(fileVars, [args.xaxis] + [stat for stat, plotType in plots])
+
+    options = {'log': args.log, 'outdir': args.outdir, 'formats': args.formats.split(','),
+               'width': args.width, 'height': args.height, 'dpi': args.dpi}
+    jobs = []
+    for stat, plotType in plots:
+        var = fileVars[stat]
+        possible = TYPE_PLOTS.get(var.type, [])
+        if not plotType:
+            plotType = (possible + [''])[0]
+        if plotType not in possible:
+            print("Skipping %s: a stat of type %d has no %s plot" % (stat, var.type, plotType or 'batch'))
+            continue
+        if len(fileVars[args.xaxis].data) == 0:
+            print("Skipping %s: %s is empty" % (stat, args.xaxis))
+            continue
+        x, rows, labels = plotData(fileVars, stat, args.xaxis)
+        if rows.size == 0:
+            print("Skipping %s: no samples" % stat)
+            continue
+        jobs.append((stat, plotType, args.xaxis, x, rows, labels, options))
+
+    if not os.path.exists(args.outdir):
+        os.makedirs(args.outdir)
+    if len(jobs) < 2 or args.jobs < 2:
+        results = [render(job) for job in jobs]
+    else:
+        pool = multiprocessing.Pool(min(len(jobs), args.jobs))
+        try:
+            results = pool.map(render, jobs)
+        finally:
+            pool.terminate()
+    for written in results:
+        print("Wrote %s" % ', '.join(written))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
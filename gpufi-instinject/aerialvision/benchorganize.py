@@ -0,0 +1,154 @@
+#!/usr/bin/env python
+
+# Micro-benchmark of the organizers in organizedata.py.
+#
+# Builds synthetic samples for an implicit vector stat (one value per shader
+# core), a stacked bar, a per-partition DRAM stat and a per-bank DRAM stat,
+# then runs the NumPy organizers on the SampleRows and the previous
+# list-with-'NULL' organizers (kept below as reference copies) on the same data,
+# checks that both give the same arrays and prints the times.
+#
+# usage: benchorganize.py [samples] [shader cores]    (default: 100000 80)
+
+import array
+import sys
+import time
+
+import numpy
+
+import ingest
+import organizedata
+
+
+def refShader(nullVar, datatype_c):
+    count = 0
+    organized = []
+    for x in reversed(nullVar):
+        if x != 'NULL':
+            count += 1
+        elif count != 0:
+            break
+    numPlots = count
+    count = 0
+    for x in range(0, numPlots):
+        organized.append(array.array(datatype_c, [0]))
+    for x in range(0, (len(nullVar))):
+        if nullVar[x] == 'NULL':
+            while count < numPlots:
+                organized[count].append(0)
+                count += 1
+            count = 0
+        else:
+            organized[count].append(nullVar[x])
+            count += 1
+    return organized
+
+
+def refStackedBar(nullVar, datatype_c):
+    organized = refShader(nullVar, datatype_c)
+    if len(organized[0]) > 512:
+        n_data = len(organized[0]) // 512 + 1
+        newLen = 512
+        for row in range(0, len(organized)):
+            newy = array.array(datatype_c, [0 for col in range(newLen)])
+            for col in range(0, len(organized[row])):
+                newcol = col // n_data
+                newy[newcol] += organized[row][col]
+            for col in range(0, len(newy)):
+                if datatype_c == 'f':
+                    newy[col] /= n_data
+                else:
+                    newy[col] //= n_data
+            organized[row] = newy
+    return organized
+
+
+def refDram(nullVar, datatype_c):
+    organized = [array.array(datatype_c, [0])]
+    mem = 1
+    for iter in nullVar:
+        if iter == 'NULL':
+            mem = 1
+            continue
+        elif mem == 1:
+            memNum = iter
+            mem = 0
+            continue
+        else:
+            try:
+                organized[memNum].append(iter)
+            except IndexError:
+                organized.append(array.array(datatype_c, [0]))
+                organized[memNum].append(iter)
+    return organized
+
+
+def refDramV2(nullVar, datatype_c):
+    organized = {}
+    mem = 1
+    for iter in nullVar:
+        if iter == 'NULL':
+            mem = 1
+            continue
+        elif mem == 1:
+            ChipNum = iter
+            mem += 1
+            continue
+        elif mem == 2:
+            BankNum = iter
+            mem = 0
+            continue
+        else:
+            key = str(ChipNum) + '.' + str(BankNum)
+            try:
+                organized[key].append(iter)
+            except KeyError:
+                organized[key] = array.array(datatype_c, [0])
+                organized[key].append(iter)
+    return organized
+
+
+def samples(values, width):
+    rows = ingest.SampleRows(int)
+    rows.extend(values.reshape(-1), numpy.full(len(values), width, numpy.int64))
+    return rows
+
+
+def main():
+    nSamples = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    nCores = int(sys.argv[2]) if len(sys.argv) > 2 else 80
+    nMem = 6
+    nBanks = 4
+    rng = numpy.random.RandomState(1)
+
+    cases = []
+    cases.append(('shader  %d x %d' % (nSamples, nCores), 'I', refShader, organizedata.nullOrganizedShader,
+                  samples(rng.randint(0, 5000, (nSamples, nCores)), nCores)))
+    cases.append(('stackbar %d x 16' % nSamples, 'I', refStackedBar, organizedata.nullOrganizedStackedBar,
+                  samples(rng.randint(0, 100, (nSamples, 16)), 16)))
+    mem = numpy.tile(numpy.arange(nMem), nSamples)
+    cases.append(('dram    %d x %d' % (nSamples, nMem), 'I', refDram, organizedata.nullOrganizedDram,
+                  samples(numpy.stack((mem, rng.randint(0, 100, len(mem))), axis=1), 2)))
+    chip = numpy.repeat(mem, nBanks)
+    bank = numpy.tile(numpy.arange(nBanks), nSamples * nMem)
+    cases.append(('dramV2  %d x %d x %d' % (nSamples, nMem, nBanks), 'I', refDramV2, organizedata.nullOrganizedDramV2,
+                  samples(numpy.stack((chip, bank, rng.randint(0, 100, len(chip))), axis=1), 3)))
+
+    print('%-26s %10s %10s %8s' % ('organizer', 'list [s]', 'numpy [s]', 'speedup'))
+    for name, datatype_c, ref, new, rows in cases:
+        nullVar = rows.toNullList()
+        start = time.time()
+        expected = ref(nullVar, datatype_c)
+        refTime = time.time() - start
+        del nullVar
+        start = time.time()
+        organized = new(rows, datatype_c)
+        newTime = time.time() - start
+        if organized != expected:
+            print('%-26s MISMATCH' % name)
+            sys.exit(1)
+        print('%-26s %10.2f %10.3f %7.0fx' % (name, refTime, newTime, refTime / max(newTime, 1e-6)))
+
+
+if __name__ == '__main__':
+    main()
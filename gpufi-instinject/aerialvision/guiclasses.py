@@ -79,6 +79,9 @@ import lexyaccbookmark
 import copy
 import lexyacc
 import organizedata
+import ingest
+import lazyload
+import lod
 import lexyacctexteditor
 import variableclasses
 from configs import avconfig
@@ -292,6 +295,8 @@ class formEntry:
     
     
     if ((self.dataChosenX != "") and (self.dataChosenY != "")):
+      # logs opened with "Load stats on demand" read the stat now
+      lazyload.load(self.data[self.fileChosen], [self.dataChosenX, self.dataChosenY])
       varType = self.data[self.fileChosen][self.dataChosenY].type
       for g in formEntry.graphForVarType[varType]:
           self.cTypeGraph.insert(Tk.END, self.possGraphs[g])
@@ -733,6 +738,8 @@ class graphManager:
         self.plotRef = {}
         self.plotFormatInfo = {}
         self.displayData = {}
+        self.lodRef = {}
+        self.derivativeCache = {}
 
         if self.res == "small":
             self.underneathGraph = Tk.Frame(master, borderwidth = 5, relief = Tk.GROOVE, height = 100, width = 1225);
@@ -871,6 +878,13 @@ class graphManager:
         self.dataPointer = self.dataChosen[0]
         self.simplerName = self.data[self.dataPointer.fileChosen]
         self.colorbars = {}
+
+        # read the stats of all plots that are not loaded yet, one pass per log
+        wanted = {}
+        for pointer in [self.dataChosen[0]] + self.dataChosen[1]:
+            wanted.setdefault(pointer.fileChosen, []).extend([pointer.dataChosenX, pointer.dataChosenY])
+        for fileChosen, names in wanted.items():
+            lazyload.load(self.data[fileChosen], names)
         
         for self.currPlot in range(1,numPlots + 1):
           self.xAxisStepsWilStack.append(8)
@@ -935,9 +949,7 @@ class graphManager:
             graphOption = 1
             
         if (graphOption == 1):  
-            if (self.dataPointer.dydx >= 1):
-                for iter in range(0, self.dataPointer.dydx):
-                    y = self.takeDerivative(x, y)
+            y = self.derivatives(x, y, self.takeDerivative)
     
             yAxis = yAxis + '/Cycle'
                 
@@ -954,8 +966,7 @@ class graphManager:
               y = self.updateVarKernal(y)
     
           if (self.dataPointer.dydx >= 1):
-              for iter in range(0, self.dataPointer.dydx):
-                  y = self.takeDerivative(x, y)
+              y = self.derivatives(x, y, self.takeDerivative)
               yAxis = yAxis + '/Cycle'
     
                
@@ -977,9 +988,7 @@ class graphManager:
     
         if (graphOption == 1):
             
-          if (self.dataPointer.dydx >= 1):
-              for iter in range(0, self.dataPointer.dydx):
-                  y = self.takeDerivativeMult(x,y)
+          y = self.derivatives(x, y, self.takeDerivativeMult)
     
           yAxis = yAxis + '/Cycle' 
     
@@ -994,9 +1003,7 @@ class graphManager:
     
           x = self.updateVarKernal(x)
          
-          if (self.dataPointer.dydx >= 1):
-              for iter in range(0, self.dataPointer.dydx):
-                  y = self.takeDerivativeMult(x,y)
+          y = self.derivatives(x, y, self.takeDerivativeMult)
     
           yAxis = yAxis + '/Cycle'
     
@@ -1105,6 +1112,13 @@ class graphManager:
         self.canvas.show()
         
     def type4Variable(self, x, xAxis, y, yAxis, plotID):
+        image, keys = self.type4Image(y)
+        image = self.derivatives(x, image, self.takeDerivativeMult)
+
+        self.plotParallelIntensity(x, xAxis, image, yAxis, yAxis, keys, plotID)
+
+    def type4Image(self, y):
+        # rows of the parallel intensity plot of a type 4 variable and their labels
         keys = y.keys()
         keys.sort()
             
@@ -1112,10 +1126,6 @@ class graphManager:
             image = []
             for iter in keys:
                 image.append(y[iter])
-              
-            if self.dataPointer.dydx >= 1:
-                for iter in range(0, self.dataPointer.dydx):
-                    image = self.takeDerivativeMult(x, image)
 
         elif (self.dataPointer.graphChosen == self.possGraphs[5]):
             # collect a set of majorkeys (assuming format m.n in key)
@@ -1136,16 +1146,12 @@ class graphManager:
                 dataArray = y[k]
                 for pt in range(dataLength):
                     imageArray[pt] += dataArray[pt]
-              
-            if self.dataPointer.dydx >= 1:
-                for iter in range(0, self.dataPointer.dydx):
-                    image = self.takeDerivativeMult(x, image)
 
             keys = majorKeys
         else: 
             pass
 
-        self.plotParallelIntensity(x, xAxis, image, yAxis, yAxis, keys, plotID)
+        return image, keys
       
 
     def type5Variable(self, x, xAxis, y, yAxis, plotID):
@@ -1244,8 +1250,14 @@ class graphManager:
         self.plot.plot(tmpx, tmpy, 'k:' )
     
     
+    def levelOfDetail(self):
+      # lines and images of the current subplot are drawn at screen resolution (see lod.py)
+      if self.currPlot not in self.lodRef or self.lodRef[self.currPlot].axes is not self.plot:
+          self.lodRef[self.currPlot] = lod.LevelOfDetail(self.plot)
+      return self.lodRef[self.currPlot]
+
     def plot2VarLine(self, x, xAxis, y, yAxis):
-      self.plot.plot(x, y)
+      self.levelOfDetail().plot(x, y)
       self.plot.set_xlim(0, self.xlim)
       self.plotFormatInfo[self.currPlot].InitLabels(xlabel = xAxis, ylabel = yAxis, cbarlabel = '', title = xAxis + ' vs ' + yAxis + ' ...' + self.dataPointer.fileChosen[-80:])
       self.plot.set_title(self.plotFormatInfo[self.currPlot].title)
@@ -1256,7 +1268,7 @@ class graphManager:
     
     def plotMultVarLine(self, x, xAxis, y, yAxis):
       for num in range(0,len(y)):
-          self.plot.plot(x, y[num])
+          self.levelOfDetail().plot(x, y[num])
       self.plot.set_xlim(0, self.xlim)
       self.plotFormatInfo[self.currPlot].InitLabels(xlabel = xAxis, ylabel = yAxis, cbarlabel = '', title = '')
       self.plot.set_xlabel(self.plotFormatInfo[self.currPlot].xlabel, fontsize = self.plotFormatInfo[self.currPlot].labelFontSize)
@@ -1278,40 +1290,50 @@ class graphManager:
         self.canvas.show()
       
     
-    def takeDerivativeMult(self,x,y):
-        multDerivative = []
+    def derivatives(self, x, y, takeDerivative):
+        # y after the dydx derivatives chosen for the current plot; the result of every
+        # order is kept, so replotting (or asking for one more derivative) reuses them
+        key = (self.dataPointer.fileChosen, self.dataPointer.dataChosenX, self.dataPointer.dataChosenY,
+               self.dataPointer.graphChosen)
+        order = self.dataPointer.dydx
+        done = order
+        while done > 0 and key + (done,) not in self.derivativeCache:
+            done -= 1
+        if done > 0:
+            y = self.derivativeCache[key + (done,)]
+        for iter in range(done, order):
+            y = takeDerivative(x, y)
+            self.derivativeCache[key + (iter + 1,)] = y
+        return y
 
-        cycleStep = self.simplerName[self.dataPointer.dataChosenX].data[1] - self.simplerName[self.dataPointer.dataChosenX].data[0]
-       
-        
-        for num in range(0,len(y)):
-            multDerivative.append(self.takeDerivative(x,y[num]))
-        return multDerivative                
+    def takeDerivativeMult(self,x,y):
+        if len(set([len(row) for row in y])) != 1:
+            return [self.takeDerivative(x, row) for row in y]
+        # rows of equal length: one diff over the whole units x samples matrix
+        rates = self.rates(x, numpy.array([numpy.asarray(row) for row in y]))
+        return [organizedata.toArray(row, 'f') for row in rates]
     
     
     def takeDerivative(self,x,y,b_acc=1): #both variables have to already be organized for this to work!!!
-        #x = [val for val in x]
-        #y = [val for val in y]
-        derivative = array.array('f')
-        prevY = 0
-        
+        return organizedata.toArray(self.rates(x, numpy.asarray(y), b_acc), 'f')
+
+    def rates(self, x, y, b_acc=1):
+        # (y[n] - y[n-1]) / cycle step along the last axis of y, with y[-1] = 0; for an
+        # accumulated counter (b_acc) a value below the previous one is a reset, and
+        # counts from 0 again
+        y = y.astype(numpy.float64 if y.dtype.kind == 'f' else numpy.int64)
+        prevY = numpy.zeros_like(y)
+        prevY[..., 1:] = y[..., :-1]
+        if b_acc == 1:
+            prevY[y < prevY] = 0
+
         cycleStep = x[1] - x[0]
         if (cycleStep < 0):
-            prevCycle = 0
-            for cycle in self.simplerName[self.dataPointer.dataChosenX].data:
-                cycleStep = cycle - prevCycle
-                if cycleStep == 0:
-                    continue
-                else:
-                    break
-                prevCycle = cycle
-        # fill up self.globalIPC list
-        for yNum in y:
-            if (b_acc == 1 and yNum < prevY):
-                prevY = 0	
-            derivative.append(float(yNum - prevY)/cycleStep)
-            prevY = yNum
-        return derivative
+            # the first nonzero cycle of the x axis
+            cycles = numpy.asarray(self.simplerName[self.dataPointer.dataChosenX].data)
+            nonzero = numpy.flatnonzero(cycles)
+            cycleStep = cycles[nonzero[0]] if len(nonzero) else 0
+        return (y - prevY) / float(cycleStep)
     
     
     def plotParallelIntensity(self, x, xAxis, y, yAxis, colorAxis, yTicks, plotID):
@@ -1364,7 +1386,7 @@ class graphManager:
         
         interpolation = 'nearest'
         norm = plotFormat.norm
-        im = self.plot.imshow(y, cmap = cmap, interpolation = interpolation, aspect = 'auto', norm = norm )
+        im = self.levelOfDetail().imshow(y, cmap = cmap, interpolation = interpolation, aspect = 'auto', norm = norm )
         # tmp = im.get_axes().get_position().get_points()
         tmp = im.get_window_extent().get_points()
 
@@ -1411,17 +1433,8 @@ class graphManager:
         self.dataPointer = self.dataChosen[0]
         for self.currPlot in range(1,numPlots + 1):
           del self.data[self.dataPointer.fileChosen]
-          self.data[self.dataPointer.fileChosen] = lexyacc.parseMe(self.dataPointer.fileChosen)
-          
-          markForDel = []
-          for variables in self.data[self.dataPointer.fileChosen]:
-              if self.checkEmpty(self.data[self.dataPointer.fileChosen][variables].data) == 0:
-                  markForDel.append(variables)
-      
-          for variables in markForDel:
-              del self.data[self.dataPointer.fileChosen][variables]
-          
-          self.data[self.dataPointer.fileChosen] = organizedata.organizedata(self.data[self.dataPointer.fileChosen])  
+          # a log that grew since it was loaded has a new size/mtime and is parsed again
+          self.data[self.dataPointer.fileChosen] = startup.loadLogFile(self.dataPointer.fileChosen)
           
           if self.dataChosen[1] != [] and self.currPlot != numPlots:
               self.dataPointer = self.dataChosen[1][self.currPlot - 1]
@@ -1433,6 +1446,9 @@ class graphManager:
         self.__init__(self.master, self.data, self.res, self.dataChosen)
     
     def checkEmpty(self,list):
+      found = ingest.hasData(list)
+      if found is not None:
+        return found
       bool = 0
       for x in list:
           if ((x != 0) and (x != 'NULL')):
@@ -1475,19 +1491,14 @@ class graphManager:
                   locMax = self.simplerName[self.dataPointer.dataChosenY].data[0,1][0]
                   locMin = 0
               elif self.simplerName[self.dataPointer.dataChosenY].type != 1:
-                  if self.dataPointer.dydx == 0:
-                      y = self.simplerName[self.dataPointer.dataChosenY].data
+                  # the rows as plotted (see type2Variable/type4Variable), so the derivatives come from the plot's cache
+                  x = self.simplerName[self.dataPointer.dataChosenX].data
+                  y = self.simplerName[self.dataPointer.dataChosenY].data
+                  if self.simplerName[self.dataPointer.dataChosenY].type == 4:
+                      y, keys = self.type4Image(y)
                   else:
-                      for iter in range(0, self.dataPointer.dydx):
-                        if self.simplerName[self.dataPointer.dataChosenY].type == 4:
-                          keys = self.simplerName[self.dataPointer.dataChosenY].data.keys()
-                          keys.sort()
-                          y = []
-                          for iter in keys:
-                            y.append(self.simplerName[self.dataPointer.dataChosenY].data[iter])
-                          y = self.takeDerivativeMult(self.simplerName[self.dataPointer.dataChosenX].data, y)
-                        else:
-                          y = self.takeDerivativeMult(self.simplerName[self.dataPointer.dataChosenX].data, self.simplerName[self.dataPointer.dataChosenY].data)
+                      x = self.updateVarKernal(x)
+                  y = self.derivatives(x, y, self.takeDerivativeMult)
                   locMax = 0
                   locMin = 99999999999999999999999999999
                   for iter in y:
@@ -1499,11 +1510,13 @@ class graphManager:
                       if min(iter) < locMin:
                           locMin = min(iter)
               else:
-                  if self.dataPointer.dydx == 0:
-                      y = self.simplerName[self.dataPointer.dataChosenY].data
-                  else:
-                      for iter in range(0, self.dataPointer.dydx):
-                          y = self.takeDerivative(self.simplerName[self.dataPointer.dataChosenX].data, self.simplerName[self.dataPointer.dataChosenY].data)
+                  # as in type1Variable
+                  x = self.updateVarKernal(self.simplerName[self.dataPointer.dataChosenX].data)
+                  y = self.simplerName[self.dataPointer.dataChosenY].data
+                  if self.simplerName[self.dataPointer.dataChosenY].bool:
+                      y = self.updateVarKernal(y)
+                  if self.dataPointer.dydx >= 1:
+                      y = self.derivatives(x, y, self.takeDerivative)
                   locMax = max(y)
                   locMin = min(y)
                   if locMax > absoluteMax:
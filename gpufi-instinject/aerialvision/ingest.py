@@ -0,0 +1,315 @@
+#!/usr/bin/env python
+
+# Chunked ingest engine for GPGPU-Sim visualizer logs (plain or gzip'ed).
+#
+# Every line of a visualizer log is "<stat name>: <number sequence>".  The log
+# is read in large chunks; within a chunk the lines are grouped by stat (looked
+# up in the stat_lookuptable built by lexyacc.parseMe) and each group is turned
+# into numbers by a single numpy.fromstring call, so the per-number work is
+# done in C instead of one Python append per value.  Lines without a ':' are
+# skipped.
+#
+# Samples of a stat end up in a SampleRows object (one row per sample), which
+# replaces the flat Python list with 'NULL' separators that organizedata.py
+# used to receive.  Sparse stats (type 5) become [values, rows, sample numbers]
+# arrays and CFLOG entries keep one pc[] / threadcount[] array per sample.
+#
+# This module is kept valid for both Python 2 and Python 3.
+
+import gzip
+import re
+
+import numpy
+
+CHUNK_SIZE = 1 << 24
+
+NUMPY_DTYPE = {int: numpy.int64, float: numpy.float64}
+
+# "<stat name>:<number sequence>"; lines without a ':' are skipped
+RE_LINE = re.compile(r'^([^:\n]*):([^\n]*)', re.M)
+# "\n<stat name>:", searched in a chunk with a '\n' put in front
+RE_NAME = re.compile(r'\n([^:\n]*):')
+
+
+class SampleRows(object):
+    """Growable sample store of one stat: all values in one array plus the end offset of every row."""
+
+    def __init__(self, datatype=int):
+        self.datatype = datatype
+        self.values = numpy.empty(4096, NUMPY_DTYPE.get(datatype, numpy.float64))
+        self.ends = numpy.empty(1024, numpy.int64)
+        self.nvalues = 0
+        self.nrows = 0
+
+    def extend(self, values, lengths):
+        nvalues = self.nvalues + len(values)
+        nrows = self.nrows + len(lengths)
+        if nvalues > len(self.values):
+            self.values = numpy.resize(self.values, max(nvalues, 2 * len(self.values)))
+        if nrows > len(self.ends):
+            self.ends = numpy.resize(self.ends, max(nrows, 2 * len(self.ends)))
+        self.values[self.nvalues:nvalues] = values
+        numpy.cumsum(lengths, out=self.ends[self.nrows:nrows])
+        self.ends[self.nrows:nrows] += self.nvalues
+        self.nvalues = nvalues
+        self.nrows = nrows
+
+    def __len__(self):
+        return self.nrows
+
+    def flat(self):
+        """All values of all samples, in log order."""
+        return self.values[:self.nvalues]
+
+    def rowEnds(self):
+        return self.ends[:self.nrows]
+
+    def rowLengths(self):
+        return numpy.diff(numpy.concatenate(([0], self.rowEnds())))
+
+    def rows(self):
+        """Samples x values matrix when all samples have the same length, otherwise None."""
+        lengths = self.rowLengths()
+        if len(lengths) == 0 or numpy.any(lengths != lengths[0]):
+            return None
+        return self.flat().reshape(self.nrows, int(lengths[0]))
+
+    def hasNonZero(self):
+        return bool(numpy.any(self.flat()))
+
+    def toList(self):
+        return self.flat().tolist()
+
+    def toNullList(self):
+        """The flat list with a 'NULL' after every sample, as the old line-by-line parser produced."""
+        values = self.toList()
+        organized = []
+        start = 0
+        for end in self.rowEnds().tolist():
+            organized.extend(values[start:end])
+            organized.append('NULL')
+            start = end
+        return organized
+
+
+def hasData(data):
+    """1 if ingested stat data holds a non-zero value, None if data is not in an ingest format."""
+    if isinstance(data, SampleRows):
+        return int(data.hasNonZero())
+    if isinstance(data, list) and len(data) > 0 and isinstance(data[0], numpy.ndarray):
+        return int(any(numpy.any(x) for x in data))
+    return None
+
+
+def countNumbers(text, nseqs):
+    """Number of whitespace separated tokens on each of the nseqs lines of text."""
+    if not isinstance(text, bytes):
+        text = text.encode('latin-1')
+    chars = numpy.frombuffer(text, numpy.uint8)
+    token = chars > 32
+    starts = numpy.flatnonzero(token[1:] > token[:-1]) + 1
+    if len(token) and token[0]:
+        starts = numpy.concatenate(([0], starts))
+    newlines = numpy.flatnonzero(chars == 10)
+    return numpy.bincount(numpy.searchsorted(newlines, starts), minlength=nseqs).astype(numpy.int64)
+
+
+def parseNumbers(seqs, datatype, name):
+    """Number sequences -> (values, per-sequence counts) with one fromstring call."""
+    dtype = NUMPY_DTYPE.get(datatype, numpy.float64)
+    text = '\n'.join(seqs)
+    lengths = countNumbers(text, len(seqs))
+    if not lengths.any():
+        return numpy.empty(0, dtype), lengths
+    values = numpy.fromstring(text, dtype=dtype, sep=' ')
+    if len(values) != lengths.sum():
+        raise ValueError("malformed number sequence for stat '%s'" % name)
+    return values, lengths
+
+
+def openLog(filename):
+    # detect for gzip'ed log file and gunzip on the fly
+    if filename.endswith('.gz'):
+        return gzip.open(filename, 'rb')
+    return open(filename, 'rb')
+
+
+def readChunks(filename, chunkSize=CHUNK_SIZE):
+    """Yield (byte offset, text) of the log in chunks of complete lines."""
+    file = openLog(filename)
+    try:
+        offset = 0
+        tail = ''
+        while True:
+            chunk = file.read(chunkSize)
+            if not chunk:
+                break
+            if not isinstance(chunk, str):
+                chunk = chunk.decode('latin-1')
+            end = chunk.rfind('\n') + 1
+            if end:
+                text = tail + chunk[:end]
+                yield offset, text
+                offset += len(text)
+                tail = chunk[end:]
+            else:
+                tail += chunk
+        if tail:
+            yield offset, tail
+    finally:
+        file.close()
+
+
+def readLines(filename, chunkSize=CHUNK_SIZE):
+    """Yield the (stat name, number sequence) pairs of the log, one list per chunk of complete lines."""
+    for offset, text in readChunks(filename, chunkSize):
+        yield RE_LINE.findall(text)
+
+
+class LogIndex(object):
+    """Byte ranges of the chunks of a log and the chunks that hold each stat name (as written in the log)."""
+
+    def __init__(self, filename):
+        self.filename = filename
+        self.chunks = []
+        self.names = {}
+
+    def nameChunks(self, rawNames):
+        found = set()
+        for name in rawNames:
+            found.update(self.names.get(name, []))
+        return sorted(found)
+
+
+def indexLog(filename, chunkSize=CHUNK_SIZE):
+    """First pass over a log: record where each stat name occurs without converting any numbers."""
+    index = LogIndex(filename)
+    for offset, text in readChunks(filename, chunkSize):
+        chunkNum = len(index.chunks)
+        index.chunks.append((offset, len(text)))
+        text = '\n' + text
+        # names already seen: a plain substring search per name
+        for name, chunkNums in index.names.items():
+            if text.find('\n' + name + ':') >= 0:
+                chunkNums.append(chunkNum)
+        # new names: find the next line that does not start with a known name
+        position = 0
+        while True:
+            if index.names:
+                known = '|'.join(re.escape(name) for name in index.names)
+                pattern = re.compile(r'\n(?!(?:' + known + r'):)([^:\n]*):')
+            else:
+                pattern = RE_NAME
+            match = pattern.search(text, position)
+            if match is None:
+                break
+            index.names[match.group(1)] = [chunkNum]
+            position = match.start()
+    return index
+
+
+def readIndexed(index, rawNames):
+    """Yield the (stat name, number sequence) pairs of the given stat names, reading only the chunks that hold them."""
+    patterns = [(name, re.compile(r'\n' + re.escape(name) + r':([^\n]*)')) for name in rawNames]
+    file = openLog(index.filename)
+    try:
+        for chunkNum in index.nameChunks(rawNames):
+            offset, length = index.chunks[chunkNum]
+            file.seek(offset)
+            text = file.read(length)
+            if not isinstance(text, str):
+                text = text.decode('latin-1')
+            text = '\n' + text
+            pairs = []
+            for name, pattern in patterns:
+                pairs.extend((name, seq) for seq in pattern.findall(text))
+            yield pairs
+    finally:
+        file.close()
+
+
+def routeName(rawName, stat_lookuptable, skipCFLOG=0):
+    """Owner of a stat name as written in the log: a stat variable, ('cflog', name) or False."""
+    lookup_input = rawName.strip().lower()
+    if lookup_input in stat_lookuptable:
+        return stat_lookuptable[lookup_input]
+    elif lookup_input[0:5] == 'cflog' and skipCFLOG != 1:
+        return ('cflog', rawName.strip())
+    return False
+
+
+def ingestLog(filename, stat_lookuptable, CFLOG, cflogFactory, skipCFLOG=0, index=None, rawNames=None):
+    """Fill stat.data of every stat in stat_lookuptable (and CFLOG) from the log file.
+
+    With an index from indexLog, only the lines of the stat names in rawNames are read.
+    """
+
+    # stat name as written in the log -> SampleRows owner (a stat variable), ('cflog', name) or False
+    route = {}
+    stat_missing_warned = {}
+    sparse = {}
+    cycleStat = stat_lookuptable.get('globalcyclecount')
+
+    if index is not None:
+        chunks = readIndexed(index, rawNames)
+    else:
+        chunks = readLines(filename)
+    for pairs in chunks:
+        # group the number sequences by the name in the log first; there are only a few distinct names
+        groups = {}
+        for name, seq in pairs:
+            try:
+                groups[name].append(seq)
+            except KeyError:
+                groups[name] = [seq]
+
+        for rawName, seqs in groups.items():
+            key = route.get(rawName)
+            if key is None:
+                key = routeName(rawName, stat_lookuptable, skipCFLOG)
+                route[rawName] = key
+            if key is False:
+                continue
+            isCFLOG = isinstance(key, tuple)
+            name = rawName.strip()
+            if not isCFLOG and key.type == 5:
+                seqs = [s.replace(',', ' ') for s in seqs]
+            values, lengths = parseNumbers(seqs, int if isCFLOG else key.datatype, name)
+
+            # detect empty data entry for particular metric and print a warning
+            if not lengths.all():
+                if name not in stat_missing_warned:
+                    print("WARNING: Sample entry for metric '%s' has no data. Skipping..." % name)
+                    stat_missing_warned[name] = True
+                lengths = lengths[lengths != 0]
+
+            if isCFLOG:
+                if name not in CFLOG:
+                    CFLOG[name] = cflogFactory()
+                    CFLOG[name].data.append([]) # pc[]
+                    CFLOG[name].data.append([]) # threadcount[]
+                    CFLOG[name].maxPC = 0
+                for sample in numpy.split(values, numpy.cumsum(lengths)[:-1]):
+                    CFLOG[name].data[0].append(sample[0::2])
+                    CFLOG[name].data[1].append(sample[1::2])
+                if len(values):
+                    CFLOG[name].maxPC = max(int(values[0::2].max()), CFLOG[name].maxPC)
+            elif key.type == 5:
+                # "row,value" entries; samples are numbered from 1
+                entries = values.reshape(-1, 2)
+                counts = lengths // 2
+                first = key.sampleNum if key.initialized else 1
+                key.initialized = 1
+                key.sampleNum = first + len(counts)
+                sparse.setdefault(key, []).append(
+                    (entries[:, 1], entries[:, 0], numpy.repeat(numpy.arange(first, key.sampleNum), counts)))
+            else:
+                if not isinstance(key.data, SampleRows):
+                    key.data = SampleRows(key.datatype)
+                key.data.extend(values, lengths)
+
+        if cycleStat is not None and isinstance(cycleStat.data, SampleRows) and cycleStat.data.nvalues:
+            print("Processing global cycle %d" % cycleStat.data.flat()[-1])
+
+    for stat, parts in sparse.items():
+        stat.data = [numpy.concatenate([part[i] for part in parts]) for i in range(3)]
@@ -0,0 +1,130 @@
+#!/usr/bin/env python
+
+# On-demand loading of visualizer logs.
+#
+# A LazyLog first indexes the log with ingest.indexLog (which chunks of the
+# file hold which stat names; no numbers are converted) and exposes the stats
+# found in it as LazyVariable placeholders.  The data of a stat is read,
+# parsed and organized only when it is needed: formEntry.chooseDataY and
+# graphManager.plotData call load() for the stats they are about to use, and
+# reading the data attribute of any other placeholder loads that stat alone.
+# globalCycle, the x axis of every plot, is loaded right away.
+#
+# This module is kept valid for both Python 2 and Python 3.
+
+import ingest
+import lexyacc
+import organizedata
+import variableclasses as vc
+
+global loadOnDemand
+loadOnDemand = 0
+
+
+class LazyVariable(vc.variable):
+    """Stat variable whose data attribute is filled from the log on first access."""
+
+    def __init__(self, log, name, var):
+        self.__dict__.update(var.__dict__)
+        del self.data
+        self.log = log
+        self.name = name
+
+    def loaded(self):
+        return 'data' in self.__dict__
+
+    def __getattr__(self, attr):
+        # only called for attributes that are not set, i.e. data before the stat is loaded
+        if attr == 'data' and 'log' in self.__dict__:
+            self.log.load([self.name])
+            return self.__dict__['data']
+        raise AttributeError(attr)
+
+
+class LazyLog(object):
+    """Index of a log and the placeholders of its stats (fileVars), loaded stat by stat."""
+
+    def __init__(self, filename):
+        self.filename = filename
+        self.variables, self.stat_lookuptable = lexyacc.statVariables()
+        print("Indexing %s..." % filename)
+        self.index = ingest.indexLog(filename)
+
+        # stat name in the GUI -> the names it is written with in the log
+        self.rawNames = {}
+        for rawName in self.index.names:
+            key = ingest.routeName(rawName, self.stat_lookuptable, lexyacc.skipCFLOGParsing)
+            if key is False:
+                continue
+            if isinstance(key, tuple):
+                self.rawNames.setdefault('CFLOG', []).append(rawName)
+                continue
+            for name, var in self.variables.items():
+                if var is key:
+                    self.rawNames.setdefault(name, []).append(rawName)
+
+        self.fileVars = {}
+        for name in self.rawNames:
+            if name != 'CFLOG':
+                self.fileVars[name] = LazyVariable(self, name, self.variables[name])
+
+        # the CFLOG histograms are organized together, whichever of them is loaded first
+        self.cflogNames = []
+        if 'CFLOG' in self.rawNames and organizedata.skipCFLog == 0:
+            for rawName in self.rawNames['CFLOG']:
+                self.cflogNames.append(rawName.strip() + 'PTX')
+                if organizedata.convertCFLog2CUDAsrc == 1:
+                    self.cflogNames.append(rawName.strip() + 'CUDA')
+            self.cflogNames += ['CFLOGglobalPTX', 'CFLOGglobalCUDA']
+            for name in self.cflogNames:
+                self.fileVars[name] = LazyVariable(self, name, vc.variable('', 2, 0))
+
+        self.load(['globalCycle'])
+
+    def load(self, names):
+        """Read, parse and organize the given stats that are not loaded yet."""
+        stats = []
+        cflog = 0
+        for name in names:
+            var = self.fileVars.get(name)
+            if not isinstance(var, LazyVariable) or var.loaded() or name in stats:
+                continue
+            if name in self.cflogNames:
+                cflog = 1
+            else:
+                stats.append(name)
+        if len(stats) == 0 and cflog == 0:
+            return
+
+        rawNames = []
+        for name in stats:
+            rawNames += self.rawNames[name]
+        if cflog == 1:
+            rawNames += self.rawNames['CFLOG']
+        print("Loading %s from %s..." % (', '.join(stats + ['CFLOG'] * cflog), self.filename))
+        CFLOG = {}
+        ingest.ingestLog(self.filename, self.stat_lookuptable, CFLOG, lexyacc.cflogVariable,
+                         lexyacc.skipCFLOGParsing, self.index, rawNames)
+
+        organizeVars = dict((name, self.variables[name]) for name in stats)
+        if cflog == 1:
+            organizeVars['CFLOG'] = CFLOG
+        organizedCycle = None
+        if 'globalCycle' not in organizeVars:
+            organizedCycle = self.fileVars.get('globalCycle')
+        organizeVars = organizedata.organizedata(organizeVars, organizedCycle)
+
+        for name in stats + self.cflogNames * cflog:
+            if name in organizeVars:
+                self.fileVars[name].data = organizeVars[name].data
+            else:
+                self.fileVars[name].data = []
+
+
+def load(fileVars, names):
+    """Load the given stats of a log from loadOnDemand mode; other logs are left alone."""
+    for name in names:
+        var = fileVars.get(name)
+        if isinstance(var, LazyVariable) and not var.loaded():
+            var.log.load(names)
+            return
@@ -54,13 +54,9 @@
 import os
 import os.path
 import sys
-sys.path.insert(0,"Lib/site-packages/ply-3.2/ply-3.2")
-import ply.lex as lex
-import ply.yacc as yacc
-import gzip
-import gc
 
 import variableclasses as vc
+import ingest
 
 global skipCFLOGParsing
 skipCFLOGParsing = 0
@@ -108,39 +104,22 @@ def import_user_defined_variables(variables):
             print "error:",e,", in variables.txt line:",line
 
 # Parses through a given log file for data
+# The log is read in large chunks by ingest.ingestLog, which dispatches every
+# "<stat name>: <numbers>" line on stat_lookuptable and converts the numbers of
+# each stat straight into NumPy arrays (see ingest.py)
 def parseMe(filename):
-    
-    #The lexer
-        
-    # List of token names.   This is always required
-    tokens = ['WORD', 
-       'NUMBERSEQUENCE',
-    ]
-    
-    # Regular expression rules for tokens
-    
-    
-    def t_WORD(t):
-        r'[a-zA-Z_][a-zA-Z0-9_]*'
-        return t
-    
-    def t_NUMBERSEQUENCE(t):
-        r'([-]{0,1}[0-9]+([\.][0-9]+){0,1}[ ]*)+'
-        return t
-    
-        
-    t_ignore = '[\t: ]+'
-    
-    def t_newline(t):
-        r'\n+'
-        t.lexer.lineno += t.value.count("\n")
-        
-    def t_error(t):
-        print "Illegal character '%s'" % t.value[0]
-        t.lexer.skip(1) 
 
-    lex.lex()
+    variables, stat_lookuptable = statVariables()
+    ingest.ingestLog(filename, stat_lookuptable, variables['CFLOG'], cflogVariable, skipCFLOGParsing)
 
+    return variables
+
+def cflogVariable():
+    return vc.variable('',2,0)
+
+# The supported stat variables (with no data yet) and their lookup table by the name in the log file
+def statVariables():
+    
     # Creating holder for CFLOG
     CFLOG = {}
     
@@ -209,116 +188,8 @@ def parseMe(filename):
             stat_lookuptable[var.lookup_tag] = var 
         else:
             stat_lookuptable[name.lower()] = var
-    
-    inputData = 'NULL'
-
-    # a table containing all the metrics that has received the missing data warning 
-    stat_missing_warned = {}
-        
-    def p_sentence(p):
-        '''sentence : WORD NUMBERSEQUENCE'''
-        #print p[0], p[1],p[2]
-        num = p[2].split(" ")  
-        
-        # detect empty data entry for particular metric and print a warning 
-        if p[2] == '': 
-            if not p[1] in stat_missing_warned: 
-                print "WARNING: Sample entry for metric '%s' has no data. Skipping..." % p[1]
-                stat_missing_warned[p[1]] = True
-            return
 
-        lookup_input = p[1].lower()
-        if (lookup_input  in stat_lookuptable):
-            if (lookup_input == "globalcyclecount") and (int(num[0]) % 10000 == 0):
-                print "Processing global cycle %s" % num[0]
-                
-            stat = stat_lookuptable[lookup_input]
-            if (stat.type == 1):
-                for x in num:
-                    stat.data.append(stat.datatype(x))
-                
-            elif (stat.type == 2):
-                for x in num:
-                    stat.data.append(stat.datatype(x))
-                stat.data.append("NULL")
-                
-            elif (stat.type == 3):
-                for x in num:
-                    stat.data.append(stat.datatype(x))
-                stat.data.append("NULL")
-
-            elif (stat.type == 4):
-                for x in num:
-                    stat.data.append(stat.datatype(x))
-                stat.data.append("NULL")
-
-            elif (stat.type == 5):
-                stat.initSparseMatrix()
-                for entry in num:
-                    row, value = entry.split(',')
-                    row = stat.datatype(row)
-                    value = stat.datatype(value)
-                    stat.data[0].append(value)
-                    stat.data[1].append(row)
-                    stat.data[2].append(stat.sampleNum)
-                stat.sampleNum += 1
-
-        elif (lookup_input[0:5] == 'cflog'):
-            if (skipCFLOGParsing == 1): 
-                return
-            count = 0
-            pc = []
-            threadcount = []
-            for x in num:
-                if (count % 2) == 0:
-                    pc.append(int(x))
-                else:
-                    threadcount.append(int(x))
-                count += 1
-
-            if (p[1] not in CFLOG):
-                CFLOG[p[1]] = vc.variable('',2,0)
-                CFLOG[p[1]].data.append([]) # pc[]
-                CFLOG[p[1]].data.append([]) # threadcount[]
-                CFLOG[p[1]].maxPC = 0
-
-            CFLOG[p[1]].data[0].append(pc)
-            CFLOG[p[1]].data[1].append(threadcount)
-            MaxPC = max(pc)
-            CFLOG[p[1]].maxPC = max(MaxPC, CFLOG[p[1]].maxPC)
-        
-        else:
-            pass
-        
-
-
-    def p_error(p):
-        if p:
-            print("Syntax error at '%s'" % p.value)
-        else:
-            print("Syntax error at EOF")
-    
-    yacc.yacc()
-
-    # detect for gzip'ed log file and gunzip on the fly
-    if (filename.endswith('.gz')):
-        file = gzip.open(filename, 'r')
-    else:
-        file = open(filename, 'r')
-    while file:
-        line = file.readline()
-        if not line : break
-        nameNdata = line.split(":")
-        if (len(nameNdata) != 2): 
-            print("Syntax error at '%s'" % line) 
-        namePart = nameNdata[0].strip()
-        dataPart= nameNdata[1].strip()
-        parts = [' ', namePart, dataPart]
-        p_sentence(parts)
-        # yacc.parse(line[0:-1])
-    file.close()    
-
-    return variables
+    return variables, stat_lookuptable
   
 
 
@@ -0,0 +1,156 @@
+#!/usr/bin/env python
+
+# Level-of-detail rendering for the time lapse plots.
+#
+# A Pyramid keeps the min, max and sum of a series (or of every row of a
+# cycles x units matrix) over bins of 1, 2, 4, ... samples.  It is built once
+# per plotted series; every redraw then takes the coarsest level that still has
+# at least one bin per screen pixel over the visible x range, so matplotlib
+# never gets more points than the axes can show.  Zoomed in far enough, the
+# visible window is drawn from level 0, i.e. the exact data.
+#
+# LevelOfDetail owns the lines and images of one matplotlib axes and redraws
+# them from their pyramids whenever the x limits of the axes change (the zoom
+# dialog, the toolbar zoom and pan, or the plotting code itself).  Lines are
+# drawn as a min/max envelope per bin, so peaks survive the downsampling;
+# parallel intensity images show the mean of each bin.
+#
+# This module is kept valid for both Python 2 and Python 3.
+
+import numpy
+
+
+class Pyramid(object):
+    """min / max / sum of every row of a matrix over bins of 2**level samples."""
+
+    def __init__(self, data):
+        data = numpy.asarray(data)
+        if data.ndim == 1:
+            data = data.reshape(1, -1)
+        self.nsamples = data.shape[1]
+        # level 0 is the data itself
+        self.levels = [(data, data, data, numpy.ones(self.nsamples))]
+        while self.levels[-1][0].shape[1] > 1:
+            self.levels.append(halve(self.levels[-1]))
+
+    def chooseLevel(self, start, stop, pixels):
+        """Coarsest level with at least one bin per pixel over samples [start, stop)."""
+        level = 0
+        while level + 1 < len(self.levels) and (stop - start) >> (level + 1) >= max(pixels, 1):
+            level += 1
+        return level
+
+    def window(self, start, stop, pixels):
+        """(level, first bin, min, max, mean) of the bins covering samples [start, stop)."""
+        start = max(0, min(start, self.nsamples))
+        stop = max(start, min(stop, self.nsamples))
+        level = self.chooseLevel(start, stop, pixels)
+        first = start >> level
+        last = (stop + (1 << level) - 1) >> level
+        low, high, total, count = self.levels[level]
+        return level, first, low[:, first:last], high[:, first:last], total[:, first:last] / count[first:last]
+
+    def dataRange(self):
+        return self.levels[-1][0].min(), self.levels[-1][1].max()
+
+
+def halve(level):
+    """The next level: pairs of bins merged (an odd last bin stays alone)."""
+    low, high, total, count = level
+    n = low.shape[1]
+    pairs = n // 2
+    merged = (numpy.minimum(low[:, 0:2 * pairs:2], low[:, 1:2 * pairs:2]),
+              numpy.maximum(high[:, 0:2 * pairs:2], high[:, 1:2 * pairs:2]),
+              numpy.add(total[:, 0:2 * pairs:2], total[:, 1:2 * pairs:2], dtype=numpy.float64),
+              count[0:2 * pairs:2] + count[1:2 * pairs:2])
+    if n % 2:
+        merged = (numpy.concatenate((merged[0], low[:, -1:]), axis=1),
+                  numpy.concatenate((merged[1], high[:, -1:]), axis=1),
+                  numpy.concatenate((merged[2], total[:, -1:].astype(numpy.float64)), axis=1),
+                  numpy.concatenate((merged[3], count[-1:])))
+    return merged
+
+
+class LevelOfDetail(object):
+    """The pyramid-backed lines and images of one axes, redrawn when its x limits change."""
+
+    def __init__(self, axes):
+        self.axes = axes
+        self.lines = []
+        self.images = []
+        self.updating = 0
+        axes.callbacks.connect('xlim_changed', self.update)
+
+    def pixels(self):
+        return max(int(self.axes.get_window_extent().width), 1)
+
+    def plot(self, x, y, *args, **kwargs):
+        """axes.plot(x, y) of one series; x must be increasing for the visible window to be found."""
+        x = numpy.asarray(x)
+        pyramid = Pyramid(y)
+        xs, ys = lineData(x, pyramid, 0, len(x), self.pixels())
+        line = self.axes.plot(xs, ys, *args, **kwargs)[0]
+        self.lines.append((line, x, pyramid))
+        return line
+
+    def imshow(self, y, norm=None, **kwargs):
+        """axes.imshow(y) with y a units x samples matrix (rows of equal length)."""
+        matrix = numpy.asarray(y)
+        if matrix.ndim != 2 or matrix.dtype == object or matrix.shape[1] == 0:
+            return self.axes.imshow(y, norm=norm, **kwargs)
+        pyramid = Pyramid(matrix)
+        # scale the colors by the full resolution data, as imshow(y) would
+        if norm is not None:
+            norm.autoscale_None(numpy.array(pyramid.dataRange()))
+        level, first, low, high, mean = pyramid.window(0, pyramid.nsamples, self.pixels())
+        image = self.axes.imshow(mean, norm=norm, extent=imageExtent(level, first, mean), **kwargs)
+        self.images.append((image, pyramid))
+        return image
+
+    def update(self, axes=None):
+        # set_extent may move the limits of an autoscaled axes again
+        if self.updating:
+            return
+        self.updating = 1
+        try:
+            self.redraw()
+        finally:
+            self.updating = 0
+
+    def redraw(self):
+        xmin, xmax = self.axes.get_xlim()
+        pixels = self.pixels()
+        for line, x, pyramid in self.lines:
+            if numpy.all(x[1:] >= x[:-1]):
+                start = max(int(numpy.searchsorted(x, xmin, 'left')) - 1, 0)
+                stop = int(numpy.searchsorted(x, xmax, 'right')) + 1
+            else:
+                start, stop = 0, len(x)
+            line.set_data(*lineData(x, pyramid, start, stop, pixels))
+        for image, pyramid in self.images:
+            # image columns are centered on their sample index
+            start = int(numpy.floor(min(xmin, xmax) + 0.5))
+            stop = int(numpy.ceil(max(xmin, xmax) + 0.5))
+            level, first, low, high, mean = pyramid.window(start, stop, pixels)
+            if mean.shape[1] == 0:
+                continue
+            image.set_data(mean)
+            image.set_extent(imageExtent(level, first, mean))
+
+
+def lineData(x, pyramid, start, stop, pixels):
+    """x / y points of samples [start, stop): the samples at level 0, else a min/max pair per bin."""
+    level, first, low, high, mean = pyramid.window(start, stop, pixels)
+    if level == 0:
+        return x[first:first + low.shape[1]], low[0]
+    binX = x[numpy.arange(first, first + low.shape[1]) << level]
+    xs = numpy.repeat(binX, 2)
+    ys = numpy.column_stack((low[0], high[0])).reshape(-1)
+    # keep the last sample so the line ends where the data ends
+    last = min(stop, len(x)) - 1
+    return numpy.append(xs, x[last]), numpy.append(ys, pyramid.levels[0][0][0, last])
+
+
+def imageExtent(level, first, mean):
+    # (left, right, bottom, top) in sample index units, as imshow uses without an extent
+    return ((first << level) - 0.5, ((first + mean.shape[1]) << level) - 0.5, mean.shape[0] - 0.5, -0.5)
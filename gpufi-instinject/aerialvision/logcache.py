@@ -0,0 +1,195 @@
+#!/usr/bin/env python
+
+# On-disk cache of organized visualizer logs.
+#
+# The stat variables that organizedata.organizedata returns for a log are
+# stored in one uncompressed .npz file under ~/.gpgpu_sim/aerialvision/cache
+# (next to recentfiles.txt): every array becomes an .npz member and a JSON
+# manifest records how to rebuild the variables (array.array, lists, dicts and
+# the variable attributes) around them.  The cache key covers the log's path,
+# size and mtime, the contents of variables.txt, the CFLOG options and the
+# CFLOG source files, so a changed log or stat definition is re-parsed.
+#
+# This module is kept valid for both Python 2 and Python 3.
+
+import array
+import hashlib
+import json
+import numbers
+import os
+import os.path
+
+import numpy
+
+import variableclasses as vc
+
+CACHE_VERSION = 1
+MAX_ENTRIES = 16
+
+userSettingPath = os.path.join(os.environ['HOME'], '.gpgpu_sim', 'aerialvision')
+cachePath = os.path.join(userSettingPath, 'cache')
+
+global useCache
+useCache = 1
+
+DATATYPES = {'int': int, 'float': float}
+
+
+class Unsupported(Exception):
+    pass
+
+
+def fileIdentity(filename):
+    if not filename:
+        return None
+    try:
+        st = os.stat(filename)
+    except OSError:
+        return [filename]
+    return [os.path.abspath(filename), st.st_size, st.st_mtime]
+
+
+def cacheFile(filename, settings):
+    """Path of the cache entry for a log and the options it was organized with."""
+    h = hashlib.sha1()
+    key = [CACHE_VERSION, fileIdentity(filename)] + [fileIdentity(s) if isinstance(s, str) else s for s in settings]
+    h.update(json.dumps(key).encode('utf-8'))
+    try:
+        with open(os.path.join(userSettingPath, 'variables.txt'), 'rb') as f:
+            h.update(f.read())
+    except IOError:
+        pass
+    return os.path.join(cachePath, h.hexdigest() + '.npz')
+
+
+def toStr(s):
+    # json gives unicode strings on Python 2
+    if not isinstance(s, str):
+        return s.encode('utf-8')
+    return s
+
+
+def encode(obj, arrays):
+    if isinstance(obj, numpy.ndarray):
+        key = 'a%d' % len(arrays)
+        arrays[key] = obj
+        return {'t': 'nd', 'k': key}
+    if isinstance(obj, array.array):
+        key = 'a%d' % len(arrays)
+        arrays[key] = numpy.frombuffer(obj, dtype=numpy.dtype(obj.typecode)) if len(obj) else numpy.array([], obj.typecode)
+        return {'t': 'aa', 'c': obj.typecode, 'k': key}
+    if isinstance(obj, vc.variable):
+        attrs = {}
+        for name, value in obj.__dict__.items():
+            if name == 'datatype':
+                continue
+            attrs[name] = encode(value, arrays)
+        datatype = [n for n, t in DATATYPES.items() if obj.datatype is t]
+        if len(datatype) != 1:
+            raise Unsupported('datatype %r' % obj.datatype)
+        return {'t': 'var', 'v': attrs, 'd': datatype[0]}
+    if isinstance(obj, list):
+        # a flat list of numbers of one type (e.g. averagemflatency) is stored as one array
+        kinds = set(type(x) for x in obj)
+        if len(obj) and len(kinds) == 1 and kinds.pop() in (int, float):
+            key = 'a%d' % len(arrays)
+            arrays[key] = numpy.array(obj)
+            return {'t': 'pl', 'k': key}
+        return {'t': 'list', 'v': [encode(x, arrays) for x in obj]}
+    if isinstance(obj, dict):
+        if not all(isinstance(k, str) for k in obj):
+            raise Unsupported('dict key')
+        return {'t': 'dict', 'v': [[k, encode(v, arrays)] for k, v in obj.items()]}
+    if isinstance(obj, numbers.Number) and not isinstance(obj, complex):
+        return {'t': 'v', 'v': obj.item() if isinstance(obj, numpy.generic) else obj}
+    if obj is None or isinstance(obj, str):
+        return {'t': 'v', 'v': obj}
+    raise Unsupported(type(obj).__name__)
+
+
+def decode(spec, arrays):
+    t = spec['t']
+    if t == 'nd':
+        return arrays[spec['k']]
+    if t == 'aa':
+        organized = array.array(toStr(spec['c']))
+        data = arrays[spec['k']].tobytes()
+        if hasattr(organized, 'frombytes'):
+            organized.frombytes(data)
+        else:
+            organized.fromstring(data)
+        return organized
+    if t == 'var':
+        var = vc.variable('', 1, 0)
+        for name, value in spec['v'].items():
+            setattr(var, toStr(name), decode(value, arrays))
+        var.datatype = DATATYPES[spec['d']]
+        return var
+    if t == 'pl':
+        return arrays[spec['k']].tolist()
+    if t == 'list':
+        return [decode(x, arrays) for x in spec['v']]
+    if t == 'dict':
+        return dict((toStr(k), decode(v, arrays)) for k, v in spec['v'])
+    value = spec['v']
+    if value is not None and not isinstance(value, numbers.Number):
+        value = toStr(value)
+    return value
+
+
+def load(filename, settings):
+    """Organized stat variables of the log from the cache, or None."""
+    if not useCache:
+        return None
+    try:
+        path = cacheFile(filename, settings)
+        if not os.path.exists(path):
+            return None
+        npz = numpy.load(path)
+        try:
+            arrays = dict((k, npz[k]) for k in npz.files)
+        finally:
+            npz.close()
+        manifest = json.loads(arrays.pop('manifest').tobytes().decode('utf-8'))
+        fileVars = decode(manifest, arrays)
+        os.utime(path, None)
+    except Exception as e:
+        print("Could not read the cached copy of %s (%s), parsing it again" % (filename, e))
+        return None
+    print("Loaded %s from the cache %s" % (filename, path))
+    return fileVars
+
+
+def save(filename, settings, fileVars):
+    if not useCache:
+        return
+    try:
+        arrays = {}
+        manifest = encode(fileVars, arrays)
+        arrays['manifest'] = numpy.frombuffer(json.dumps(manifest).encode('utf-8'), numpy.uint8)
+        if not os.path.exists(cachePath):
+            os.makedirs(cachePath)
+        path = cacheFile(filename, settings)
+        tmp = path + '.tmp'
+        with open(tmp, 'wb') as f:
+            numpy.savez(f, **arrays)
+        os.rename(tmp, path)
+    except Exception as e:
+        print("Could not cache %s: %s" % (filename, e))
+        return
+    prune()
+
+
+def prune():
+    """Keep the MAX_ENTRIES most recently used cache entries."""
+    entries = []
+    for name in os.listdir(cachePath):
+        if name.endswith('.npz'):
+            path = os.path.join(cachePath, name)
+            entries.append((os.path.getmtime(path), path))
+    entries.sort(reverse=True)
+    for mtime, path in entries[MAX_ENTRIES:]:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
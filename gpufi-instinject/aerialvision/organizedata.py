@@ -64,8 +64,9 @@ import os
 import array
 #from numpy import array
 import numpy
-import lexyacctexteditor
+import sourcemap
 import variableclasses as vc
+import ingest
 
 global convertCFLog2CUDAsrc
 global skipCFLog
@@ -86,7 +87,9 @@ def setCFLOGInfoFiles(sourceViewFileList):
     if CFLOGptxFile == '' and len(sourceViewFileList[1]) > 0:
         CFLOGptxFile = sourceViewFileList[1][0]
 
-def organizedata(fileVars):
+# organizedCycle: when only some stats of a log are organized (see lazyload.py),
+# the globalCycle variable of the log that was organized before
+def organizedata(fileVars, organizedCycle=None):
 
     organizeFunction = {
         'scalar':OrganizeScalar,        # Scalar data
@@ -113,8 +116,12 @@ def organizedata(fileVars):
   
     # Custom routines to organize stat data into internal format
     if fileVars.has_key('averagemflatency'):
+        if organizedCycle is None:
+            organizedCycle = fileVars['globalCycle']
+        if isinstance(fileVars['averagemflatency'].data, ingest.SampleRows):
+            fileVars['averagemflatency'].data = fileVars['averagemflatency'].data.toList()
         zeros = []
-        for count in range(len(fileVars['averagemflatency'].data),len(fileVars['globalCycle'].data)):
+        for count in range(len(fileVars['averagemflatency'].data),len(organizedCycle.data)):
             zeros.append(0)
         fileVars['averagemflatency'].data = zeros + fileVars['averagemflatency'].data
 
@@ -127,160 +134,158 @@ def organizedata(fileVars):
 
         if parseCFLOGCUDA == 1:
             print "Obtaining PTX-to-CUDA Mapping from %s..." % ptxFile
-            map = lexyacctexteditor.ptxToCudaMapping(ptxFile.rstrip())
+            ptx2cuda = sourcemap.LineMap(ptxFile.rstrip()).ptx2cuda
             print "Obtaining Program Range from %s..." % statFile
-            maxStats = max(lexyacctexteditor.textEditorParseMe(statFile.rstrip()).keys())
-
-        if parseCFLOGCUDA == 1:
-            newMap = {}
-            for lines in map:
-                for ptxLines in map[lines]:
-                    newMap[ptxLines] = lines
-            print "    Total number of CUDA src lines = %s..." % len(newMap)
-            
-            markForDel = []
-            for ptxLines in newMap:
-                if ptxLines > maxStats:
-                    markForDel.append(ptxLines)
-            for lines in markForDel:
-                del newMap[lines]
-            print "    Number of touched CUDA src lines = %s..." % len(newMap)
+            maxStats = sourcemap.LineStats(statFile.rstrip()).maxLine()
+            print "    Total number of CUDA src lines = %s..." % len(ptx2cuda)
+            # PTX lines past the last one with stats are not part of the program
+            ptx2cuda = ptx2cuda[:maxStats + 1]
+            print "    Number of touched CUDA src lines = %s..." % len(ptx2cuda)
     
         fileVars['CFLOGglobalPTX'] = vc.variable('',2,0)
         fileVars['CFLOGglobalCUDA'] = vc.variable('',2,0)
         
-        count = 0
+        globalPTX = None
+        globalCUDA = None
         for iter in fileVars['CFLOG']:
 
             print "Organizing data for %s" % iter
 
+            ptxMatrix = CFLOGOrganizePTX(fileVars['CFLOG'][iter].data, fileVars['CFLOG'][iter].maxPC)
             fileVars[iter + 'PTX'] = fileVars['CFLOG'][iter]
-            fileVars[iter + 'PTX'].data = CFLOGOrganizePTX(fileVars['CFLOG'][iter].data, fileVars['CFLOG'][iter].maxPC)
+            fileVars[iter + 'PTX'].data = [toArray(row, 'I') for row in ptxMatrix]
+            globalPTX = addPadded(globalPTX, ptxMatrix)
             if parseCFLOGCUDA == 1:
+                cudaMatrix = CFLOGOrganizeCuda(ptxMatrix, ptx2cuda)
                 fileVars[iter + 'CUDA'] = vc.variable('',2,0)
-                fileVars[iter + 'CUDA'].data = CFLOGOrganizeCuda(fileVars[iter + 'PTX'].data, newMap)
-
-            try:
-                if count == 0:
-                    fileVars['CFLOGglobalPTX'] = fileVars[iter + 'PTX']
-                    if parseCFLOGCUDA == 1:
-                        fileVars['CFLOGglobalCUDA'] = fileVars[iter + 'CUDA']
-                else:
-                    for rows in range(0, len(fileVars[iter + 'PTX'].data)):
-                        for columns in range(0, len(fileVars[iter + 'PTX'].data[rows])):
-                            fileVars['CFLOGglobalPTX'].data[rows][columns] += fileVars[iter + 'PTX'].data[rows][columns]
-                    if parseCFLOGCUDA == 1:
-                        for rows in range(0, len(fileVars[iter + 'CUDA'].data)):
-                            for columns in range(0, len(fileVars[iter + 'CUDA'].data[rows])): 
-                                fileVars['CFLOGglobalCUDA'].data[rows][columns] += fileVars[iter + 'CUDA'].data[rows][columns]
-            except:
-                print "Error in generating globalCFLog data"
-
-            count += 1
+                fileVars[iter + 'CUDA'].data = cudaMatrix.tolist()
+                globalCUDA = addPadded(globalCUDA, cudaMatrix)
+
+        # the global CFLOG is the sum over all kernels, as whole matrices
+        if globalPTX is not None:
+            fileVars['CFLOGglobalPTX'].data = [toArray(row, 'I') for row in globalPTX]
+        if globalCUDA is not None:
+            fileVars['CFLOGglobalCUDA'].data = globalCUDA.tolist()
         del fileVars['CFLOG']
 
 
     return fileVars
 
 def OrganizeScalar(data, datatype_c):
+    if isinstance(data, ingest.SampleRows):
+        return toArray(numpy.concatenate(([0], data.flat())), datatype_c)
     organized = [0] + data;
     organized = array.array(datatype_c, organized)
     return organized;
 
-def nullOrganizedShader(nullVar, datatype_c):
-    #need to organize this array into usable information
-    count = 0
-    organized = []
-    
-    #determining how many shader cores are present
-    for x in reversed(nullVar):
-        if x != 'NULL':
-            count += 1
-        elif count != 0:
-            break
-    numPlots = count
-    count = 0
-    
-    #initializing 2D list
-    for x in range(0, numPlots):
-        organized.append(array.array(datatype_c, [0]))
-    
-    #filling up list appropriately
-    for x in range(0,(len(nullVar))):
-        if nullVar[x] == 'NULL':
-            while count < numPlots:
-                organized[count].append(0)
-                count += 1
-            count=0
-        else:
-            organized[count].append(nullVar[x])
-            count += 1
-
-    #for x in range(0,len(organized)):
-    #    organized[x] = [0] + organized[x]
-    
+# The organizers below work on the samples x values NumPy arrays of a
+# SampleRows (see ingest.py) and return the same containers as before: one
+# array.array per unit, each starting with a 0 sample.
+
+def toArray(values, datatype_c):
+    organized = array.array(datatype_c)
+    data = numpy.asarray(values).astype(numpy.dtype(datatype_c)).tobytes()
+    if hasattr(organized, 'frombytes'):
+        organized.frombytes(data)
+    else:
+        organized.fromstring(data)
     return organized
 
-def nullOrganizedStackedBar(nullVar, datatype_c):
-    organized = nullOrganizedShader(nullVar, datatype_c)
-
-    # group data points to improve display speed
-    if len(organized[0]) > 512:
-        n_data = len(organized[0]) // 512 + 1 
+# units x (1 + samples) matrix with the leading 0 sample; samples shorter than
+# the longest one are padded with zeros
+def unitMatrix(samples):
+    lengths = samples.rowLengths()
+    matrix = numpy.zeros((int(lengths.max()), len(lengths) + 1), samples.flat().dtype)
+    rows = samples.rows()
+    if rows is not None:
+        matrix[:, 1:] = rows.T
+    else:
+        sampleIndex = numpy.repeat(numpy.arange(len(lengths)), lengths)
+        unitIndex = numpy.arange(len(sampleIndex)) - numpy.repeat(samples.rowEnds() - lengths, lengths)
+        matrix[unitIndex, sampleIndex + 1] = samples.flat()
+    return matrix
+
+# {owner: array.array of [0] + the owner's values in log order}
+def groupValues(owners, values, datatype_c):
+    if len(owners) == 0:
+        return {}
+    order = numpy.argsort(owners, kind='mergesort')
+    owners = owners[order]
+    values = values[order]
+    bounds = numpy.flatnonzero(owners[1:] != owners[:-1]) + 1
+    starts = numpy.concatenate(([0], bounds)).tolist()
+    ends = numpy.concatenate((bounds, [len(owners)])).tolist()
+    grouped = {}
+    for start, end in zip(starts, ends):
+        grouped[owners[start].item()] = toArray(numpy.concatenate(([0], values[start:end])), datatype_c)
+    return grouped
+
+def nullOrganizedShader(samples, datatype_c):
+    # one row per shader core; the number of cores is the length of the longest sample
+    if len(samples) == 0:
+        return []
+    return [toArray(row, datatype_c) for row in unitMatrix(samples)]
+
+def nullOrganizedStackedBar(samples, datatype_c):
+    if len(samples) == 0:
+        return []
+    matrix = unitMatrix(samples)
+
+    # group data points to improve display speed: every n_data consecutive
+    # points (the leading 0 included) are averaged into one of newLen bins
+    if matrix.shape[1] > 512:
+        n_data = matrix.shape[1] // 512 + 1 
         newLen = 512
-        for row in range (0,len(organized)):
-            newy = array.array(datatype_c, [0 for col in range(newLen)])
-            for col in range(0, len(organized[row])):
-                newcol = col / n_data
-                newy[newcol] += organized[row][col]
-            for col in range(0, len(newy)):
-                newy[col] /= n_data 
-            organized[row] = newy
-
-    return organized
-    
-def nullOrganizedDram(nullVar, datatype_c):
-    organized = [array.array(datatype_c, [0])]
-    mem = 1
-    for iter in nullVar:
-        if iter == 'NULL':
-            mem = 1
-            continue
-        elif mem == 1:
-            memNum = iter
-            mem = 0
-            continue
+        padded = numpy.zeros((matrix.shape[0], newLen * n_data), numpy.float64 if datatype_c == 'f' else numpy.int64)
+        padded[:, :matrix.shape[1]] = matrix
+        matrix = padded.reshape(matrix.shape[0], newLen, n_data).sum(axis=2)
+        if datatype_c == 'f':
+            matrix = matrix / n_data
         else:
-            try:
-                organized[memNum].append(iter)
-            except:
-                organized.append(array.array(datatype_c, [0]))
-                organized[memNum].append(iter)
-    return organized
+            matrix = matrix // n_data
 
-def nullOrganizedDramV2(nullVar, datatype_c):
+    return [toArray(row, datatype_c) for row in matrix]
+    
+def nullOrganizedDram(samples, datatype_c):
+    # "<memory partition> <values>..."; one row per partition, partition 0 always present
+    lengths = samples.rowLengths()
+    starts = samples.rowEnds() - lengths
+    isValue = numpy.ones(samples.nvalues, bool)
+    isValue[starts] = False
+    memNum = samples.flat()[starts].astype(numpy.int64)
+    grouped = groupValues(numpy.repeat(memNum, lengths - 1), samples.flat()[isValue], datatype_c)
+    nMem = max(list(grouped.keys()) + [0]) + 1
+    return [grouped.get(mem, array.array(datatype_c, [0])) for mem in range(nMem)]
+
+def nullOrganizedDramV2(samples, datatype_c):
+    # "<chip> <bank> <values>..."; keyed by "chip.bank", only for samples that have values
+    lengths = samples.rowLengths()
+    keep = lengths > 2
+    starts = (samples.rowEnds() - lengths)[keep]
+    counts = lengths[keep] - 2
+    values = samples.flat()
+    sampleIndex = numpy.repeat(numpy.arange(len(counts)), counts)
+    position = numpy.arange(len(sampleIndex)) - numpy.repeat(numpy.cumsum(counts) - counts, counts)
+    if len(starts) == 0:
+        return {}
+    chips = values[starts]
+    banks = values[starts + 1]
+    # number every distinct (chip, bank) pair
+    if values.dtype.kind in 'iu':
+        bankSpan = int(banks.max() - banks.min()) + 1
+        pairCode = (chips - chips.min()) * bankSpan + (banks - banks.min())
+        codes, pairIndex = numpy.unique(pairCode, return_inverse=True)
+    else:
+        codes, pairIndex = numpy.unique(numpy.stack((chips, banks), axis=1), axis=0, return_inverse=True)
+    pairIndex = pairIndex.reshape(-1)
+    # first sample of every pair gives its chip and bank number
+    first = numpy.zeros(len(codes), numpy.int64)
+    first[pairIndex[::-1]] = numpy.arange(len(pairIndex))[::-1]
+    grouped = groupValues(pairIndex[sampleIndex], values[starts[sampleIndex] + 2 + position], datatype_c)
     organized = {}
-    mem = 1
-    for iter in nullVar:
-        if iter == 'NULL':
-            mem = 1
-            continue
-        elif mem == 1:
-            ChipNum = iter
-            mem += 1
-            continue
-        elif mem == 2:
-            BankNum = iter
-            mem = 0
-            continue
-        else:
-            try:
-                key = str(ChipNum) + '.' + str(BankNum)
-                organized[key].append(iter)
-            except:
-                organized[key] = array.array(datatype_c, [0])
-                organized[key].append(iter)
-
+    for index, sample in enumerate(first.tolist()):
+        key = str(chips[sample].item()) + '.' + str(banks[sample].item())
+        organized[key] = grouped[index]
     return organized
 
 def OrganizeSparse(variable, datatype_c):
@@ -293,56 +298,59 @@ def OrganizeSparse(variable, datatype_c):
 
     return organized
 
+# (maxPC + 1) x samples matrix of thread counts, scattered in one step from the
+# per-sample pc[] / threadcount[] arrays kept by ingest.py
 def CFLOGOrganizePTX(list, maxPC):
-    count = 0
-    
-    organizedThreadCount = list[1]
     organizedPC = list[0]
+    organizedThreadCount = list[1]
 
     nCycles = len(organizedPC)
-    final_template = [0 for cycle in range(nCycles)]
-    final = [array.array('I', final_template) for pc in range(maxPC + 1)] # fill the 2D array with zeros
-
-    for cycle in range(0, nCycles):
-        pcList = organizedPC[cycle]
-        threadCountList = organizedThreadCount[cycle] 
-        for n in range(0, len(pcList)):
-            final[pcList[n]][cycle] = threadCountList[n]
-    
+    final = numpy.zeros((maxPC + 1, nCycles), numpy.uint32)
+    lengths = [len(pcList) for pcList in organizedPC]
+    if sum(lengths) == 0:
+        return final
+
+    pc = numpy.concatenate(organizedPC).astype(numpy.int64)
+    cycle = numpy.repeat(numpy.arange(nCycles), lengths)
+    final[pc, cycle] = numpy.concatenate(organizedThreadCount)
     return final
 
-def CFLOGOrganizeCuda(list, ptx2cudamap):
-    #We need to aggregate lines of PTX together
-    cudaMaxLineNo = max(ptx2cudamap.keys())
-    tmp = {}
-    #need to fill up the final matrix appropriately
-
-    nSamples = len(list[0])
-
-    # create a dictionary of empty data array (one array per cuda source line)
-    for ptxline, cudaline in ptx2cudamap.iteritems():
-        if tmp.has_key(cudaline):
-            pass
-        else:
-            tmp[cudaline] = [0 for lengthData in range(nSamples)]
-
+# cuda lines x samples matrix: every PTX row is added to the row of the CUDA
+# source line it maps to, for the lines min(cuda line) .. max(cuda line) - 1
+def CFLOGOrganizeCuda(ptxMatrix, ptx2cuda):
+    nSamples = ptxMatrix.shape[1]
+    if len(ptx2cuda) == 0:
+        return numpy.zeros((0, nSamples), numpy.int64)
+    ptxLines = numpy.arange(len(ptx2cuda))
+    cudaLines = numpy.asarray(ptx2cuda, numpy.int64)
+
+    firstLine = cudaLines.min()
+    final = numpy.zeros((cudaLines.max() - firstLine, nSamples), numpy.int64)
+    # PTX lines without any sample count nothing
+    keep = (cudaLines - firstLine < len(final)) & (ptxLines < len(ptxMatrix))
+    ptxLines = ptxLines[keep]
+    cudaLines = cudaLines[keep] - firstLine
+    if len(cudaLines) == 0:
+        return final
+    # one reduction over the PTX rows sorted by CUDA line
+    order = numpy.argsort(cudaLines, kind='mergesort')
+    cudaLines = cudaLines[order]
+    starts = numpy.concatenate(([0], numpy.flatnonzero(cudaLines[1:] != cudaLines[:-1]) + 1))
+    final[cudaLines[starts]] = numpy.add.reduceat(ptxMatrix[ptxLines[order]].astype(numpy.int64), starts, axis=0)
+    return final
 
-    for cudaline in tmp:
-        for ptxLines, mapped_cudaline in ptx2cudamap.iteritems():
-            if mapped_cudaline == cudaline:
-                for lengthData in range(nSamples):
-                    tmp[cudaline][lengthData] += list[ptxLines][lengthData]
+# total + matrix, padding the smaller one with zeros (kernels may have a different maxPC)
+def addPadded(total, matrix):
+    if total is None:
+        return matrix.astype(numpy.int64)
+    shape = (max(total.shape[0], matrix.shape[0]), max(total.shape[1], matrix.shape[1]))
+    if total.shape != shape:
+        grown = numpy.zeros(shape, numpy.int64)
+        grown[:total.shape[0], :total.shape[1]] = total
+        total = grown
+    total[:matrix.shape[0], :matrix.shape[1]] += matrix
+    return total
 
-    
-    final = []           
-    for iter in range(min(tmp.keys()),max(tmp.keys())):
-        if tmp.has_key(iter):
-            final.append(tmp[iter])            
-        else:
-            final.append([0 for lengthData in range(nSamples)])
-
-    return final
-                
 
 #def stackedBar(nullVar):
 #    #Need to initialize organize ar
@@ -0,0 +1,181 @@
+#!/usr/bin/env python
+
+# PTX-to-CUDA line mapping and per-PTX-line stats for the source view and the
+# CFLOG CUDA histograms.
+#
+# LineMap reads a PTX file in large chunks and only looks at the ".loc" lines:
+# every PTX line belongs to the CUDA line of the last ".loc" above it (the
+# ".loc" line itself still belongs to the previous one, line numbers start
+# at 0, as lexyacctexteditor.ptxToCudaMapping always counted them).  The result
+# is kept as NumPy arrays: ptx2cuda[ptx line] = CUDA line, and the inverse in
+# CSR form, i.e. the PTX lines of cudaLines[i] are
+# ptxLines[offsets[i]:offsets[i + 1]].
+#
+# LineStats reads the per-PTX-line stats file written by GPGPU-Sim
+# ("<file>.ptx <line> : <count> <latency> ...") with str.split instead of a
+# PLY parser per line: lines[i] is a PTX line number and values[i] its stats
+# (lengths[i] of them).
+#
+# Both are stored next to the file they were read from (<file>.avmap.npz,
+# <file>.avstats.npz) together with the size and mtime of that file, and read
+# from there while the file is unchanged.  If the directory is not writable
+# the arrays are just rebuilt the next time.
+#
+# This module is kept valid for both Python 2 and Python 3.
+
+import os
+import re
+
+import numpy
+
+import ingest
+import logcache
+
+CACHE_VERSION = 1
+
+RE_LOC = re.compile(r'\.loc[^\S\n]+(\d+)[^\S\n]+(\d+)[^\S\n]+(\d+)')
+
+
+class LineMap(object):
+    """PTX line -> CUDA line of a PTX file, and the PTX lines of every CUDA line."""
+
+    def __init__(self, filename):
+        arrays = cached(filename, '.avmap.npz', buildLineMap)
+        self.ptx2cuda = arrays['ptx2cuda']
+        self.cudaLines = arrays['cudaLines']
+        self.offsets = arrays['offsets']
+        self.ptxLines = arrays['ptxLines']
+
+    def ptxLinesOf(self, cudaLine):
+        i = numpy.searchsorted(self.cudaLines, cudaLine)
+        if i == len(self.cudaLines) or self.cudaLines[i] != cudaLine:
+            return self.ptxLines[0:0]
+        return self.ptxLines[self.offsets[i]:self.offsets[i + 1]]
+
+    def toDict(self):
+        """{CUDA line: [PTX lines]}, as ptxToCudaMapping returns it."""
+        ptxLines = self.ptxLines.tolist()
+        offsets = self.offsets.tolist()
+        return dict((cudaLine, ptxLines[offsets[i]:offsets[i + 1]])
+                    for i, cudaLine in enumerate(self.cudaLines.tolist()))
+
+
+def buildLineMap(filename):
+    # (first PTX line, CUDA line) of every run of lines between two .loc
+    starts = [0]
+    locs = [0]
+    nLines = 0
+    for offset, text in ingest.readChunks(filename):
+        pos = 0
+        line = nLines
+        for m in RE_LOC.finditer(text):
+            line += text.count('\n', pos, m.start())
+            pos = m.start()
+            # the line after the .loc is the first one of the new CUDA line;
+            # only the first .loc of a line counts
+            if starts[-1] != line + 1:
+                starts.append(line + 1)
+                locs.append(int(m.group(2)))
+        nLines += text.count('\n')
+        if not text.endswith('\n'):
+            nLines += 1
+
+    starts = numpy.array(starts, numpy.int64)
+    locs = numpy.array(locs, numpy.int64)
+    lengths = numpy.diff(numpy.append(starts, max(nLines, starts[-1])))
+    ptx2cuda = numpy.repeat(locs, lengths)
+
+    order = numpy.argsort(ptx2cuda, kind='mergesort')
+    sortedLines = ptx2cuda[order]
+    first = numpy.flatnonzero(numpy.diff(sortedLines)) + 1
+    if len(sortedLines):
+        first = numpy.append(0, first)
+    return {'ptx2cuda': ptx2cuda,
+            'cudaLines': sortedLines[first],
+            'offsets': numpy.append(first, len(sortedLines)),
+            'ptxLines': order}
+
+
+class LineStats(object):
+    """The stats of every PTX line in a per-PTX-line stats file."""
+
+    def __init__(self, filename):
+        arrays = cached(filename, '.avstats.npz', buildLineStats)
+        self.lines = arrays['lines']
+        self.values = arrays['values']
+        # rows shorter than the longest one are padded with zeros
+        self.lengths = arrays['lengths']
+        self.statNames = [str(name) for name in arrays['statNames']]
+
+    def maxLine(self):
+        """Last PTX line with stats, -1 if there are none."""
+        if len(self.lines) == 0:
+            return -1
+        return int(self.lines.max())
+
+    def toDict(self):
+        """{PTX line: [stats]}, as textEditorParseMe returns it."""
+        return dict((line, row[:length]) for line, row, length
+                    in zip(self.lines.tolist(), self.values.tolist(), self.lengths.tolist()))
+
+
+def buildLineStats(filename):
+    statNames = []
+    numbers = []
+    seqs = []
+    for offset, text in ingest.readChunks(filename):
+        for line in text.split('\n'):
+            if line.startswith('kernel line :'):
+                statNames = line.split()[3:]
+                continue
+            location, sep, values = line.partition(':')
+            location = location.split()
+            if not sep or len(location) != 2 or not location[0].endswith('.ptx') or not location[1].isdigit():
+                continue
+            numbers.append(int(location[1]))
+            seqs.append(values)
+
+    # all stats in one fromstring call, then one row per line
+    values, lengths = ingest.parseNumbers(seqs, int, filename)
+    numbers = numpy.array(numbers, numpy.int64)
+    width = int(lengths.max()) if len(lengths) else 0
+    matrix = numpy.zeros((len(numbers), width), numpy.int64)
+    rows = numpy.repeat(numpy.arange(len(numbers)), lengths)
+    matrix[rows, numpy.arange(len(values)) - numpy.repeat(numpy.cumsum(lengths) - lengths, lengths)] = values
+
+    # a line seen again (another kernel of the file) replaces the earlier one
+    lines, last = numpy.unique(numbers[::-1], return_index=True)
+    keep = len(numbers) - 1 - last
+    return {'lines': lines, 'values': matrix[keep], 'lengths': lengths[keep],
+            'statNames': numpy.array(statNames, str)}
+
+
+def cached(filename, suffix, build):
+    """build(filename), or its arrays from <filename><suffix> if that was made from the same file."""
+    st = os.stat(filename)
+    identity = numpy.array([CACHE_VERSION, st.st_size, st.st_mtime], numpy.float64)
+    path = filename + suffix
+    if logcache.useCache:
+        try:
+            npz = numpy.load(path)
+            try:
+                if numpy.array_equal(npz['identity'], identity):
+                    return dict((k, npz[k]) for k in npz.files if k != 'identity')
+            finally:
+                npz.close()
+        except Exception:
+            pass
+
+    arrays = build(filename)
+    if logcache.useCache:
+        tmp = path + '.tmp'
+        try:
+            with open(tmp, 'wb') as f:
+                numpy.savez(f, identity=identity, **arrays)
+            os.rename(tmp, path)
+        except Exception:
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+    return arrays
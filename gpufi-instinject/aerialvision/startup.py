@@ -68,8 +68,13 @@ import lexyacc
 import guiclasses
 import tkFileDialog as Fd
 import organizedata
+import ingest
+import logcache
+import lazyload
 import os
 import os.path
+import time
+import multiprocessing
 
 
 global TabsForGraphs
@@ -84,7 +89,130 @@ TabsForText = []
 
 userSettingPath = os.path.join(os.environ['HOME'], '.gpgpu_sim', 'aerialvision')
 
+# worker processes used to load several log files at once
+maxLoadProcesses = multiprocessing.cpu_count()
+
+# The options a log is parsed and organized with (part of the parsed-log cache key)
+def logSettings():
+    return [lexyacc.skipCFLOGParsing, organizedata.skipCFLog, organizedata.convertCFLog2CUDAsrc,
+            organizedata.CFLOGptxFile.rstrip(), organizedata.CFLOGInsnInfoFile.rstrip()]
+
+# Parse, drop empty stats and organize one log file, or map it from the parsed-log cache
+def loadLogFile(filename):
+    settings = logSettings()
+    fileVars = logcache.load(filename, settings)
+    if fileVars is not None:
+        return fileVars
+    # index only; stats are read when they are plotted (not cached)
+    if lazyload.loadOnDemand == 1:
+        return lazyload.LazyLog(filename).fileVars
+
+    fileVars = lexyacc.parseMe(filename)
+    markForDel = []
+    for variables in fileVars:
+        if variables == 'CFLOG':
+            continue
+        if variables == 'EXTVARS':
+            continue
+        if checkEmpty(fileVars[variables].data) == 0:
+            markForDel.append(variables)
+    for variables in markForDel:
+        del fileVars[variables]
+
+    fileVars = organizedata.organizedata(fileVars)
+    logcache.save(filename, settings, fileVars)
+    return fileVars
+
+# Load several log files, the ones that are not in the parsed-log cache in
+# parallel: each worker process parses and organizes one log and stores it in
+# the cache, where it is mapped from once the worker is done (the organized
+# data comes back pickled when the cache is off).  progress(filename, status)
+# is called as the files are loaded.
+def loadLogFiles(filenames, progress=None):
+    if progress is None:
+        progress = lambda filename, status: None
+    settings = logSettings()
+    loaded = {}
+    toParse = []
+    for filename in filenames:
+        fileVars = logcache.load(filename, settings)
+        if fileVars is not None:
+            loaded[filename] = fileVars
+            progress(filename, 'loaded from the cache')
+        else:
+            toParse.append(filename)
+
+    # a log loaded on demand is only indexed, a single log gains nothing from a worker
+    if len(toParse) < 2 or lazyload.loadOnDemand == 1 or maxLoadProcesses < 2:
+        for filename in toParse:
+            progress(filename, 'loading...')
+            start = time.time()
+            loaded[filename] = loadLogFile(filename)
+            progress(filename, 'done (%.1f s)' % (time.time() - start))
+        return loaded
+
+    options = settings + [logcache.useCache]
+    pool = multiprocessing.Pool(min(len(toParse), maxLoadProcesses))
+    try:
+        for filename in toParse:
+            progress(filename, 'loading...')
+        start = time.time()
+        results = pool.imap_unordered(loadLogFileWorker, [(filename, options) for filename in toParse])
+        for n in range(len(toParse)):
+            while True:
+                try:
+                    filename, fileVars = results.next(0.2)
+                    break
+                except multiprocessing.TimeoutError:
+                    progress(None, '')
+            if fileVars is None:
+                fileVars = logcache.load(filename, settings)
+            if fileVars is None:
+                # dropped from the cache in the meantime
+                fileVars = loadLogFile(filename)
+            loaded[filename] = fileVars
+            progress(filename, 'done (%.1f s)' % (time.time() - start))
+    finally:
+        pool.terminate()
+    return loaded
+
+# Runs in a worker process of loadLogFiles
+def loadLogFileWorker(args):
+    filename, options = args
+    (lexyacc.skipCFLOGParsing, organizedata.skipCFLog, organizedata.convertCFLog2CUDAsrc,
+     organizedata.CFLOGptxFile, organizedata.CFLOGInsnInfoFile, logcache.useCache) = options
+    fileVars = loadLogFile(filename)
+    if logcache.useCache == 1 and os.path.exists(logcache.cacheFile(filename, logSettings())):
+        return filename, None
+    return filename, fileVars
+
+# A window listing the files being loaded, returns it and the progress function for loadLogFiles
+def loadProgressWindow(filenames):
+    window = Tk.Toplevel(bg = 'white')
+    window.title("Loading Files")
+    labels = {}
+    for files in filenames:
+        labels[files] = Tk.Label(window, text = files + ': waiting', bg = 'white', anchor = Tk.W)
+        labels[files].pack(side = Tk.TOP, fill = Tk.X, padx = 10)
+    def progress(filename, status):
+        if filename in labels:
+            labels[filename].config(text = filename + ': ' + status)
+        window.update()
+    return window, progress
+
+def loadLogFilesWithProgress(filenames):
+    if len(filenames) == 0:
+        return {}
+    window, progress = loadProgressWindow(filenames)
+    try:
+        return loadLogFiles(filenames, progress)
+    finally:
+        window.destroy()
+
 def checkEmpty(list):
+    found = ingest.hasData(list)
+    if found is not None:
+        return found
     bool = 0
     try:
         if type(list[0]).__name__ == 'list':
@@ -206,6 +334,11 @@ def fileInput(cl_files=None):
     cflog2cuda.set(0)
     cbCFLog2CUDAsrc = Tk.Checkbutton(specChoices, text = "Convert CFLog to CUDA source line", bg = 'white', variable = cflog2cuda)
     cbCFLog2CUDAsrc.pack(side = Tk.LEFT)
+    # check box to index the logs and only read the stats that are plotted
+    loadOnDemandVar = Tk.IntVar()
+    loadOnDemandVar.set(0)
+    cbLoadOnDemand = Tk.Checkbutton(specChoices, text = "Load stats on demand", bg = 'white', variable = loadOnDemandVar)
+    cbLoadOnDemand.pack(side = Tk.LEFT)
     
     ############### The source code view side ##################################
     
@@ -299,7 +432,7 @@ def fileInput(cl_files=None):
     cFilesAddedTEStat.pack(side = Tk.LEFT, padx = 15)
     
     
-    bSUBMIT = Tk.Button(root, text = "Submit", font = ("Gill Sans MT", 12, "bold"), width = 10, command = lambda: submitClicked(instance, num.get(), skipCFLogVar.get(), cflog2cuda.get(), [cFilesAddedTE, cFilesAddedTEPTX, cFilesAddedTEStat]))
+    bSUBMIT = Tk.Button(root, text = "Submit", font = ("Gill Sans MT", 12, "bold"), width = 10, command = lambda: submitClicked(instance, num.get(), skipCFLogVar.get(), cflog2cuda.get(), loadOnDemandVar.get(), [cFilesAddedTE, cFilesAddedTEPTX, cFilesAddedTEStat]))
     bSUBMIT.pack(pady = 5)
     
     
@@ -406,7 +539,7 @@ def errorMsg(string):
     bError = Tk.Button(error, text = "OK", font = ("Times New Roman", 14), command = (lambda: error.destroy()))
     bError.pack(pady = 10)
    
-def submitClicked(instance, num, skipcflog, cflog2cuda, listboxes):
+def submitClicked(instance, num, skipcflog, cflog2cuda, loadondemand, listboxes):
     
     for iter in range(0, len(listboxes)):
         if iter == 0:
@@ -419,6 +552,7 @@ def submitClicked(instance, num, skipcflog, cflog2cuda, listboxes):
     organizedata.skipCFLog = skipcflog
     lexyacc.skipCFLOGParsing = skipcflog
     organizedata.convertCFLog2CUDAsrc = cflog2cuda
+    lazyload.loadOnDemand = loadondemand
 
     start = 0
     if (not os.path.exists(userSettingPath)):
@@ -563,29 +697,8 @@ def startup(res, TEFILES):
     
     # Here we extract the available data that can be graphed by the user
 
-    for files in Filenames:
-        vars[files] = lexyacc.parseMe(files)
-    
-    markForDel = {}
-    
-     
-    for files in vars:
-        markForDel[files] = []
-        for variables in vars[files]:
-            if variables == 'CFLOG':
-                continue
-            if variables == 'EXTVARS':
-                continue
-            if checkEmpty(vars[files][variables].data) == 0:
-                markForDel[files].append(variables)
-
-    for files in markForDel:
-        for variables in markForDel[files]:
-            del vars[files][variables]
-
     organizedata.setCFLOGInfoFiles(TEFILES)
-    for files in Filenames:
-        vars[files] = organizedata.organizedata(vars[files])
+    vars.update(loadLogFilesWithProgress(Filenames))
 
     graphAddTab(vars, graphTabs, res, eAddTab)
 
@@ -823,22 +936,13 @@ def manageFilesSubmit(window, listbox):
     global vars
     submittedEntries = listbox.get(0, Tk.END)
     count = 0
+    toLoad = []
     for entries in submittedEntries:
         if entries[0:3] == 'Add':
             #try:
             test = open(entries[10:], 'r')
             Filenames.append(entries[10:])
-            vars[entries[10:]] = lexyacc.parseMe(entries[10:])
-            
-            markForDel = []
-            for variables in vars[entries[10:]]:
-                if (variables != 'CFLOG' and checkEmpty(vars[entries[10:]][variables].data) == 0):
-                    markForDel.append(variables)
-    
-            for variables in markForDel:
-                del vars[entries[10:]][variables]
-        
-            vars[entries[10:]] = organizedata.organizedata(vars[entries[10:]])
+            toLoad.append(entries[10:])
                 
                 
                 
@@ -847,17 +951,7 @@ def manageFilesSubmit(window, listbox):
         
         elif entries[0:7] == 'Refresh':
             del vars[entries[14:]]
-            vars[entries[14:]] = lexyacc.parseMe(entries[14:])
-            
-            markForDel = []
-            for variables in vars[entries[14:]]:
-                if checkEmpty(vars[entries[14:]][variables].data) == 0:
-                    markForDel.append(variables)
-    
-            for variables in markForDel:
-                del vars[entries[14:]][variables]
-        
-            vars[entries[14:]] = organizedata.organizedata(vars[entries[14:]])
+            toLoad.append(entries[14:])
             
     
         elif entries[0:6] == 'Delete':
@@ -866,6 +960,10 @@ def manageFilesSubmit(window, listbox):
         
         else:
             errorMsg('This is a bug... please submit bug report')
+
+    # the added and refreshed files are loaded together
+    toLoad = [files for n, files in enumerate(toLoad) if files in Filenames and files not in toLoad[:n]]
+    vars.update(loadLogFilesWithProgress(toLoad))
             
     window.destroy() 
     
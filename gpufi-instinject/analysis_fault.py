@@ -46,6 +46,8 @@ def parse_log(log_path: str):
     # 4) Results and parameters
     re_result = re.compile(r"^\[Run\s+(\d+)\]\s+(tmp\.out\d+):\s*(.*?)\s*$")
     re_params = re.compile(r"^\[INJ_PARAMS\]\s+\[Run\s+(\d+)\]\s+(tmp\.out\d+)\s+(.*)$")
+    # 5) Equivalence-class pruning: the run was not simulated past the flip
+    re_pruned = re.compile(r"\(pruned, equivalent to r(\d+)b(\d+)\)")
 
     latest_effects_by_pair = (
         {}
@@ -56,6 +58,7 @@ def parse_log(log_path: str):
 
     occ_counter = defaultdict(int)
     effects_occ, results_occ = {}, {}
+    pruned_occ = {}  # {inj_key: (rep_run_id, rep_name)}
 
     def _merge_unique(writers, readers):
         """Merge WRITER and READER; de-duplicate by (src, kernel, line, text)."""
@@ -102,7 +105,7 @@ def parse_log(log_path: str):
     # If the log file is missing, do not exit; return empty data
     if not os.path.exists(log_path):
         print(f"Warning: log file not found: {log_path}", file=sys.stderr)
-        return {}, {}, {}
+        return {}, {}, {}, {}
 
     with open(log_path, "r", encoding="utf-8", errors="ignore") as f:
         for raw in f:
@@ -220,10 +223,28 @@ def parse_log(log_path: str):
 
                 effects_occ[inj_key] = deepcopy(recs)
                 results_occ[inj_key] = res
+                mp = re_pruned.search(m.group(3))
+                if mp:
+                    pruned_occ[inj_key] = (int(mp.group(1)), f"tmp.out{mp.group(2)}")
                 continue
 
     flush_current_effects()
-    return effects_occ, results_occ, params_by_pair
+    resolve_equivalent(effects_occ, results_occ, pruned_occ)
+    return effects_occ, results_occ, params_by_pair, pruned_occ
+
+
+def resolve_equivalent(effects_occ, results_occ, pruned_occ):
+    """
+    Give every pruned injection the effects and outcome of its class
+    representative, so each class is weighted by its number of sampled members.
+    """
+    for inj_key, (rep_run, rep_name) in pruned_occ.items():
+        rep_key = (rep_run, rep_name, 1)
+        if rep_key not in results_occ:
+            # Representative not in this log: keep the member's own records
+            continue
+        effects_occ[inj_key] = deepcopy(effects_occ[rep_key])
+        results_occ[inj_key] = results_occ[rep_key]
 
 
 # -----------------------------
@@ -375,7 +396,7 @@ def main():
     base_dir = os.path.dirname(os.path.abspath(__file__))
     log_path = os.path.join(base_dir, "inst_exec.log")
 
-    effects_occ, results_occ, params_by_pair = parse_log(log_path)
+    effects_occ, results_occ, params_by_pair, pruned_occ = parse_log(log_path)
     total_sdc = sum(1 for v in results_occ.values() if v == "SDC")
     out_path = write_csv(
         args.app,
@@ -388,6 +409,8 @@ def main():
     )
     print(f"Wrote CSV: {out_path}")
     print(f"Total SDC: {total_sdc}")
+    if pruned_occ:
+        print(f"Pruned (equivalent) injections: {len(pruned_occ)} of {len(results_occ)}")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,21 @@
+#!/usr/bin/python
+#
+# File: aerialvision_batch.py
+#
+# Renders AerialVision time lapse plots without a display, see
+# aerialvision/batchrender.py for the options:
+#
+#   aerialvision_batch.py [options] LOGFILE STAT[:TYPE] ...
+
+import sys
+import os
+
+if not os.environ.get('GPGPUSIM_ROOT'):
+    print('please set your GPGPUSIM_ROOT environment variable to your GPGPU-Sim directory')
+    sys.exit(1)
+
+sys.path.append( os.environ['GPGPUSIM_ROOT'] + '/aerialvision/' )
+
+import batchrender
+
+sys.exit(batchrender.main(sys.argv[1:]))
@@ -12,8 +12,27 @@ INVALID_COMBOS_FILE=./invalid_param_combos.txt
 RUNS=4272
 COMPONENT_SET="0"
 BATCH=$(( $(grep -c ^processor /proc/cpuinfo) - 1 )) # -1 core for computer not to hang
+# worker slots granted by campaign_scheduler.py, re-read before every batch (empty: always BATCH)
+SLOTS_FILE=""
+# Memory admission: a run is only launched while the RSS of the runs in flight (each counted at least at
+# RUN_RSS_MB) plus RUN_RSS_MB for the new one stays under MEM_BUDGET_MB. 0: off; auto: 90% of MemAvailable
+MEM_BUDGET_MB=0
+# peak RSS of one simulator run (set by inst_fault_inject_exp.sh from the profiling run); raised by finished runs
+RUN_RSS_MB=0
 DELETE_LOGS=0 # if 1 then all logs will be deleted at the end of the script
 INJECT_BIT_FLIP_COUNT=1
+# 1: append a JSON-lines event per scheduled/started/finished run to EVENTS_FILE (see campaign_stats.py)
+TELEMETRY=1
+EVENTS_FILE=./campaign_events.jsonl
+# per-run sidecar with exit code, wall time and peak RSS, written next to each tmp.out<i>
+RUN_META_FILE=run.meta
+# 1: keep only the simulator output lines read by gather_results (see digest_filter) instead of the full stdout
+LOG_DIGEST=0
+# RAM-backed directory (e.g. /dev/shm) for the batches in flight; each finished batch is moved to ./logs<N>
+# (empty: write ./logs<N> directly)
+SCRATCH_DIR=""
+# GNU time is used for peak RSS when available; runs are still timed without it
+TIME_BIN=$(command -v /usr/bin/time 2>/dev/null)
 
 # Optional: specify PTX virtual register name(s) to inject (overrides index-based selection)
 # Examples: %f1, %r36, %rd7, %p2; multiple names can be colon-delimited like "%f1:%r36".
@@ -37,21 +56,49 @@ CUDA_UUT="./MatrixMultiplication wA 16 hA 16 wB 16 hB 16"
 # total cycles for all kernels
 CYCLES=3723
 # Get the exact cycles, max registers and SIMT cores used for each kernel with profile=1 
-# fix cycles.txt with kernel execution cycles
-# (e.g. seq 1 10 >> cycles.txt, or multiple seq commands if a kernel has multiple executions)
-# use the following command from profiling execution for easier creation of cycles.txt file
-# e.g. grep "_Z12lud_diagonalPfii" cycles.in | awk  '{ system("seq " $12 " " $18 ">> cycles.txt")}'
+# fix cycles.txt with kernel execution cycles, one "start-end" segment per line
+# (e.g. echo 1-10 >> cycles.txt, or one line per execution if a kernel has multiple executions;
+# kernel_domains.py cycles writes it from the profiling log). A legacy list with one cycle per line also works.
+# e.g. grep "_Z12lud_diagonalPfii" cycles.in | awk '{ print $12 "-" $18 }' >> cycles.txt
 CYCLES_FILE=./cycles.txt
-# File with aggregated danger region intervals copied from simulator logs
+# Launch domains "<uid> <start> <end> <kernel>" (kernel_domains.py extract); maps an injection cycle to its kernel
+KERNEL_DOMAINS_FILE=./kernel_domains.txt
+# File with aggregated danger region intervals (written by danger_regions.py extract)
 CYCLE_REGION_FILE=./cycle_region.txt
+# Binary index of CYCLE_REGION_FILE; preferred unless the text file is newer
+CYCLE_REGION_INDEX=./cycle_region.idx
 # 1: choose a cycle from the register's danger region intervals; 0: avoid them
 INJECT_WITHIN_DANGER_REGION=1
+# Register selection per injection (only with INJECT_WITHIN_DANGER_REGION=1, see register_sampling.py):
+#   uniform: shuf over register_used.txt; danger: proportional to danger-region length;
+#   neyman: proportional to danger length * SDC standard deviation observed so far
+REGISTER_SAMPLING=uniform
+# campaign ledger: scheduled registers (weighted modes) and "O <reg> <outcome> <kernel>" per classified run,
+# <kernel> being the kernel running at the injection cycle
+REG_ALLOC_FILE=./reg_alloc.txt
+# Sequential stopping (stop_rules.py): 1 stops scheduling once the confidence intervals below are
+# narrow enough; RUNS stays the upper bound
+STOP_RULE=0
+STOP_CONFIDENCE=0.95
+STOP_MARGIN=0.01 # max half-width of the SDC and DUE rate intervals
+STOP_P_MARGIN=0 # max half-width of p as computed by accel.py (0: p is not checked)
+STOP_R="" # R for p; empty: number of registers in register_used.txt
+STOP_SCOPE=overall # overall, register or kernel: also require the margin per register/kernel
+STOP_MIN_RUNS=100 # min classified injections per checked group
+STOP_CHECK_EVERY=1 # batches between two checks
+# Equivalence-class pruning (equivalence_classes.py): 1 ends a register injection right after the flip when an
+# injection into the same thread/value/bits with no read in between was already simulated, and reuses its outcome
+EQUIV_PRUNING=0
+EQUIV_CLASS_FILE=./equiv_classes.txt
 MAX_REGISTERS_USED=42
 SHADER_USED="0"
 SUCCESS_MSG='Fault Injection Test Success!'
 FAILED_MSG='Fault Injection Test Failed!'
 TIMEOUT_VAL=20s
 DATATYPE_SIZE=32
+# "<reg> <bits>" per declared PTX register (extract_registers.py); bit flips are drawn within each register's
+# width, DATATYPE_SIZE is used for registers not listed
+REGISTER_WIDTH_FILE=./register_width.txt
 # lmem and smem values are taken from gpgpu-sim ptx output per kernel
 # e.g. GPGPU-Sim PTX: Kernel '_Z9vectorAddPKdS0_Pdi' : regs=8, lmem=0, smem=0, cmem=380
 # if 0 put a random value > 0
@@ -79,6 +126,32 @@ kernel_n=0
 # in how many blocks (smems) to inject the bit flip
 blocks=1
 
+now_ms() {
+    date +%s%3N
+}
+
+emit_event() {
+    # emit_event <event> [key=value ...]; numeric values are written bare, everything else as a JSON string
+    [[ "${TELEMETRY}" -eq 1 ]] || return 0
+    local event="$1"
+    shift
+    local line="{\"ts_ms\":$(now_ms),\"event\":\"${event}\""
+    local kv key val
+    for kv in "$@"; do
+        key=${kv%%=*}
+        val=${kv#*=}
+        [[ -z "${val}" ]] && continue
+        if [[ "${val}" =~ ^-?[0-9]+(\.[0-9]+)?$ ]]; then
+            line+=",\"${key}\":${val}"
+        else
+            val=${val//\\/\\\\}
+            val=${val//\"/\\\"}
+            line+=",\"${key}\":\"${val}\""
+        fi
+    done
+    echo "${line}}" >> "${EVENTS_FILE}"
+}
+
 build_combo_key_from_vars() {
     # Build a canonical key string from currently selected variables
     # Keep ordering stable for matching with analysis_fault.py
@@ -88,6 +161,62 @@ build_combo_key_from_vars() {
     echo -n "reg_name=${REGISTER_NAME};reg_rand_n=${register_rand_n}"
 }
 
+register_width() {
+    # register_width <reg[:reg...]>: declared width in bits (the narrowest of several names), DATATYPE_SIZE if unknown
+    local width=""
+    if [[ -n "$1" && -s "${REGISTER_WIDTH_FILE}" ]]; then
+        width=$(awk -v names="$1" '
+            BEGIN { n = split(names, want, ":"); for (i = 1; i <= n; i++) keep[want[i]] = 1 }
+            ($1 in keep) && (min == "" || $2 < min) { min = $2 }
+            END { print min }' "${REGISTER_WIDTH_FILE}")
+    fi
+    echo "${width:-${DATATYPE_SIZE}}"
+}
+
+injection_kernel() {
+    # injection_kernel <cycle> <kernel_n>: kernel whose launch (among kernel_n, 0: all) runs at the injection
+    # cycle according to KERNEL_DOMAINS_FILE; "launch<kernel_n>" when the cycle is not in a known launch
+    local name=""
+    if [[ -s "${KERNEL_DOMAINS_FILE}" && "$1" =~ ^[0-9]+$ ]]; then
+        name=$(awk -v c="$1" -v uids="$2" '
+            BEGIN { n = split(uids, u, ":"); for (i = 1; i <= n; i++) if (u[i] != 0) { want[u[i]] = 1; nwant++ } }
+            NF >= 4 && c >= $2 && c <= $3 && (!nwant || ($1 in want)) {
+                $1 = $2 = $3 = ""; sub(/^ +/, ""); gsub(/[[:space:]]+/, "_"); print; exit
+            }' "${KERNEL_DOMAINS_FILE}")
+    fi
+    echo "${name:-launch${2:-0}}"
+}
+
+wide_register_count() {
+    # registers of register_used.txt that can take INJECT_BIT_FLIP_COUNT distinct bit flips
+    local reg n=0
+    while IFS= read -r reg; do
+        reg=${reg//$'\r'/}
+        [[ -n "${reg}" ]] && (( $(register_width "${reg}") >= INJECT_BIT_FLIP_COUNT )) && let n++
+    done < register_used.txt
+    echo ${n}
+}
+
+# Number of cycles in CYCLES_FILE (segments may not overlap)
+cycle_domain_size() {
+    awk '!/^[[:space:]]*(#|$)/ { n = split($1, p, "-"); total += (n > 1 ? p[2] : p[1]) - p[1] + 1 }
+        END { printf "%.0f\n", total }' "${CYCLES_FILE}"
+}
+
+# Uniform cycle of CYCLES_FILE: draw an offset, then walk the segments
+sample_cycle() {
+    if [[ "${CYCLE_DOMAIN_SIZE:-0}" -le 0 ]]; then
+        echo "Error: no cycles in ${CYCLES_FILE}" >&2
+        return 1
+    fi
+    awk -v pick="$(shuf -i 0-$((CYCLE_DOMAIN_SIZE - 1)) -n 1)" '
+        !/^[[:space:]]*(#|$)/ {
+            n = split($1, p, "-"); span = (n > 1 ? p[2] : p[1]) - p[1] + 1
+            if (pick < span) { printf "%.0f\n", p[1] + pick; exit }
+            pick -= span
+        }' "${CYCLES_FILE}"
+}
+
 select_cycle_for_register() {
     local reg_name="$1"
     local fallback_cycle="$2"
@@ -95,135 +224,27 @@ select_cycle_for_register() {
         echo "${fallback_cycle}"
         return
     fi
-    if [[ ! -f "${CYCLE_REGION_FILE}" ]]; then
+    if [[ ! -f "${CYCLE_REGION_INDEX}" && ! -f "${CYCLE_REGION_FILE}" ]]; then
         echo "${fallback_cycle}"
         return
     fi
-    local line
-    line=$(grep -F "reg=${reg_name} " "${CYCLE_REGION_FILE}" | head -n 1)
-    if [[ -z "${line}" ]]; then
-        echo "${fallback_cycle}"
-        return
-    fi
-    local intervals="${line#*cycles=}"
-    if [[ -z "${intervals}" ]]; then
-        echo "${fallback_cycle}"
+    local chosen_cycle
+    chosen_cycle=$(python3 danger_regions.py sample "${reg_name}" \
+        --index "${CYCLE_REGION_INDEX}" --text "${CYCLE_REGION_FILE}" \
+        --within "${INJECT_WITHIN_DANGER_REGION}" --cycles "${CYCLES_FILE}" \
+        --fallback "${fallback_cycle}")
+    if [[ -n "${chosen_cycle}" ]]; then
+        echo "${chosen_cycle}"
         return
     fi
 
-    if [[ "${INJECT_WITHIN_DANGER_REGION}" -eq 1 ]]; then
-        local chosen_cycle
-        chosen_cycle=$(python3 - "${intervals}" "${fallback_cycle}" <<'PY'
-import random
-import sys
-
-intervals = sys.argv[1].strip()
-fallback = sys.argv[2]
-
-def parse_ranges(spec):
-    ranges = []
-    for part in spec.split(','):
-        part = part.strip()
-        if not part:
-            continue
-        if '-' in part:
-            a, b = part.split('-', 1)
-        else:
-            a = b = part
-        try:
-            start = int(a)
-            end = int(b)
-        except ValueError:
-            continue
-        if end < start:
-            start, end = end, start
-        ranges.append((start, end))
-    return ranges
-
-ranges = parse_ranges(intervals)
-total = sum((end - start + 1) for start, end in ranges if end >= start)
-if total <= 0 or not ranges:
-    print(fallback)
-    sys.exit(0)
-
-pick = random.randint(0, total - 1)
-for start, end in ranges:
-    span = end - start + 1
-    if span <= 0:
-        continue
-    if pick < span:
-        print(start + pick)
-        break
-    pick -= span
-PY
-)
-        if [[ -n "${chosen_cycle}" ]]; then
-            echo "${chosen_cycle}"
-            return
-        fi
-    else
-        local chosen_cycle
-        chosen_cycle=$(python3 - "${intervals}" "${CYCLES_FILE}" "${fallback_cycle}" <<'PY'
-import random
-import sys
-
-intervals = sys.argv[1].strip()
-cycles_path = sys.argv[2]
-fallback = sys.argv[3]
-
-def parse_ranges(spec):
-    ranges = []
-    for part in spec.split(','):
-        part = part.strip()
-        if not part:
-            continue
-        if '-' in part:
-            a, b = part.split('-', 1)
-        else:
-            a = b = part
-        try:
-            start = int(a)
-            end = int(b)
-        except ValueError:
-            continue
-        if end < start:
-            start, end = end, start
-        ranges.append((start, end))
-    return ranges
-
-def in_range(val, ranges):
-    for start, end in ranges:
-        if start <= val <= end:
-            return True
-    return False
-
-ranges = parse_ranges(intervals)
-try:
-    with open(cycles_path, 'r') as fh:
-        candidates = [int(line.strip()) for line in fh if line.strip()]
-except OSError:
-    candidates = []
-
-safe = [c for c in candidates if not in_range(c, ranges)]
-
-if safe:
-    print(random.choice(safe))
-else:
-    print(fallback)
-PY
-)
-        if [[ -n "${chosen_cycle}" ]]; then
-            echo "${chosen_cycle}"
-            return
-        fi
-    fi
-
     echo "${fallback_cycle}"
 }
 
 initialize_config() {
     # 0:RF, 1:local_mem, 2:shared_mem, 3:L1D_cache, 4:L1C_cache, 5:L1T_cache, 6:L2_cache (e.g. components_to_flip=0:1 for both RF and local_mem)
     # random component to flip from COMPONENT_SET
+    local narrow_draws=0
     while true; do
         components_to_flip=$(shuf -e ${COMPONENT_SET} -n 1)
         # random number for choosing a random thread after thread_rand % #threads operation in gpgpu-sim
@@ -231,13 +252,28 @@ initialize_config() {
         # random number for choosing a random warp after warp_rand % #warp operation in gpgpu-sim
         warp_rand=$(shuf -i 0-6000 -n 1)
         # random cycle for fault injection
-        total_cycle_rand="$(shuf ${CYCLES_FILE} -n 1)"
+        total_cycle_rand="$(sample_cycle)"
         if [[ "$profile" -eq 3 ]]; then
             total_cycle_rand=-1
         fi
         # Randomize REGISTER_NAME per injection if register list is available
         if [[ -f "register_used.txt" && -s "register_used.txt" ]]; then
-            REGISTER_NAME=$(shuf -n 1 register_used.txt | tr -d '\r')
+            if [[ "${REGISTER_SAMPLING}" != "uniform" && "${INJECT_WITHIN_DANGER_REGION}" -eq 1 ]]; then
+                REGISTER_NAME=$(python3 register_sampling.py pick --mode "${REGISTER_SAMPLING}" \
+                    --index "${CYCLE_REGION_INDEX}" --text "${CYCLE_REGION_FILE}" --state "${REG_ALLOC_FILE}" \
+                    --widths "${REGISTER_WIDTH_FILE}" --bits "${INJECT_BIT_FLIP_COUNT}" --default-width "${DATATYPE_SIZE}")
+            else
+                REGISTER_NAME=$(shuf -n 1 register_used.txt | tr -d '\r')
+            fi
+        fi
+        if [[ ":${components_to_flip}:" == *":0:"* && -n "${REGISTER_NAME}" ]] \
+            && (( $(register_width "${REGISTER_NAME}") < INJECT_BIT_FLIP_COUNT )); then
+            # too narrow for INJECT_BIT_FLIP_COUNT distinct bits (e.g. a 1-bit predicate); draw another register
+            if (( ++narrow_draws >= 100 )); then
+                echo "Error: ${narrow_draws} registers in a row narrower than ${INJECT_BIT_FLIP_COUNT} bits, last ${REGISTER_NAME}" >&2
+                exit 1
+            fi
+            continue
         fi
         if [[ "$profile" -ne 3 && "${total_cycle_rand}" != "-1" ]]; then
             total_cycle_rand=$(select_cycle_for_register "${REGISTER_NAME}" "${total_cycle_rand}")
@@ -246,7 +282,8 @@ initialize_config() {
         # register_rand_n="$(shuf -i 1-${MAX_REGISTERS_USED} -n 1)"; register_rand_n="${register_rand_n//$'\n'/:}"
         register_rand_n=1
         # example: if -i 1-32 -n 2 then the two commands below will create a value with 2 random numbers, between [1,32] like 3:21. Meaning it will flip 3 and 21 bits.
-        reg_bitflip_rand_n=$(shuf -i 1-${DATATYPE_SIZE} -n ${INJECT_BIT_FLIP_COUNT} | paste -sd:)
+        # bits are drawn within the declared width of REGISTER_NAME (1 for predicates, 64 for %rd/%fd)
+        reg_bitflip_rand_n=$(shuf -i 1-$(register_width "${REGISTER_NAME}") -n ${INJECT_BIT_FLIP_COUNT} | paste -sd:)
         # same format like reg_bitflip_rand_n but for local memory bit flips
         local_mem_bitflip_rand_n=$(shuf -i 1-${LMEM_SIZE_BITS} -n ${INJECT_BIT_FLIP_COUNT} | paste -sd:)
         # random number for choosing a random block after block_rand % #smems operation in gpgpu-sim
@@ -294,6 +331,11 @@ initialize_config() {
         sed -i -e 's|^-register_name[[:space:]].*$|-register_name ""|' "${CONFIG_FILE}"
     fi
     sed -i -e "s/^-reg_bitflip_rand_n.*$/-reg_bitflip_rand_n ${reg_bitflip_rand_n}/" ${CONFIG_FILE}
+    if [[ "${EQUIV_PRUNING}" -eq 1 ]]; then
+        sed -i -e "s|^-fi_equiv_classes[[:space:]].*$|-fi_equiv_classes ${EQUIV_CLASS_FILE}|" "${CONFIG_FILE}"
+    else
+        sed -i -e 's|^-fi_equiv_classes[[:space:]].*$|-fi_equiv_classes ""|' "${CONFIG_FILE}"
+    fi
     sed -i -e "s/^-per_warp.*$/-per_warp ${per_warp}/" ${CONFIG_FILE}
     sed -i -e "s/^-kernel_n.*$/-kernel_n ${kernel_n}/" ${CONFIG_FILE}
     sed -i -e "s/^-local_mem_bitflip_rand_n.*$/-local_mem_bitflip_rand_n ${local_mem_bitflip_rand_n}/" ${CONFIG_FILE}
@@ -361,50 +403,250 @@ gather_results() {
         
         # Get file name for display
         filename=$(basename "$file")
-        
-        case $result in
-        "001")
-            let RUNS--
-            let masked++
-            echo "[Run ${1}] ${filename}: Masked (no performance impact)" ;;
-        "011")
-            let RUNS--
-            let masked++ 
-            let performance++
-            echo "[Run ${1}] ${filename}: Masked (with performance impact)" ;;
-        "100" | "110")
+
+        # Equivalence class of the injection; a pruned run takes the outcome of its class representative
+        fi_class=$(sed -nE 's/^\[REG_FI_CLASS\] key=([^[:space:]]+).*/\1/p' "$file" | head -n1)
+        rep_outcome=""
+        pruned=0
+        if [[ -n "${fi_class}" ]] && grep -a -q "^\[REG_FI_CLASS\] pruned" "$file"; then
+            pruned=1
+            read -r rep_outcome rep_run < <(awk -v k="${fi_class}" '$1 == k { print $2, $3; exit }' "${EQUIV_CLASS_FILE}" 2>/dev/null)
+        fi
+
+        if [[ "${pruned}" -eq 1 && -z "${rep_outcome}" ]]; then
+            # the simulator stopped right after the flip, so the result code says nothing about the outcome;
+            # leave the run to the next batch
+            outcome="Unclassified"
+            echo "[Run ${1}] ${filename}: Unclassified (pruned, no representative for ${fi_class})"
+        elif [[ -n "${rep_outcome}" ]]; then
             let RUNS--
-            let SDC++
-            echo "[Run ${1}] ${filename}: SDC" ;;
-        *)
-            grep -a -iq "${FAULT_INJECTION_OCCURRED}" "$file"
-            if [ $? -eq 0 ]; then
+            case ${rep_outcome} in
+            "Masked") let masked++ ;;
+            "SDC") let SDC++ ;;
+            "DUE") let crashes++ ;;
+            esac
+            outcome=${rep_outcome}
+            echo "[Run ${1}] ${filename}: ${rep_outcome} (pruned, equivalent to ${rep_run})"
+        else
+            case $result in
+            "001")
                 let RUNS--
-                let crashes++
-                echo "[Run ${1}] ${filename}: DUE (Crash)"
-            else
-                echo "[Run ${1}] ${filename}: Unclassified (${result})"
-            fi ;;
-        esac
+                let masked++
+                outcome="Masked"
+                echo "[Run ${1}] ${filename}: Masked (no performance impact)" ;;
+            "011")
+                let RUNS--
+                let masked++ 
+                let performance++
+                outcome="Masked"
+                echo "[Run ${1}] ${filename}: Masked (with performance impact)" ;;
+            "100" | "110")
+                let RUNS--
+                let SDC++
+                outcome="SDC"
+                echo "[Run ${1}] ${filename}: SDC" ;;
+            *)
+                grep -a -iq "${FAULT_INJECTION_OCCURRED}" "$file"
+                if [ $? -eq 0 ]; then
+                    let RUNS--
+                    let crashes++
+                    outcome="DUE"
+                    echo "[Run ${1}] ${filename}: DUE (Crash)"
+                else
+                    outcome="Unclassified"
+                    echo "[Run ${1}] ${filename}: Unclassified (${result})"
+                fi ;;
+            esac
+            if [[ "${EQUIV_PRUNING}" -eq 1 && -n "${fi_class}" && "${outcome}" != "Unclassified" ]] \
+                && ! grep -q -F "${fi_class} " "${EQUIV_CLASS_FILE}"; then
+                echo "${fi_class} ${outcome} r${1}b${idx}" >> "${EQUIV_CLASS_FILE}"
+            fi
+        fi
+        emit_run_finished "${1}" "${idx}" "${file}" "${outcome}" "$([[ -n "${rep_outcome}" ]] && echo 1)"
+        if [[ -n "${register_name_cfg}" ]]; then
+            echo "O ${register_name_cfg} ${outcome} $(injection_kernel "${total_cycle_rand_cfg}" "${kernel_n_cfg}")" >> "${REG_ALLOC_FILE}"
+        fi
+    done
+}
+
+emit_run_finished() {
+    # emit_run_finished <loop> <idx> <tmp.out file> <outcome> [pruned]
+    [[ "${TELEMETRY}" -eq 1 ]] || return 0
+    local meta="${TMP_DIR}${1}/${RUN_META_FILE}${2}"
+    local rc="" start_ms="" end_ms="" rss_kb="" wall_ms="" sim_cycles=""
+    if [[ -f "${meta}" ]]; then
+        rc=$(sed -nE 's/^rc=(-?[0-9]+)$/\1/p' "${meta}")
+        start_ms=$(sed -nE 's/^start_ms=([0-9]+)$/\1/p' "${meta}")
+        end_ms=$(sed -nE 's/^end_ms=([0-9]+)$/\1/p' "${meta}")
+        rss_kb=$(sed -nE 's/^rss_kb=([0-9]+)$/\1/p' "${meta}")
+        if [[ -n "${start_ms}" && -n "${end_ms}" ]]; then
+            wall_ms=$(( end_ms - start_ms ))
+        fi
+    fi
+    sim_cycles=$(grep -a "${CYCLES_MSG}" "$3" | tail -1 | sed -nE 's/.*=[[:space:]]*([0-9]+).*/\1/p')
+    emit_event run_finished "run=r${1}b${2}" "loop=${1}" "outcome=${4}" "exit_code=${rc}" \
+        "wall_ms=${wall_ms}" "rss_kb=${rss_kb}" "sim_cycles=${sim_cycles}" "pruned=${5}" \
+        "log_bytes=$(stat -c %s "$3" 2>/dev/null)"
+}
+
+digest_filter() {
+    # the lines gather_results, the register ledger and telemetry read, plus simulator errors for DUE triage
+    grep -a -i -F -e "${SUCCESS_MSG}" -e "${FAILED_MSG}" -e "${CYCLES_MSG}" -e "${FAULT_INJECTION_OCCURRED}" \
+        -e "_FI_" -e "FI_WRITER" -e "FI_READER" -e "ERROR" -e "deadlock"
+}
+
+launch_run() {
+    # launch_run <loop> <idx>: run the simulator in the background and record rc/wall time/peak RSS in RUN_META_FILE
+    local out="${TMP_DIR}${1}/${TMP_FILE}${2}"
+    local meta="${TMP_DIR}${1}/${RUN_META_FILE}${2}"
+    (
+        start_ms=$(now_ms)
+        emit_event run_started "run=r${1}b${2}" "loop=${1}"
+        cmd=(timeout ${TIMEOUT_VAL} $CUDA_UUT)
+        if [[ "${TELEMETRY}" -eq 1 && -n "${TIME_BIN}" ]]; then
+            cmd=(${TIME_BIN} -f "%M" -o "${meta}.rss" "${cmd[@]}")
+        fi
+        if [[ "${LOG_DIGEST}" -eq 1 ]]; then
+            "${cmd[@]}" 2>&1 | digest_filter > "${out}"
+            rc=${PIPESTATUS[0]}
+        else
+            "${cmd[@]}" > "${out}" 2>&1
+            rc=$?
+        fi
+        end_ms=$(now_ms)
+        {
+            echo "rc=${rc}"
+            echo "start_ms=${start_ms}"
+            echo "end_ms=${end_ms}"
+            # GNU time prepends "Command exited with non-zero status N" on failures
+            [[ -f "${meta}.rss" ]] && echo "rss_kb=$(tail -n1 "${meta}.rss")"
+        } > "${meta}"
+        rm -f "${meta}.rss"
+    ) &
+}
+
+projected_rss_kb() {
+    # projected_rss_kb <pid>...: "<alive> <projected_kb> <largest_kb>" over the process trees of the given runs
+    ps -e -o pid=,ppid=,rss= 2>/dev/null | awk -v roots="$*" -v expect="${RUN_RSS_KB}" '
+        { rss[$1] = $3; kids[$2] = kids[$2] " " $1 }
+        function tree(p,    n, i, k, t) {
+            t = rss[p]
+            n = split(kids[p], k, " ")
+            for (i = 1; i <= n; i++) t += tree(k[i])
+            return t
+        }
+        END {
+            n = split(roots, r, " ")
+            for (i = 1; i <= n; i++) {
+                if (!(r[i] in rss)) continue
+                t = tree(r[i])
+                alive++
+                total += (t > expect ? t : expect)
+                if (t > largest) largest = t
+            }
+            printf "%d %.0f %.0f\n", alive, total, largest
+        }'
+}
+
+wait_for_memory() {
+    # blocks until one more run fits into MEM_BUDGET_KB; a run is always admitted when none is in flight
+    (( MEM_BUDGET_KB > 0 )) || return 0
+    local alive projected largest waited_ms=0 t0
+    t0=$(now_ms)
+    while true; do
+        read -r alive projected largest < <(projected_rss_kb "${RUN_PIDS[@]}")
+        (( largest > RUN_RSS_KB )) && RUN_RSS_KB=${largest}
+        (( alive == 0 || projected + RUN_RSS_KB <= MEM_BUDGET_KB )) && break
+        sleep 1
     done
+    waited_ms=$(( $(now_ms) - t0 ))
+    if (( waited_ms >= 1000 )); then
+        emit_event admission_wait "wait_ms=${waited_ms}" "in_flight=${alive}" "projected_kb=${projected}" \
+            "run_rss_kb=${RUN_RSS_KB}" "budget_kb=${MEM_BUDGET_KB}"
+    fi
+}
+
+update_run_rss() {
+    # update_run_rss <loop>: raise RUN_RSS_KB to the largest peak RSS measured in the batch
+    local kb
+    kb=$(cat "${TMP_DIR}${1}/${RUN_META_FILE}"* 2>/dev/null | sed -nE 's/^rss_kb=([0-9]+)$/\1/p' | sort -n | tail -n1)
+    [[ -n "${kb}" ]] && (( kb > RUN_RSS_KB )) && RUN_RSS_KB=${kb}
+}
+
+granted_slots() {
+    # waits while the scheduler grants no slot (e.g. behind higher-priority campaigns)
+    local n
+    while true; do
+        n=$(cat "${SLOTS_FILE}" 2>/dev/null)
+        if [[ ! "${n}" =~ ^[0-9]+$ ]]; then
+            echo "${BATCH}"
+            return
+        fi
+        if (( n > 0 )); then
+            echo "${n}"
+            return
+        fi
+        sleep 5
+    done
+}
+
+stop_rule_met() {
+    # returns 0 once stop_rules.py reports that the requested precision is reached
+    [[ "${STOP_RULE}" -eq 1 ]] || return 1
+    (( (LOOP - 1) % STOP_CHECK_EVERY == 0 )) || return 1
+    local r="${STOP_R}"
+    if [[ -z "${r}" && -f "register_used.txt" ]]; then
+        r=$(grep -c . register_used.txt)
+    fi
+    python3 stop_rules.py --state "${REG_ALLOC_FILE}" --confidence "${STOP_CONFIDENCE}" \
+        --margin "${STOP_MARGIN}" --min-runs "${STOP_MIN_RUNS}" --scope "${STOP_SCOPE}" \
+        --p-margin "${STOP_P_MARGIN}" --T "${CYCLES}" --R "${r:-0}" \
+        --text "${CYCLE_REGION_FILE}" --index "${CYCLE_REGION_INDEX}" \
+        --widths "${REGISTER_WIDTH_FILE}" --bits "${INJECT_BIT_FLIP_COUNT}" --default-width "${DATATYPE_SIZE}"
+    local rc=$?
+    emit_event stop_check "loop=${LOOP}" "stop=$(( rc == 0 ))"
+    return ${rc}
 }
 
 parallel_execution() {
     batch=$1
     mkdir ${TMP_DIR}${2} > /dev/null 2>&1
+    sampling_ms=0
+    RUN_PIDS=()
     for i in $( seq 1 $batch ); do
+        t0=$(now_ms)
         initialize_config
         # unique id for each run (e.g. r1b2: 1st run, 2nd execution on batch)
         sed -i -e "s/^-run_uid.*$/-run_uid r${2}b${i}/" ${CONFIG_FILE}
         cp ${CONFIG_FILE} ${TMP_DIR}${2}/${CONFIG_FILE}${i} # save state
-        timeout ${TIMEOUT_VAL} $CUDA_UUT > ${TMP_DIR}${2}/${TMP_FILE}${i} 2>&1 &
+        t1=$(now_ms)
+        (( sampling_ms += t1 - t0 ))
+        if [[ "${REGISTER_SAMPLING}" != "uniform" ]]; then
+            echo "S ${REGISTER_NAME}" >> "${REG_ALLOC_FILE}"
+        fi
+        emit_event run_scheduled "run=r${2}b${i}" "loop=${2}" "comp=${components_to_flip}" \
+            "reg_name=${REGISTER_NAME}" "cycle=${total_cycle_rand}" "reg_bits=${reg_bitflip_rand_n}" \
+            "sample_ms=$(( t1 - t0 ))"
+        wait_for_memory
+        launch_run $2 $i
+        RUN_PIDS+=($!)
     done
+    t0=$(now_ms)
     wait
+    t1=$(now_ms)
+    (( MEM_BUDGET_KB > 0 )) && update_run_rss $2
     gather_results $2
+    t2=$(now_ms)
+    emit_event batch_finished "loop=${2}" "size=${batch}" "sampling_ms=${sampling_ms}" \
+        "simulation_ms=$(( t1 - t0 ))" "classification_ms=$(( t2 - t1 ))" "runs_left=${RUNS}"
     if [[ "$DELETE_LOGS" -eq 1 ]]; then
         rm _ptx* _cuobjdump_* _app_cuda* *.ptx f_tempfile_ptx gpgpu_inst_stats.txt > /dev/null 2>&1
         rm -r ${TMP_DIR}${2} > /dev/null 2>&1 # comment out to debug output
     fi
+    if [[ -n "${SCRATCH_RUN_DIR}" && -d "${TMP_DIR}${2}" ]]; then
+        rm -rf "${DISK_TMP_DIR}${2}"
+        mv "${TMP_DIR}${2}" "${DISK_TMP_DIR}${2}"
+    fi
     if [[ "$profile" -ne 1 ]]; then
         # clean intermediate logs anyway if profile != 1
         rm _ptx* _cuobjdump_* _app_cuda* *.ptx f_tempfile_ptx gpgpu_inst_stats.txt > /dev/null 2>&1
@@ -438,6 +680,18 @@ main() {
     fi
     # Remove all directories whose names start with 'logs'
     find . -type d -name "logs*" -exec rm -rf {} + 2>/dev/null || true
+    SCRATCH_RUN_DIR=""
+    if [[ -n "${SCRATCH_DIR}" ]]; then
+        # private to this campaign, so concurrent campaigns can share SCRATCH_DIR
+        if SCRATCH_RUN_DIR=$(mktemp -d "${SCRATCH_DIR%/}/gpufi_scratch.XXXXXX"); then
+            trap 'rm -rf "${SCRATCH_RUN_DIR}"' EXIT
+            DISK_TMP_DIR=${TMP_DIR}
+            TMP_DIR="${SCRATCH_RUN_DIR}/logs"
+        else
+            echo "Warning: cannot create a scratch directory in ${SCRATCH_DIR}, writing ${TMP_DIR}<N> directly" >&2
+            SCRATCH_RUN_DIR=""
+        fi
+    fi
     
     if [[ "$profile" -eq 1 ]] || [[ "$profile" -eq 2 ]] || [[ "$profile" -eq 3 ]]; then
         RUNS=1
@@ -447,13 +701,47 @@ main() {
     MAX_RETRIES=3
     LOOP=1
     mkdir ${CACHE_LOGS_DIR} > /dev/null 2>&1
+    > "${REG_ALLOC_FILE}"
+    CYCLE_DOMAIN_SIZE=$(cycle_domain_size)
+    if [[ "$profile" -eq 0 && " ${COMPONENT_SET//:/ } " == *" 0 "* && -s "register_used.txt" ]] \
+        && (( $(wide_register_count) == 0 )); then
+        echo "Error: no register in register_used.txt is at least ${INJECT_BIT_FLIP_COUNT} bits wide" >&2
+        exit 1
+    fi
+    if [[ "${MEM_BUDGET_MB}" == "auto" ]]; then
+        MEM_BUDGET_KB=$(awk '/^MemAvailable:/ { printf "%.0f\n", $2 * 0.9 }' /proc/meminfo)
+    else
+        MEM_BUDGET_KB=$(( ${MEM_BUDGET_MB:-0} * 1024 ))
+    fi
+    RUN_RSS_KB=$(( ${RUN_RSS_MB:-0} * 1024 ))
+    [[ "${EQUIV_PRUNING}" -eq 1 ]] && > "${EQUIV_CLASS_FILE}"
+    if [[ "${TELEMETRY}" -eq 1 ]]; then
+        > "${EVENTS_FILE}"
+        emit_event campaign_started "runs=${RUNS}" "slots=${BATCH}" "profile=${profile}" "cuda_uut=${CUDA_UUT}" \
+            "mem_budget_kb=${MEM_BUDGET_KB}" "run_rss_kb=${RUN_RSS_KB}"
+    fi
     while [[ $RUNS -gt 0 ]] && [[ $MAX_RETRIES -gt 0 ]]
     do
         echo "runs left ${RUNS}" # DEBUG
         let MAX_RETRIES--
         LOOP_START=${LOOP}
         unset LAST_BATCH
-        if [ "$BATCH" -gt "$RUNS" ]; then
+        if [[ -n "${SLOTS_FILE}" ]]; then
+            # one batch at a time, sized by the current grant; a batch without any classified run is a retry
+            while [[ $RUNS -gt 0 ]]; do
+                runs_before=${RUNS}
+                batch=$(granted_slots)
+                (( batch > RUNS )) && batch=${RUNS}
+                parallel_execution $batch $LOOP
+                let LOOP++
+                if stop_rule_met; then
+                    STOPPED_EARLY=1
+                    break
+                fi
+                (( RUNS == runs_before )) && break
+            done
+            LOOP_END=$(( LOOP_START - 1 )) # nothing left for the fixed-size batches below
+        elif [ "$BATCH" -gt "$RUNS" ]; then
             BATCH=${RUNS}
             LOOP_END=$(($LOOP_START))
         else
@@ -467,11 +755,20 @@ main() {
         for i in $( seq $LOOP_START $LOOP_END ); do
             parallel_execution $BATCH $i
             let LOOP++
+            if stop_rule_met; then
+                STOPPED_EARLY=1
+                break
+            fi
         done
 
-        if [[ ! -z ${LAST_BATCH+x} ]]; then
+        if [[ -z ${STOPPED_EARLY+x} && ! -z ${LAST_BATCH+x} ]]; then
             parallel_execution $LAST_BATCH $LOOP
             let LOOP++
+            stop_rule_met && STOPPED_EARLY=1
+        fi
+        if [[ ! -z ${STOPPED_EARLY+x} ]]; then
+            echo "Stopping rule met, ${RUNS} scheduled runs skipped"
+            RUNS=0
         fi
     done
 
@@ -482,6 +779,8 @@ main() {
         echo "SDCs: ${SDC}"
         echo "DUEs: ${crashes}"
     fi
+    emit_event campaign_finished "runs_left=${RUNS}" "masked=${masked}" "performance=${performance}" \
+        "sdc=${SDC}" "due=${crashes}"
     if [[ "$DELETE_LOGS" -eq 1 ]]; then
         rm -r ${CACHE_LOGS_DIR} > /dev/null 2>&1 # comment out to debug cache logs
     fi
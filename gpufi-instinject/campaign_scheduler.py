@@ -0,0 +1,343 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import argparse
+import json
+import os
+import re
+import shutil
+import signal
+import subprocess
+import sys
+import time
+
+# -----------------------------
+# Formats
+# -----------------------------
+#
+# Job file, one campaign per line ("#" starts a comment):
+#   app=AdamW;size=0;components=0;bits=1;runs=2000;weight=2;priority=0;REGISTER_SAMPLING=danger
+# app is required. size is the 0-based size_list.txt line (all sizes if omitted). weight
+# (default 1) is the fair share, and higher priority levels are served first. Any other
+# UPPERCASE key overrides the parameter line of the same name in inst_fault_inject_exp.sh.
+#
+# Every job runs inst_fault_inject_exp.sh in its own copy of the runner, mirroring the repo
+# layout so ../accel stays per job:
+#   campaigns/<job>/gpufi-instinject/   scripts, configs, test_apps/<app>, symlinks to lib/, bin/, ...
+#   campaigns/<job>/accel/accel.py
+# The scheduler writes the number of worker slots granted to the job to
+# campaigns/<job>/gpufi-instinject/slots.txt; campaign_exec.sh re-reads it before every batch.
+
+FIELD_TO_PARAM = {
+    "app": "TEST_APP_NAME",
+    "size": "SIZE_INDEX",
+    "components": "COMPONENT_SET",
+    "bits": "INJECT_BIT_FLIP_COUNT",
+    "runs": "RUN_PER_EPOCH",
+}
+SLOTS_NAME = "slots.txt"
+EVENTS_NAME = "campaign_events.jsonl"
+# top-level runner files that are outputs of earlier campaigns and not copied into a workspace
+SKIP_FILES = re.compile(r"(\.log|\.jsonl|\.tmp|\.db|^tmp\.out\d*|^result\.txt)$")
+SKIP_DIRS = {"test_apps", "test_result", "campaigns", "cache_logs", "__pycache__"}
+
+
+def parse_jobs(path: str):
+    """Return a list of job dicts with name, params, weight and priority."""
+    jobs = []
+    with open(path, "r", encoding="utf-8") as f:
+        for lineno, line in enumerate(f, 1):
+            line = line.split("#", 1)[0].strip()
+            if not line:
+                continue
+            fields = {}
+            for part in line.split(";"):
+                key, sep, value = part.partition("=")
+                if sep:
+                    fields[key.strip()] = value.strip()
+            if "app" not in fields:
+                print(f"Warning: {path}:{lineno}: no app=, skipped", file=sys.stderr)
+                continue
+            params = {FIELD_TO_PARAM[k]: v for k, v in fields.items() if k in FIELD_TO_PARAM}
+            params.update({k: v for k, v in fields.items() if k.isupper()})
+            name = "_".join(
+                [fields["app"], fields.get("size", "all"), fields.get("components", "0").replace(":", "-"),
+                 fields.get("bits", "1")]
+            )
+            if any(job["name"] == name for job in jobs):
+                name = f"{name}_{lineno}"
+            jobs.append({
+                "name": name,
+                "app": fields["app"],
+                "params": params,
+                "weight": max(float(fields.get("weight", 1)), 1e-9),
+                "priority": int(fields.get("priority", 0)),
+            })
+    return jobs
+
+
+# -----------------------------
+# Slot allocation
+# -----------------------------
+
+
+def allocate(demands, weights, priorities, slots: int):
+    """
+    Split slots among jobs: priority levels are served from the highest down, and within a
+    level each slot goes to the job with the lowest grant/weight that still has demand
+    (weighted max-min fair share). A job never gets more than its demand, so the slots of
+    campaigns that ramp down move to the others.
+    """
+    grant = {name: 0 for name in demands}
+    left = slots
+    for level in sorted(set(priorities.values()), reverse=True):
+        members = [n for n in demands if priorities[n] == level]
+        while left > 0:
+            open_jobs = [n for n in members if grant[n] < demands[n]]
+            if not open_jobs:
+                break
+            best = min(open_jobs, key=lambda n: grant[n] / weights[n])
+            grant[best] += 1
+            left -= 1
+    return grant
+
+
+# -----------------------------
+# Workspaces
+# -----------------------------
+
+
+def set_params(script: str, params):
+    """Rewrite the KEY=... parameter lines of inst_fault_inject_exp.sh (like it rewrites campaign_exec.sh)."""
+    with open(script, "r", encoding="utf-8") as f:
+        lines = f.readlines()
+    missing = set(params)
+    for i, line in enumerate(lines):
+        key = line.split("=", 1)[0]
+        if "=" in line and key in params:
+            lines[i] = f'{key}="{params[key]}"\n'
+            missing.discard(key)
+    for key in sorted(missing):
+        print(f"Warning: {script} has no parameter {key}, ignored", file=sys.stderr)
+    with open(script, "w", encoding="utf-8") as f:
+        f.writelines(lines)
+
+
+def make_workspace(root: str, runner_dir: str, job):
+    """Create campaigns/<job>/{gpufi-instinject,accel} and return the runner copy."""
+    ws = os.path.join(root, job["name"], "gpufi-instinject")
+    if os.path.exists(ws):
+        shutil.rmtree(ws)
+    os.makedirs(ws)
+    for entry in os.listdir(runner_dir):
+        src = os.path.join(runner_dir, entry)
+        if os.path.isdir(src):
+            if entry not in SKIP_DIRS and not entry.startswith("logs"):
+                os.symlink(os.path.abspath(src), os.path.join(ws, entry))
+        elif not SKIP_FILES.search(entry):
+            shutil.copy2(src, ws)
+    app_src = os.path.join(runner_dir, "test_apps", job["app"])
+    if not os.path.isdir(app_src):
+        raise FileNotFoundError(f"test_apps/{job['app']} not found")
+    shutil.copytree(app_src, os.path.join(ws, "test_apps", job["app"]), symlinks=True)
+    accel_dir = os.path.join(root, job["name"], "accel")
+    os.makedirs(accel_dir, exist_ok=True)
+    shutil.copy2(os.path.join(runner_dir, "..", "accel", "accel.py"), accel_dir)
+
+    params = dict(job["params"])
+    params.update({"DO_BUILD": "0", "SLOTS_FILE": f"./{SLOTS_NAME}"})
+    if params.get("RESULTS_DB"):
+        # all jobs ingest into the one database next to the scheduler, not into their copies
+        params["RESULTS_DB"] = os.path.join(os.path.abspath(runner_dir), params["RESULTS_DB"])
+    set_params(os.path.join(ws, "inst_fault_inject_exp.sh"), params)
+    return ws
+
+
+def write_slots(ws: str, n: int):
+    path = os.path.join(ws, SLOTS_NAME)
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        f.write(f"{n}\n")
+    os.replace(tmp, path)
+
+
+# -----------------------------
+# Job state
+# -----------------------------
+
+
+class Job:
+    """A running inst_fault_inject_exp.sh and the progress read from its campaign events."""
+
+    def __init__(self, spec, ws: str, log_path: str):
+        self.spec = spec
+        self.name = spec["name"]
+        self.ws = ws
+        self.log = open(log_path, "w")
+        self.proc = subprocess.Popen(
+            ["bash", "inst_fault_inject_exp.sh"], cwd=ws, stdout=self.log, stderr=subprocess.STDOUT,
+            start_new_session=True,
+        )
+        self.offset = 0
+        self.inode = None
+        self.in_campaign = False
+        self.runs_left = 0
+        self.campaigns = 0
+
+    def poll_events(self):
+        path = os.path.join(self.ws, EVENTS_NAME)
+        try:
+            st = os.stat(path)
+        except OSError:
+            return
+        if st.st_ino != self.inode or st.st_size < self.offset:
+            # the runner starts a new events file for every result file
+            self.inode, self.offset = st.st_ino, 0
+        with open(path, "rb") as f:
+            f.seek(self.offset)
+            chunk = f.read()
+        end = chunk.rfind(b"\n") + 1  # leave a partially written line for the next poll
+        self.offset += end
+        for line in chunk[:end].decode("utf-8", errors="ignore").splitlines():
+            try:
+                ev = json.loads(line)
+            except ValueError:
+                continue
+            kind = ev.get("event")
+            if kind == "campaign_started":
+                self.in_campaign = True
+                self.runs_left = int(ev.get("runs", 0))
+            elif kind == "batch_finished":
+                self.runs_left = int(ev.get("runs_left", self.runs_left))
+            elif kind == "campaign_finished":
+                self.in_campaign = False
+                self.campaigns += 1
+
+    def demand(self) -> int:
+        return max(self.runs_left, 1) if self.in_campaign else 1
+
+    def stop(self):
+        try:
+            os.killpg(self.proc.pid, signal.SIGINT)
+        except OSError:
+            pass
+
+
+def collect_results(job, result_dir: str):
+    src = os.path.join(job.ws, "test_result")
+    copied = []
+    if os.path.isdir(src):
+        os.makedirs(result_dir, exist_ok=True)
+        for entry in sorted(os.listdir(src)):
+            shutil.copy2(os.path.join(src, entry), result_dir)
+            copied.append(entry)
+    return copied
+
+
+# -----------------------------
+# Scheduling loop
+# -----------------------------
+
+
+def run(jobs, args):
+    runner_dir = os.path.dirname(os.path.abspath(__file__))
+    root = os.path.abspath(args.workdir)
+    os.makedirs(root, exist_ok=True)
+    order = {job["name"]: i for i, job in enumerate(jobs)}
+    by_priority = args.policy == "priority"
+    pending = sorted(jobs, key=lambda j: (-j["priority"] if by_priority else 0, order[j["name"]]))
+    running, failed = [], []
+
+    def stop_all(signum, frame):
+        print("\nInterrupted, stopping running campaigns...")
+        for job in running:
+            job.stop()
+        sys.exit(1)
+
+    signal.signal(signal.SIGINT, stop_all)
+    print(f"Scheduling {len(jobs)} jobs on {args.slots} worker slots ({args.policy})")
+
+    while pending or running:
+        for job in list(running):
+            rc = job.proc.poll()
+            if rc is None:
+                continue
+            job.poll_events()
+            job.log.close()
+            running.remove(job)
+            files = collect_results(job, args.results)
+            status = "done" if rc == 0 else f"failed (exit {rc})"
+            if rc != 0:
+                failed.append(job.name)
+            print(f"[{job.name}] {status}, {job.campaigns} campaigns, results: {', '.join(files) or '-'}")
+
+        for job in running:
+            job.poll_events()
+        # outside a campaign the runner compiles, profiles or analyses on one core that cannot be withheld
+        setup = [job for job in running if not job.in_campaign]
+        active = [job for job in running if job.in_campaign]
+        demands = {job.name: job.demand() for job in active}
+        weights = {job.name: job.spec["weight"] for job in active}
+        priorities = {job.name: job.spec["priority"] if by_priority else 0 for job in active}
+        grant = allocate(demands, weights, priorities, max(args.slots - len(setup), 0))
+        grant.update({job.name: 1 for job in setup})
+
+        # start the next jobs while slots are idle
+        free = args.slots - sum(grant.values())
+        while pending and free > 0:
+            spec = pending.pop(0)
+            try:
+                ws = make_workspace(root, runner_dir, spec)
+            except OSError as exc:
+                print(f"[{spec['name']}] not started: {exc}", file=sys.stderr)
+                failed.append(spec["name"])
+                continue
+            write_slots(ws, 1)
+            job = Job(spec, ws, os.path.join(root, spec["name"], "driver.log"))
+            running.append(job)
+            grant[job.name] = 1
+            free -= 1
+            print(f"[{job.name}] started in {ws}")
+
+        for job in running:
+            write_slots(job.ws, grant.get(job.name, 0))
+        if running:
+            status = ", ".join(
+                f"{job.name}:{grant.get(job.name, 0)}" + (f"/{job.runs_left} left" if job.in_campaign else "/setup")
+                for job in running
+            )
+            print(f"[{time.strftime('%H:%M:%S')}] slots {sum(grant.values())}/{args.slots} {status}")
+        time.sleep(args.interval if running else 0)
+
+    print(f"All jobs finished, {len(failed)} failed{': ' + ', '.join(failed) if failed else ''}")
+    return 1 if failed else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Run several fault-injection campaigns concurrently on one shared pool of worker slots."
+    )
+    parser.add_argument("jobs", help="Job file, one app=...;size=...;components=...;bits=... line per campaign")
+    parser.add_argument(
+        "--slots", type=int, default=max((os.cpu_count() or 2) - 1, 1), help="Worker slots shared by all jobs"
+    )
+    parser.add_argument(
+        "--policy",
+        choices=("fair", "priority"),
+        default="fair",
+        help="fair: weighted fair share; priority: higher priority levels first, fair share within a level",
+    )
+    parser.add_argument("--interval", type=float, default=5.0, help="Seconds between two reallocations")
+    parser.add_argument("--workdir", default="campaigns", help="Directory of the per-job workspaces")
+    parser.add_argument("--results", default="test_result", help="Where the test_result CSVs of all jobs are collected")
+    args = parser.parse_args()
+
+    jobs = parse_jobs(args.jobs)
+    if not jobs:
+        print(f"Error: no jobs in {args.jobs}", file=sys.stderr)
+        sys.exit(1)
+    sys.exit(run(jobs, args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import argparse
+import json
+import os
+import sys
+import time
+from collections import Counter
+
+# -----------------------------
+# Event stream parsing
+# -----------------------------
+
+
+def load_events(events_path: str):
+    """Load the JSON-lines event stream written by campaign_exec.sh (skips torn/partial lines)."""
+    events = []
+    if not os.path.exists(events_path):
+        print(f"Warning: events file not found: {events_path}", file=sys.stderr)
+        return events
+    with open(events_path, "r", encoding="utf-8", errors="ignore") as f:
+        for raw in f:
+            raw = raw.strip()
+            if not raw:
+                continue
+            try:
+                events.append(json.loads(raw))
+            except ValueError:
+                # A run may still be appending its line while we read
+                continue
+    return events
+
+
+def summarize(events, now_ms=None):
+    """
+    Aggregate the event stream of a single campaign (the last campaign_started onwards).
+
+    Returns a dict with throughput, core utilization, per-phase wall time and ETA.
+    """
+    start_idx = 0
+    for i, ev in enumerate(events):
+        if ev.get("event") == "campaign_started":
+            start_idx = i
+    events = events[start_idx:]
+    if not events:
+        return {}
+
+    start = events[0]
+    t_start = start.get("ts_ms", 0)
+    finished = events[-1].get("event") == "campaign_finished"
+    t_end = events[-1].get("ts_ms", t_start)
+    if not finished and now_ms is not None:
+        t_end = max(t_end, now_ms)
+    elapsed_s = max((t_end - t_start) / 1000.0, 1e-9)
+
+    outcomes = Counter()
+    exit_codes = Counter()
+    busy_ms = 0
+    rss_kb = []
+    log_bytes = []
+    sim_cycles = []
+    phases = {"sampling": 0, "simulation": 0, "classification": 0}
+    scheduled = started = pruned = 0
+    admission_waits = admission_wait_ms = 0
+    runs_left = None
+
+    for ev in events:
+        kind = ev.get("event")
+        if kind == "run_scheduled":
+            scheduled += 1
+        elif kind == "run_started":
+            started += 1
+        elif kind == "run_finished":
+            outcomes[ev.get("outcome", "Unclassified")] += 1
+            pruned += 1 if ev.get("pruned") else 0
+            if "exit_code" in ev:
+                exit_codes[ev["exit_code"]] += 1
+            busy_ms += ev.get("wall_ms", 0)
+            if "rss_kb" in ev:
+                rss_kb.append(ev["rss_kb"])
+            if "sim_cycles" in ev:
+                sim_cycles.append(ev["sim_cycles"])
+            if "log_bytes" in ev:
+                log_bytes.append(ev["log_bytes"])
+        elif kind == "admission_wait":
+            admission_waits += 1
+            admission_wait_ms += ev.get("wait_ms", 0)
+        elif kind == "batch_finished":
+            for phase in phases:
+                phases[phase] += ev.get(f"{phase}_ms", 0)
+            runs_left = ev.get("runs_left", runs_left)
+        elif kind == "campaign_finished":
+            runs_left = ev.get("runs_left", runs_left)
+
+    done = sum(outcomes.values())
+    classified = done - outcomes.get("Unclassified", 0)
+    target = start.get("runs", 0)
+    slots = max(int(start.get("slots", 1)), 1)
+    if runs_left is None:
+        runs_left = max(target - classified, 0)
+
+    rate = classified / elapsed_s
+    eta_s = (runs_left / rate) if rate > 0 and not finished else 0.0
+
+    return {
+        "target_runs": target,
+        "slots": slots,
+        "scheduled": scheduled,
+        "started": started,
+        "finished_runs": done,
+        "classified": classified,
+        "pruned": pruned,
+        "runs_left": runs_left,
+        "outcomes": dict(outcomes),
+        "exit_codes": dict(exit_codes),
+        "elapsed_s": elapsed_s,
+        "inj_per_s": rate,
+        "utilization": busy_ms / 1000.0 / (elapsed_s * slots),
+        "phases_s": {k: v / 1000.0 for k, v in phases.items()},
+        "mean_rss_mb": (sum(rss_kb) / len(rss_kb) / 1024.0) if rss_kb else None,
+        "max_rss_mb": (max(rss_kb) / 1024.0) if rss_kb else None,
+        "mean_sim_cycles": (sum(sim_cycles) / len(sim_cycles)) if sim_cycles else None,
+        "mean_log_kb": (sum(log_bytes) / len(log_bytes) / 1024.0) if log_bytes else None,
+        "total_log_mb": sum(log_bytes) / 1024.0 / 1024.0,
+        "mem_budget_mb": start.get("mem_budget_kb", 0) / 1024.0,
+        "admission_waits": admission_waits,
+        "admission_wait_s": admission_wait_ms / 1000.0,
+        "eta_s": eta_s,
+        "finished": finished,
+    }
+
+
+def _fmt_duration(seconds: float) -> str:
+    seconds = int(round(seconds))
+    h, rem = divmod(seconds, 3600)
+    m, s = divmod(rem, 60)
+    return f"{h:d}h{m:02d}m{s:02d}s"
+
+
+def print_summary(stats):
+    if not stats:
+        print("No campaign events found.")
+        return
+    print("========== Campaign telemetry ==========")
+    state = "finished" if stats["finished"] else "running"
+    print(f"State: {state}, elapsed {_fmt_duration(stats['elapsed_s'])}")
+    print(
+        f"Runs: target={stats['target_runs']} classified={stats['classified']} "
+        f"finished={stats['finished_runs']} left={stats['runs_left']}"
+    )
+    outcomes = stats["outcomes"]
+    print(
+        "Outcomes: "
+        + ", ".join(f"{k}={outcomes.get(k, 0)}" for k in ("Masked", "SDC", "DUE", "Unclassified"))
+    )
+    if stats["pruned"]:
+        print(f"Pruned by equivalence (not simulated past the flip): {stats['pruned']}")
+    if stats["exit_codes"]:
+        codes = sorted(stats["exit_codes"].items())
+        print("Exit codes: " + ", ".join(f"{k}:{v}" for k, v in codes))
+    print(f"Throughput: {stats['inj_per_s']:.3f} injections/s")
+    print(f"Core utilization: {stats['utilization'] * 100:.1f}% of {stats['slots']} slots")
+
+    phases = stats["phases_s"]
+    total = sum(phases.values())
+    print("Driver time by phase:")
+    for name in ("sampling", "simulation", "classification"):
+        share = (phases[name] / total * 100) if total > 0 else 0.0
+        print(f"  {name:<15s} {phases[name]:12.1f}s ({share:5.1f}%)")
+
+    if stats["mean_rss_mb"] is not None:
+        print(f"Peak RSS per run: mean={stats['mean_rss_mb']:.1f} MB max={stats['max_rss_mb']:.1f} MB")
+    if stats["mean_sim_cycles"] is not None:
+        print(f"Mean simulated cycles per run: {stats['mean_sim_cycles']:.0f}")
+    if stats["mean_log_kb"] is not None:
+        print(f"Simulator log per run: mean={stats['mean_log_kb']:.1f} KB, total={stats['total_log_mb']:.1f} MB")
+    if stats["mem_budget_mb"] > 0:
+        print(
+            f"Memory admission: budget {stats['mem_budget_mb']:.0f} MB, "
+            f"{stats['admission_waits']} launches delayed, {stats['admission_wait_s']:.1f}s waited"
+        )
+    if not stats["finished"]:
+        print(f"ETA: {_fmt_duration(stats['eta_s'])}")
+    print("========================================")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Summarize the campaign_exec.sh event stream (throughput, utilization, phase time, ETA)."
+    )
+    parser.add_argument(
+        "events",
+        nargs="?",
+        default=None,
+        help="Events file (default: campaign_events.jsonl next to this script)",
+    )
+    parser.add_argument(
+        "--watch",
+        "-w",
+        type=float,
+        default=0,
+        help="Refresh every N seconds until the campaign finishes",
+    )
+    parser.add_argument("--json", action="store_true", help="Print the summary as JSON")
+    args = parser.parse_args()
+
+    events_path = args.events or os.path.join(
+        os.path.dirname(os.path.abspath(__file__)), "campaign_events.jsonl"
+    )
+
+    while True:
+        stats = summarize(load_events(events_path), now_ms=int(time.time() * 1000))
+        if args.json:
+            print(json.dumps(stats, sort_keys=True))
+        else:
+            print_summary(stats)
+        if args.watch <= 0 or not stats or stats["finished"]:
+            break
+        time.sleep(args.watch)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,344 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import argparse
+import bisect
+import glob
+import os
+import random
+import struct
+import sys
+
+# -----------------------------
+# Formats
+# -----------------------------
+#
+# Text form (as printed by gpgpu_sim::print_stats):
+#   [danger region] reg=%rs55 cycles=959-2905,3228-3547
+#
+# Binary index (little-endian):
+#   header   : 8s magic, u32 n_regs, u32 n_intervals
+#   n_regs   : u16 name_len, u32 first_interval, u32 n_intervals, u64 total_len
+#   names    : concatenated utf-8 register names (name_len bytes each)
+#   intervals: n_intervals x (u64 start, u64 end), closed, sorted, disjoint
+
+TEXT_PREFIX = "[danger region] reg="
+INDEX_MAGIC = b"DREGIDX1"
+_HEADER = struct.Struct("<8sII")
+_REG = struct.Struct("<HIIQ")
+
+
+def parse_ranges(spec: str):
+    """Parse "a-b,c,d-e" into a list of (start, end) closed intervals."""
+    ranges = []
+    for part in spec.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        if "-" in part:
+            a, b = part.split("-", 1)
+        else:
+            a = b = part
+        try:
+            start = int(a)
+            end = int(b)
+        except ValueError:
+            continue
+        if end < start:
+            start, end = end, start
+        ranges.append((start, end))
+    return ranges
+
+
+def merge_intervals(intervals):
+    """Sort and merge overlapping or adjacent closed intervals."""
+    merged = []
+    for start, end in sorted(intervals):
+        if merged and start <= merged[-1][1] + 1:
+            if end > merged[-1][1]:
+                merged[-1] = (merged[-1][0], end)
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def interval_length(intervals) -> int:
+    return sum(end - start + 1 for start, end in intervals)
+
+
+# -----------------------------
+# Extraction from simulator output
+# -----------------------------
+
+
+def extract_from_log(log_path: str, regions=None):
+    """Collect every "[danger region] reg=..." line of a simulator log into regions (union per register)."""
+    if regions is None:
+        regions = {}
+    with open(log_path, "r", encoding="utf-8", errors="ignore") as f:
+        for line in f:
+            if not line.startswith(TEXT_PREFIX):
+                continue
+            body = line[len(TEXT_PREFIX):].strip()
+            reg, sep, spec = body.partition(" cycles=")
+            if not sep or not reg:
+                continue
+            regions.setdefault(reg, []).extend(parse_ranges(spec))
+    return regions
+
+
+def expand_inputs(inputs):
+    """Expand files, directories (all tmp.out* below them) and glob patterns."""
+    paths = []
+    for item in inputs:
+        if os.path.isdir(item):
+            paths.extend(sorted(glob.glob(os.path.join(item, "**", "tmp.out*"), recursive=True)))
+        elif any(ch in item for ch in "*?["):
+            paths.extend(sorted(glob.glob(item, recursive=True)))
+        else:
+            paths.append(item)
+    return paths
+
+
+def extract(inputs):
+    """Merge the danger regions of all input logs; returns {reg: [(start, end), ...]}."""
+    regions = {}
+    for path in expand_inputs(inputs):
+        if not os.path.exists(path):
+            print(f"Warning: log file not found: {path}", file=sys.stderr)
+            continue
+        extract_from_log(path, regions)
+    return {reg: merge_intervals(ivals) for reg, ivals in regions.items()}
+
+
+# -----------------------------
+# Text and binary index I/O
+# -----------------------------
+
+
+def register_sort_key(reg: str):
+    # %rd10 after %rd9; mirrors the natural ordering used by extract_registers.py
+    name = reg.lstrip("%")
+    head = name.rstrip("0123456789")
+    tail = name[len(head):]
+    return (head, int(tail) if tail else -1, name)
+
+
+def write_text(regions, path: str):
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        for reg in sorted(regions, key=register_sort_key):
+            ivals = regions[reg]
+            if not ivals:
+                continue
+            spec = ",".join(f"{s}-{e}" for s, e in ivals)
+            f.write(f"{TEXT_PREFIX}{reg} cycles={spec}\n")
+    os.replace(tmp, path)
+
+
+def read_text(path: str):
+    """Parse a text danger-region file (cycle_region.txt / danger.log)."""
+    return {reg: merge_intervals(ivals) for reg, ivals in extract_from_log(path).items()}
+
+
+def write_index(regions, path: str):
+    regs = [r for r in sorted(regions, key=register_sort_key) if regions[r]]
+    names = [r.encode("utf-8") for r in regs]
+    flat = []
+    records = []
+    for reg, name in zip(regs, names):
+        ivals = regions[reg]
+        records.append(_REG.pack(len(name), len(flat) // 2, len(ivals), interval_length(ivals)))
+        for s, e in ivals:
+            flat.extend((s, e))
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(_HEADER.pack(INDEX_MAGIC, len(regs), len(flat) // 2))
+        f.write(b"".join(records))
+        f.write(b"".join(names))
+        f.write(struct.pack(f"<{len(flat)}Q", *flat))
+    os.replace(tmp, path)
+
+
+def read_index(path: str):
+    """Load a binary index; returns {reg: [(start, end), ...]}."""
+    with open(path, "rb") as f:
+        buf = f.read()
+    magic, n_regs, n_ivals = _HEADER.unpack_from(buf, 0)
+    if magic != INDEX_MAGIC:
+        raise ValueError(f"{path}: not a danger-region index")
+    off = _HEADER.size
+    records = [_REG.unpack_from(buf, off + i * _REG.size) for i in range(n_regs)]
+    off += n_regs * _REG.size
+    names = []
+    for name_len, _, _, _ in records:
+        names.append(buf[off:off + name_len].decode("utf-8"))
+        off += name_len
+    flat = struct.unpack_from(f"<{2 * n_ivals}Q", buf, off)
+    regions = {}
+    for name, (_, first, count, _) in zip(names, records):
+        regions[name] = [(flat[2 * i], flat[2 * i + 1]) for i in range(first, first + count)]
+    return regions
+
+
+def load_regions(text_path: str = "", index_path: str = ""):
+    """Prefer the binary index unless the text file was edited after it was written."""
+    if index_path and os.path.exists(index_path):
+        stale = (
+            text_path
+            and os.path.exists(text_path)
+            and os.path.getmtime(text_path) > os.path.getmtime(index_path)
+        )
+        if not stale:
+            return read_index(index_path)
+    if text_path and os.path.exists(text_path):
+        return read_text(text_path)
+    return {}
+
+
+# -----------------------------
+# Cycle selection (used by campaign_exec.sh)
+# -----------------------------
+
+
+def prefix_lengths(ranges):
+    """Cumulative lengths: prefix[i] = cycles in ranges[:i]; prefix[-1] is the total."""
+    prefix = [0]
+    for start, end in ranges:
+        prefix.append(prefix[-1] + end - start + 1)
+    return prefix
+
+
+def cycle_at(ranges, prefix, offset: int):
+    """The offset-th cycle (0-based) of sorted, disjoint ranges, by binary search on prefix."""
+    i = bisect.bisect_right(prefix, offset) - 1
+    return ranges[i][0] + offset - prefix[i]
+
+
+def subtract(ranges, holes):
+    """Cycles of ranges that are not in holes (both sorted, disjoint, closed)."""
+    out = []
+    j = 0
+    for start, end in ranges:
+        while j < len(holes) and holes[j][1] < start:
+            j += 1
+        k = j
+        while start <= end and k < len(holes) and holes[k][0] <= end:
+            if holes[k][0] > start:
+                out.append((start, holes[k][0] - 1))
+            start = max(start, holes[k][1] + 1)
+            k += 1
+        if start <= end:
+            out.append((start, end))
+    return out
+
+
+def pick_within(ranges, rng=random):
+    prefix = prefix_lengths(ranges)
+    if prefix[-1] <= 0:
+        return None
+    return cycle_at(ranges, prefix, rng.randint(0, prefix[-1] - 1))
+
+
+def pick_outside(ranges, cycles_path: str, rng=random):
+    """Uniform cycle of the cycle domain (range-encoded or legacy cycles.txt) outside ranges."""
+    return pick_within(subtract(read_cycle_domain(cycles_path), ranges), rng)
+
+
+# -----------------------------
+# Cycle domain (cycles.txt)
+# -----------------------------
+#
+# One "start-end" segment per line; a line with a single cycle is a one-cycle
+# segment, so the legacy one-cycle-per-line cycles.txt is read unchanged.
+
+
+def read_cycle_domain(path: str):
+    ranges = []
+    try:
+        with open(path, "r", encoding="utf-8", errors="ignore") as f:
+            for line in f:
+                line = line.strip()
+                if line and not line.startswith("#"):
+                    ranges.extend(parse_ranges(line))
+    except OSError:
+        return []
+    return merge_intervals(ranges)
+
+
+def write_cycle_domain(ranges, path: str):
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        for start, end in ranges:
+            f.write(f"{start}-{end}\n")
+    os.replace(tmp, path)
+
+
+# -----------------------------
+# CLI
+# -----------------------------
+
+
+def cmd_extract(args):
+    regions = extract(args.logs)
+    if not regions:
+        print("Error: no [danger region] lines found in inputs", file=sys.stderr)
+        return 1
+    index_path = args.index or os.path.splitext(args.output)[0] + ".idx"
+    write_text(regions, args.output)
+    write_index(regions, index_path)
+    for extra in args.copy_to:
+        write_text(regions, extra)
+        write_index(regions, os.path.splitext(extra)[0] + ".idx")
+    total = sum(interval_length(v) for v in regions.values())
+    print(
+        f"Extracted danger regions for {len(regions)} registers "
+        f"({total} dangerous cycles) -> {args.output}, {index_path}"
+    )
+    return 0
+
+
+def cmd_sample(args):
+    ranges = load_regions(args.text, args.index).get(args.reg, [])
+    chosen = None
+    if ranges:
+        if args.within:
+            chosen = pick_within(ranges)
+        else:
+            chosen = pick_outside(ranges, args.cycles)
+    print(args.fallback if chosen is None else chosen)
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Extract, index and sample register danger regions.")
+    sub = parser.add_subparsers(dest="cmd")
+    sub.required = True  # the required= keyword needs Python 3.7
+
+    p = sub.add_parser("extract", help="Extract [danger region] lines from simulator logs")
+    p.add_argument("logs", nargs="+", help="tmp.out files, directories or glob patterns (merged)")
+    p.add_argument("--output", "-o", default="cycle_region.txt", help="Text output path")
+    p.add_argument("--index", "-i", default="", help="Binary index path (default: <output>.idx)")
+    p.add_argument(
+        "--copy-to",
+        action="append",
+        default=[],
+        help="Also write the text form (and its .idx) here, e.g. ../accel/danger.log",
+    )
+    p.set_defaults(func=cmd_extract)
+
+    p = sub.add_parser("sample", help="Pick an injection cycle for a register")
+    p.add_argument("reg", help="Register name, e.g. %%r12")
+    p.add_argument("--text", default="cycle_region.txt", help="Text danger-region file")
+    p.add_argument("--index", default="cycle_region.idx", help="Binary danger-region index")
+    p.add_argument("--within", type=int, default=1, help="1: inside danger regions, 0: outside")
+    p.add_argument("--cycles", default="cycles.txt", help="Cycle domain for --within 0")
+    p.add_argument("--fallback", required=True, help="Printed when no cycle can be chosen")
+    p.set_defaults(func=cmd_sample)
+
+    args = parser.parse_args()
+    sys.exit(args.func(args))
+
+
+if __name__ == "__main__":
+    main()
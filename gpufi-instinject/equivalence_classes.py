@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import argparse
+import os
+import re
+import sys
+from collections import Counter
+
+# -----------------------------
+# Formats
+# -----------------------------
+#
+# Two register injections are equivalent when they hit the same thread's
+# register while it holds the same value (same writer, "def") and no read of
+# it happened in between (same latest access, "use"), flipping the same bits:
+# the simulator is deterministic and nothing observed the register between the
+# two flips. The simulator prints the class of every single-register injection:
+#   [REG_FI_CLASS] key=tid=17;reg=%r12;def=1040;use=1187;bits=5
+#
+# Class file (EQUIV_CLASS_FILE, one simulated representative per class), written
+# by campaign_exec.sh and read by the simulator through -fi_equiv_classes:
+#   <key> <outcome> <run_uid>
+#
+# A run whose class is already listed stops right after the flip; campaign_exec.sh
+# reports it with the representative's outcome:
+#   [Run 7] tmp.out3: SDC (pruned, equivalent to r2b5)
+
+RE_PRUNED = re.compile(
+    r"^\[Run\s+(\d+)\]\s+(tmp\.out\d+):\s*(\w+)\s+\(pruned, equivalent to (r\d+b\d+)\)"
+)
+RE_RESULT = re.compile(r"^\[Run\s+(\d+)\]\s+(tmp\.out\d+):\s*(\w+)")
+
+
+def parse_key(key: str):
+    """Split "tid=..;reg=..;def=..;use=..;bits=.." into a dict."""
+    fields = {}
+    for part in key.split(";"):
+        name, sep, value = part.partition("=")
+        if sep:
+            fields[name] = value
+    return fields
+
+
+def read_classes(path: str):
+    """Return {key: (outcome, run_uid)} from a class file."""
+    classes = {}
+    if not path or not os.path.exists(path):
+        return classes
+    with open(path, "r", encoding="utf-8", errors="ignore") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) >= 3 and parts[0] not in classes:
+                classes[parts[0]] = (parts[1], parts[2])
+    return classes
+
+
+def read_members(log_path: str):
+    """
+    Count the runs of inst_exec.log: returns (simulated, pruned Counter by
+    representative run_uid). Unclassified runs are not counted.
+    """
+    simulated = 0
+    pruned = Counter()
+    if not os.path.exists(log_path):
+        print(f"Warning: log file not found: {log_path}", file=sys.stderr)
+        return simulated, pruned
+    with open(log_path, "r", encoding="utf-8", errors="ignore") as f:
+        for line in f:
+            m = RE_PRUNED.match(line)
+            if m:
+                pruned[m.group(4)] += 1
+                continue
+            m = RE_RESULT.match(line)
+            if m and m.group(3) in ("Masked", "SDC", "DUE"):
+                simulated += 1
+    return simulated, pruned
+
+
+# -----------------------------
+# Report
+# -----------------------------
+
+
+def report(classes, simulated: int, pruned, top: int):
+    n_pruned = sum(pruned.values())
+    total = simulated + n_pruned
+    print("========== Equivalence classes ==========")
+    print(f"Classes with a simulated representative: {len(classes)}")
+    print(f"Classified injections: {total} (simulated {simulated}, pruned {n_pruned})")
+    if total:
+        print(f"Simulations saved: {n_pruned / total * 100:.1f}%")
+
+    sizes = Counter()
+    by_reg = Counter()
+    rep_of = {run_uid: key for key, (_, run_uid) in classes.items()}
+    for key, (_, run_uid) in classes.items():
+        size = 1 + pruned.get(run_uid, 0)
+        sizes[size] += 1
+        by_reg[parse_key(key).get("reg", "?")] += size - 1
+    if sizes:
+        print("Class size (sampled members) distribution:")
+        for size in sorted(sizes):
+            print(f"  {size:5d}: {sizes[size]} classes")
+    if top > 0 and pruned:
+        print(f"Largest classes (top {top}):")
+        for run_uid, count in pruned.most_common(top):
+            key = rep_of.get(run_uid, "?")
+            outcome = classes[key][0] if key in classes else "?"
+            print(f"  {run_uid:>10s} {outcome:<6s} size={1 + count:<5d} {key}")
+    if by_reg:
+        regs = ", ".join(f"{reg}:{n}" for reg, n in by_reg.most_common(top) if n)
+        if regs:
+            print(f"Pruned injections per register: {regs}")
+    print("=========================================")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Summarize equivalence-class pruning of a campaign (classes, sizes, saved simulations)."
+    )
+    base_dir = os.path.dirname(os.path.abspath(__file__))
+    parser.add_argument(
+        "--classes",
+        default=os.path.join(base_dir, "equiv_classes.txt"),
+        help="Class file written by campaign_exec.sh (EQUIV_CLASS_FILE)",
+    )
+    parser.add_argument(
+        "--log", default=os.path.join(base_dir, "inst_exec.log"), help="Campaign log"
+    )
+    parser.add_argument("--top", type=int, default=10, help="Largest classes to list")
+    args = parser.parse_args()
+
+    simulated, pruned = read_members(args.log)
+    report(read_classes(args.classes), simulated, pruned, args.top)
+
+
+if __name__ == "__main__":
+    main()
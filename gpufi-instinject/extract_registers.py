@@ -1,9 +1,46 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
+import argparse
 import sys
 import re
 import os
+from collections import Counter
+
+from kernel_domains import demangle
+
+# 输出文件：
+#   register_used.txt     所有 kernel 中被指令引用的寄存器（每行一个，自然排序），campaign_exec.sh 从中抽取；
+#                         %r<122> 这样的声明只是上界，从未引用的编号（如 %r0）注入后只会得到 invalid_summary，
+#                         不写入；给出 --reg-sum 时再去掉 profiling 日志 [PTX_REG_SUM] 中没有读写过的已声明寄存器
+#   register_width.txt    "<寄存器> <位宽>"，只含有 .reg 声明的寄存器
+#   register_kernels.txt  每个 .entry/.func 一组 "<寄存器> <位宽> <定义次数> <使用次数> <kernel>"，
+#                         kernel 名放在最后（c++filt -p 之后可能含空格），与 kernel_domains.txt 同名；
+#                         位宽 0 表示未声明（如 %tid），定义/使用次数都为 0 表示只声明、从未引用
+
+# 需要排除的“基名”前缀（不带 %，不区分大小写）
+# 你要求排除 %ctaid，即使没有 .x；这里用 startswith 覆盖 ctaid 的复合形式。
+BLOCKED_PREFIXES = ("ctaid",)
+
+# 函数头：".visible .entry _Z3fooPf(" 或 ".func (.param .b32 func_retval0) bar("
+RE_FUNC = re.compile(r"\.(entry|func)\s+(?:\([^)]*\)\s*)?([A-Za-z_$][\w$]*)")
+RE_COMMENT = re.compile(r"//[^\n]*|/\*.*?\*/", re.S)
+RE_BRACE = re.compile(r"[{}/]")
+# ".reg .b64 %rd<13>;"、".reg .pred %p<4>;"、".reg .f32 %f1, %f2;"
+RE_DECL = re.compile(r"\.reg\s+(?:\.v\d\s+)?\.(\w+)\s+([^;]+);")
+RE_RANGE = re.compile(r"%([A-Za-z_][A-Za-z0-9_]*)<(\d+)>")
+# [PTX_REG_SUM] reg="%r5" uses=1024
+RE_REG_SUM = re.compile(r'\[PTX_REG_SUM\] reg="([^"]*)" uses=(\d+)')
+# 寄存器名（%tid.x 只取 %tid）
+RE_NAME = re.compile(r"%[A-Za-z_][A-Za-z0-9_]*")
+# 被写的操作数：每行一条指令（nvcc 生成的 PTX 如此），可带谓词 @%p / @!%p，第一个操作数是寄存器、
+# 向量 {..} 或 %a|%b 时即为目的操作数；st/red/bar/bra 等没有目的寄存器，[addr] 开头的也不是。
+# 以 \n 开头，正则引擎可以直接跳到下一行而不必在每个字符上尝试
+RE_DEF = re.compile(
+    r"\n[ \t]*(?:@!?%\w+[ \t]+)?"
+    r"(?!(?:st|red|bar|barrier|bra|brx|call|ret|exit|membar|fence|prefetch|prefetchu|trap|pmevent)\b)"
+    r"[a-z][\w.]*[ \t]+(\{[^}]*\}|%\w+(?:\|%\w+)?)"
+)
 
 # 自然排序：把字符串中的数字片段按数值排序
 def natural_key(s: str):
@@ -11,68 +48,195 @@ def natural_key(s: str):
     parts = re.split(r'(\d+)', name)
     return tuple(int(p) if p.isdigit() else p for p in parts)
 
+# 声明类型 -> 位宽（.pred 的值只在最低位）
+def type_width(ptx_type: str):
+    if ptx_type == "pred":
+        return 1
+    if ptx_type in ("f16x2", "bf16x2"):
+        return 32
+    if ptx_type == "bf16":
+        return 16
+    m = re.fullmatch(r"[bsuf](8|16|32|64)", ptx_type)
+    return int(m.group(1)) if m else None
+
+def is_blocked(reg: str) -> bool:
+    """reg 形如 %name；基名前缀命中 BLOCKED_PREFIXES 的屏蔽。"""
+    return reg[1:].lower().startswith(BLOCKED_PREFIXES)
+
+# 从函数体内的 .reg 声明解析寄存器及位宽；%name<COUNT> 展开为 %name0..%name{COUNT-1}，未知类型位宽为 0
+def declared_widths(code: str):
+    widths = {}
+    for ptx_type, decl in RE_DECL.findall(code):
+        width = type_width(ptx_type) or 0
+        for item in decl.split(","):
+            item = item.strip()
+            m = RE_RANGE.fullmatch(item)
+            if m:
+                # 一个函数内同名只声明一次
+                prefix = "%" + m.group(1)
+                widths.update(dict.fromkeys([prefix + str(i) for i in range(int(m.group(2)))], width))
+            elif RE_NAME.fullmatch(item):
+                widths[item] = max(width, widths.get(item, 0))
+    return widths
+
+# 一个函数体只扫描一次：声明的寄存器及位宽、引用次数、被写（定义）次数；被读（使用）次数 = 引用 - 定义
+def scan_body(body: str):
+    code = RE_COMMENT.sub("", body) if "/" in body else body
+    widths = declared_widths(code)
+    code = RE_DECL.sub("", code)
+    refs = Counter(RE_NAME.findall(code))
+    defs = Counter(RE_NAME.findall(" ".join(RE_DEF.findall(code))))
+    return widths, defs, refs
+
+# 函数体 {...} 的位置：(左括号, 右括号)；只有原型声明（先遇到 ;）时为 (-1, ;)；缓冲区不完整时为 None
+def find_body(buf: str, pos: int):
+    brace = buf.find("{", pos)
+    semi = buf.find(";", pos)
+    if semi != -1 and (brace == -1 or semi < brace):
+        return -1, semi
+    if brace == -1:
+        return None
+    depth = 0
+    pos = brace
+    while True:
+        m = RE_BRACE.search(buf, pos)
+        if not m:
+            return None
+        pos = m.end()
+        tok = m.group()
+        if tok == "/":
+            # 注释里的括号不计入
+            nxt = buf[pos:pos + 1]
+            if nxt == "/":
+                pos = buf.find("\n", pos)
+            elif nxt == "*":
+                pos = buf.find("*/", pos)
+            if pos == -1:
+                return None
+            continue
+        depth += 1 if tok == "{" else -1
+        if depth == 0:
+            return brace, m.start()
+
+# 分块读取 PTX，逐个产出 (kind, 名字, 函数体)；内存只保留当前未读完的函数
+def iter_functions(f, chunk_size: int = 1 << 22):
+    buf, pos = "", 0
+    while True:
+        m = RE_FUNC.search(buf, pos)
+        span = find_body(buf, m.end()) if m else None
+        if span is not None:
+            if span[0] >= 0:
+                yield m.group(1), m.group(2), buf[span[0] + 1:span[1]]
+            pos = span[1] + 1
+            continue
+        chunk = f.read(chunk_size)
+        if not chunk:
+            return
+        # 保留未读完的函数；没有函数头时只有最后一行可能是被截断的函数头
+        keep = m.start() if m else max(buf.rfind("\n", pos) + 1, pos)
+        buf, pos = buf[keep:] + chunk, 0
+
+# profiling 日志中的 [PTX_REG_SUM] 动态读写次数；日志里没有这些行时返回 None
+def read_reg_sum(log_file: str):
+    uses = {}
+    with open(log_file, "r", encoding="utf-8", errors="ignore") as f:
+        for line in f:
+            if line.startswith("[PTX_REG_SUM] reg="):
+                m = RE_REG_SUM.match(line)
+                if m:
+                    uses[m.group(1)] = uses.get(m.group(1), 0) + int(m.group(2))
+    return uses or None
+
 def main():
-    if len(sys.argv) != 2:
-        print(f"Usage: {sys.argv[0]} <basename>")
-        sys.exit(1)
+    parser = argparse.ArgumentParser(description="Extract the injectable registers of <basename>.ptx")
+    parser.add_argument("basename", help="PTX file without the .ptx suffix")
+    parser.add_argument("--reg-sum", default="", help="Profiling log; also drop declared registers with no [PTX_REG_SUM] uses")
+    parser.add_argument("--keep-unused", action="store_true", help="Keep declared registers that are never referenced")
+    args = parser.parse_args()
 
-    base = sys.argv[1]
+    base = args.basename
     ptx_file = f"{base}.ptx"
     txt_file = "register_used.txt"
+    width_file = "register_width.txt"
+    kernel_file = "register_kernels.txt"
 
     if not os.path.exists(ptx_file):
         print(f"Error: {ptx_file} not found.")
         sys.exit(1)
 
+    functions = []
     with open(ptx_file, "r", encoding="utf-8", errors="ignore") as f:
-        text = f.read()
-
-    registers = set()
-
-    # 需要排除的“基名”前缀（不带 %，不区分大小写）
-    # 你要求排除 %ctaid，即使没有 .x；这里用 startswith 覆盖 ctaid 的复合形式。
-    blocked_prefixes = ("ctaid",)
-
-    def is_blocked(reg: str) -> bool:
-        """reg 形如 %name[...]；屏蔽带点的，以及基名前缀命中 blocked_prefixes 的。"""
-        if '.' in reg:
-            return True
-        m = re.match(r"%([A-Za-z_]+)", reg)
-        if not m:
-            return False
-        base = m.group(1).lower()
-        return any(base.startswith(bp) for bp in blocked_prefixes)
-
-    # 1) 展开 %name<COUNT> 形式（如 %r<122>、%rd<13>）
-    for base_name, count_str in re.findall(r"%(?P<base>[A-Za-z_][A-Za-z0-9_]*)<(?P<count>\d+)>", text):
-        if any(base_name.lower().startswith(bp) for bp in blocked_prefixes):
-            continue  # 跳过被屏蔽基名的范围声明
-        count = int(count_str)
-        for i in range(count):
-            reg = f"%{base_name}{i}"
-            if not is_blocked(reg):
-                registers.add(reg)
-
-    # 2) 捕获一般寄存器名（明确排除 %name<COUNT> 和任何带点号的）
-    general_pattern = re.compile(
-        r"%(?![A-Za-z_][A-Za-z0-9_]*<)"      # 非 %name<COUNT>
-        r"[A-Za-z_][A-Za-z0-9_]*"            # 主体：字母/数字/下划线
-        r"(?:_[A-Za-z0-9_]+)*"               # 允许 _suffix（如 _sh1）
-        r"(?:\d+)?"
-    )
-
-    for m in general_pattern.finditer(text):
-        reg = m.group(0)
-        if not is_blocked(reg):
-            registers.add(reg)
+        for kind, name, body in iter_functions(f):
+            functions.append((kind, name) + scan_body(body))
+
+    declared = set()
+    referenced = set()
+    widths = {}
+    for _, _, kw, defs, refs in functions:
+        declared.update(kw)
+        referenced.update(refs)
+        for reg, width in kw.items():
+            # 不同 kernel 中同名寄存器类型不同时取最宽的
+            widths[reg] = max(width, widths.get(reg, 0))
 
     # 去重 + 自然排序
-    registers = sorted(registers, key=natural_key)
+    candidates = sorted((r for r in declared | referenced if not is_blocked(r)), key=natural_key)
+    rank = {reg: i for i, reg in enumerate(candidates)}
+
+    registers = candidates if args.keep_unused else [r for r in candidates if r in referenced]
+    unused = len(candidates) - len(registers)
+    idle = 0
+    if args.reg_sum:
+        reg_sum = read_reg_sum(args.reg_sum) if os.path.exists(args.reg_sum) else None
+        if reg_sum is None:
+            print(f"Warning: no [PTX_REG_SUM] lines in {args.reg_sum}, keeping the static register list", file=sys.stderr)
+        else:
+            # 未声明的特殊寄存器（如 %tid）不经过 set_reg，不在 [PTX_REG_SUM] 中，保留
+            kept = [r for r in registers if r not in declared or reg_sum.get(r)]
+            idle = len(registers) - len(kept)
+            registers = kept
 
     with open(txt_file, "w", encoding="utf-8") as f:
         f.write("\n".join(registers))
 
     print(f"Extracted {len(registers)} registers -> {txt_file}")
+    # 均匀抽取时，每次落在被剔除寄存器上的注入都是白白模拟的 invalid_summary
+    if unused or idle:
+        pruned = unused + idle
+        print(
+            f"Pruned {pruned} of {len(candidates)} registers ({unused} never referenced, {idle} never used at run time): "
+            f"{100.0 * pruned / len(candidates):.1f}% of uniformly drawn injections saved"
+        )
+
+    # 每行 "<寄存器> <位宽>"，campaign_exec.sh 按位宽抽取翻转位；未声明的（如 %tid）不写入
+    with open(width_file, "w", encoding="utf-8") as f:
+        f.write("\n".join(f"{reg} {widths[reg]}" for reg in registers if widths.get(reg)))
+    by_width = {}
+    for reg in registers:
+        if widths.get(reg):
+            by_width[widths[reg]] = by_width.get(widths[reg], 0) + 1
+    summary = ", ".join(f"{w}-bit: {n}" for w, n in sorted(by_width.items()))
+    print(f"Declared widths ({summary}) -> {width_file}")
+
+    # 每个 kernel 的寄存器列表，名字与 [REG_FI_WRITER] 行和 kernel_domains.txt 一致
+    short = demangle(name for _, name, _, _, _ in functions)
+    tmp = kernel_file + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        for kind, name, kw, defs, refs in functions:
+            regs = sorted((r for r in set(kw).union(refs) if r in rank), key=rank.__getitem__)
+            f.write(
+                "".join(
+                    f"{reg} {kw.get(reg, 0)} {defs[reg]} {refs[reg] - defs[reg]} {short[name]}\n" for reg in regs
+                )
+            )
+    os.replace(tmp, kernel_file)
+    print(f"Per-kernel registers of {len(functions)} functions -> {kernel_file}")
+    for kind, name, kw, defs, refs in functions[:20]:
+        live = sum(1 for reg in kw if reg in refs)
+        read = sum(1 for reg in refs if refs[reg] > defs[reg])
+        print(f"  {short[name]} ({kind}): declared {len(kw)}, referenced {live}, written {len(defs)}, read {read}")
+    if len(functions) > 20:
+        print(f"  ... {len(functions) - 20} more")
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,365 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import argparse
+import html
+import itertools
+import os
+import struct
+import sys
+import time
+import zlib
+
+import numpy as np
+
+import results_db as rdb
+from analysis_fault import parse_log
+
+# -----------------------------
+# Formats
+# -----------------------------
+#
+# A heatmap counts the outcomes of individual injections per row and cycle bin:
+#   --by line   rows are the PTX instructions an injection reached (kernel:inst_line,
+#               one count per [*_FI_WRITER]/[*_FI_READER] record, like write_csv)
+#   --by reg    rows are the injected registers (reg_name=a:b counts each register)
+# Bins split [cycle_from, cycle_to] into equal parts of the injection cycle.
+#
+# Event file (.npz, "extract"), one record per row an injection counts in:
+#   key       int32 [n]                row index into labels
+#   cycle     int64 [n]                injection cycle
+#   outcome   int8 [n]                 index into OUTCOMES
+#   labels    str [rows]
+#   by        "line" or "reg"
+# Reading the database or the log is the slow part and happens once; "build"
+# bins the event arrays in one NumPy pass (about a second for 10^7 records).
+#
+# Heatmap file (.npz, "build"):
+#   counts    uint32 [rows, bins, 4]   outcomes in OUTCOMES order
+#   labels    str [rows]               "kernel:line inst_text" or register name
+#   edges     int64 [bins + 1]         bin b covers edges[b] .. edges[b + 1] - 1
+#   outcomes  str [4]
+#   by        "line" or "reg"
+
+OUTCOMES = rdb.OUTCOMES
+OUTCOME_CASE = (
+    "CASE i.outcome WHEN 'Masked' THEN 0 WHEN 'SDC' THEN 1 WHEN 'DUE' THEN 2 ELSE 3 END"
+)
+METRICS = ("sdc", "due", "masked", "total", "sdc_rate", "due_rate")
+
+
+# -----------------------------
+# Injection arrays
+# -----------------------------
+
+
+def fetch_columns(cursor, width: int):
+    """Rows of integers from a cursor as an int64 array [n, width], without Python-level row handling."""
+    flat = np.fromiter(itertools.chain.from_iterable(cursor), dtype=np.int64)
+    return flat.reshape(-1, width)
+
+
+def load_db(conn, campaign_ids, by: str):
+    """(labels, rows [n, 3] of key, cycle, outcome code) of the given campaigns' injections."""
+    marks = ",".join("?" * len(campaign_ids))
+    if by == "line":
+        conn.execute(
+            "CREATE TEMP TABLE hm_keys AS SELECT DISTINCT kernel, inst_line FROM injection_effects"
+            f" WHERE campaign_id IN ({marks}) AND inst_line >= 0 ORDER BY kernel, inst_line",
+            campaign_ids,
+        )
+        conn.execute("CREATE INDEX temp.hm_keys_idx ON hm_keys (kernel, inst_line)")
+        texts = {
+            (k, line): text
+            for k, line, text in conn.execute(
+                f"SELECT kernel, inst_line, inst_text FROM outcomes WHERE campaign_id IN ({marks})", campaign_ids
+            )
+        }
+        keys = conn.execute("SELECT kernel, inst_line FROM hm_keys ORDER BY rowid").fetchall()
+        labels = [f"{k}:{line} {texts.get((k, line), '')}".rstrip() for k, line in keys]
+        cursor = conn.execute(
+            f"SELECT k.rowid - 1, i.cycle, {OUTCOME_CASE} FROM injection_effects e"
+            " JOIN hm_keys k ON k.kernel = e.kernel AND k.inst_line = e.inst_line"
+            " JOIN injections i ON i.id = e.injection_id"
+            f" WHERE e.campaign_id IN ({marks}) AND i.cycle IS NOT NULL",
+            campaign_ids,
+        )
+    else:
+        conn.execute(
+            "CREATE TEMP TABLE hm_keys AS SELECT DISTINCT reg FROM injection_registers"
+            f" WHERE campaign_id IN ({marks}) ORDER BY reg",
+            campaign_ids,
+        )
+        conn.execute("CREATE INDEX temp.hm_keys_idx ON hm_keys (reg)")
+        labels = [reg for (reg,) in conn.execute("SELECT reg FROM hm_keys ORDER BY rowid")]
+        cursor = conn.execute(
+            f"SELECT k.rowid - 1, i.cycle, {OUTCOME_CASE} FROM injection_registers r"
+            " JOIN hm_keys k ON k.reg = r.reg JOIN injections i ON i.id = r.injection_id"
+            f" WHERE r.campaign_id IN ({marks}) AND i.cycle IS NOT NULL",
+            campaign_ids,
+        )
+    return labels, fetch_columns(cursor, 3)
+
+
+def load_log(log_path: str, by: str):
+    """Same as load_db, straight from a campaign log (analysis_fault.parse_log)."""
+    effects_occ, results_occ, params_by_pair, _ = parse_log(log_path)
+    index = {}
+    labels = []
+    rows = []
+    for (run_id, name, occ), outcome in results_occ.items():
+        params = rdb.parse_params(params_by_pair.get((run_id, name), ""))
+        cycle = rdb.to_int(params.get("cycle"))
+        if cycle is None:
+            continue
+        code = OUTCOMES.index(outcome) if outcome in OUTCOMES else 3
+        if by == "line":
+            keys = [
+                ((rec["kernel"], rec["inst_line"]), f"{rec['kernel']}:{rec['inst_line']} {rec['inst_text']}".rstrip())
+                for rec in effects_occ.get((run_id, name, occ), [])
+                if rec.get("inst_line", -1) >= 0
+            ]
+        else:
+            keys = [(reg, reg) for reg in params.get("reg_name", "").strip('"').split(":") if reg]
+        for key, label in keys:
+            if key not in index:
+                index[key] = len(labels)
+                labels.append(label)
+            rows.append((index[key], cycle, code))
+    # same row order as load_db
+    keys = list(index)
+    order = sorted(range(len(labels)), key=lambda i: keys[i])
+    remap = np.empty(len(labels), dtype=np.int64)
+    remap[order] = np.arange(len(labels))
+    data = np.array(rows, dtype=np.int64).reshape(-1, 3)
+    if len(data):
+        data[:, 0] = remap[data[:, 0]]
+    return [labels[i] for i in order], data
+
+
+# -----------------------------
+# Aggregation
+# -----------------------------
+
+
+def cycle_edges(cycles, bins: int, cycle_from=None, cycle_to=None):
+    lo = int(cycles.min()) if cycle_from is None and len(cycles) else (cycle_from or 0)
+    hi = int(cycles.max()) if cycle_to is None and len(cycles) else (cycle_to or lo)
+    span = max(hi - lo + 1, 1)
+    bins = max(min(bins, span), 1)
+    return lo + (np.arange(bins + 1, dtype=np.int64) * span) // bins
+
+
+def histogram(keys, cycles, outcomes, n_keys: int, edges):
+    """counts [n_keys, bins, 4] of the event arrays, in one bincount pass."""
+    n_bins = len(edges) - 1
+    inside = (cycles >= edges[0]) & (cycles < edges[-1])
+    if not inside.all():
+        keys, cycles, outcomes = keys[inside], cycles[inside], outcomes[inside]
+    b = np.searchsorted(edges, cycles, side="right") - 1
+    flat = (keys.astype(np.int64) * n_bins + b) * len(OUTCOMES) + outcomes
+    counts = np.bincount(flat, minlength=n_keys * n_bins * len(OUTCOMES))
+    counts = counts.reshape(n_keys, n_bins, len(OUTCOMES))
+    return counts.astype(np.uint32) if counts.max(initial=0) < 2 ** 32 else counts
+
+
+def cell_values(counts, metric: str):
+    """Per-cell values [rows, bins] and per-row totals [rows] used to rank the rows."""
+    counts = counts.astype(np.float64)
+    total = counts.sum(axis=2)
+    col = {"masked": 0, "sdc": 1, "due": 2}
+    if metric == "total":
+        return total, total.sum(axis=1)
+    if metric in col:
+        cells = counts[:, :, col[metric]]
+        return cells, cells.sum(axis=1)
+    hits = counts[:, :, col[metric.split("_")[0]]]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        cells = np.where(total > 0, hits / total, 0.0)
+        rows = np.where(total.sum(axis=1) > 0, hits.sum(axis=1) / total.sum(axis=1), 0.0)
+    return cells, rows
+
+
+def hottest(row_values, top: int):
+    order = np.argsort(-row_values, kind="stable")
+    order = order[row_values[order] > 0]
+    return order[:top] if top > 0 else order
+
+
+# -----------------------------
+# Rendering
+# -----------------------------
+
+
+def colors(values):
+    """White (0) to dark red (max) uint8 RGB [rows, bins, 3]."""
+    peak = values.max(initial=0.0)
+    t = values / peak if peak > 0 else values
+    rgb = np.empty(values.shape + (3,), dtype=np.uint8)
+    rgb[..., 0] = np.round(255 - 75 * t)
+    rgb[..., 1] = np.round(255 * (1 - t))
+    rgb[..., 2] = np.round(255 * (1 - t))
+    return rgb
+
+
+def write_png(rgb, path: str, cell_w: int, cell_h: int):
+    """8-bit RGB PNG, one cell_w x cell_h block per cell (zlib only, no imaging library)."""
+    img = np.repeat(np.repeat(rgb, cell_h, axis=0), cell_w, axis=1)
+    h, w = img.shape[:2]
+    raw = np.concatenate([np.zeros((h, 1), dtype=np.uint8), img.reshape(h, w * 3)], axis=1).tobytes()
+
+    def chunk(tag, data):
+        return struct.pack(">I", len(data)) + tag + data + struct.pack(">I", zlib.crc32(tag + data) & 0xFFFFFFFF)
+
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(b"\x89PNG\r\n\x1a\n")
+        f.write(chunk(b"IHDR", struct.pack(">IIBBBBB", w, h, 8, 2, 0, 0, 0)))
+        f.write(chunk(b"IDAT", zlib.compress(raw, 6)))
+        f.write(chunk(b"IEND", b""))
+    os.replace(tmp, path)
+
+
+def write_html(counts, labels, edges, rows, values, metric: str, path: str):
+    rgb = colors(values[rows])
+    out = [
+        "<!DOCTYPE html><html><head><meta charset='utf-8'><title>Vulnerability heatmap</title><style>",
+        "table{border-collapse:collapse;font:11px monospace}td{width:8px;height:14px;padding:0}",
+        "th{font-weight:normal;text-align:left;padding-right:8px;white-space:nowrap}",
+        "</style></head><body>",
+        f"<p>{html.escape(metric)} per cycle bin: {len(edges) - 1} bins of cycles {edges[0]}-{edges[-1] - 1}, "
+        f"{len(rows)} of {len(labels)} rows, hottest first</p><table>",
+    ]
+    for i, r in enumerate(rows):
+        cells = []
+        for b in range(len(edges) - 1):
+            c = counts[r, b]
+            tip = f"cycles {edges[b]}-{edges[b + 1] - 1}: " + " ".join(
+                f"{cat}={int(n)}" for cat, n in zip(OUTCOMES, c)
+            )
+            color = "#%02x%02x%02x" % tuple(rgb[i, b])
+            cells.append(f"<td style='background:{color}' title='{tip}'></td>")
+        out.append(f"<tr><th>{html.escape(labels[r])}</th>{''.join(cells)}</tr>")
+    out.append("</table></body></html>")
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write("\n".join(out))
+    os.replace(tmp, path)
+
+
+# -----------------------------
+# CLI
+# -----------------------------
+
+
+def cmd_extract(args):
+    t0 = time.time()
+    if args.log:
+        labels, data = load_log(args.log, args.by)
+    else:
+        conn = rdb.connect(args.db)
+        campaigns = rdb.find_campaigns(conn, args.app, args.test, args.components, args.bitflip)
+        if not campaigns:
+            print(f"Error: no matching campaigns in {args.db}", file=sys.stderr)
+            return 1
+        labels, data = load_db(conn, [c[0] for c in campaigns], args.by)
+        conn.close()
+    if not len(data):
+        print("Error: no injections with a cycle to aggregate", file=sys.stderr)
+        return 1
+    tmp = args.output + ".tmp.npz"
+    np.savez_compressed(
+        tmp, key=data[:, 0].astype(np.int32), cycle=data[:, 1], outcome=data[:, 2].astype(np.int8),
+        labels=np.array(labels, dtype=str), by=np.array(args.by),
+    )
+    os.replace(tmp, args.output)
+    print(
+        f"Extracted {len(data)} {'effect' if args.by == 'line' else 'register'} records of "
+        f"{len(labels)} rows -> {args.output} ({time.time() - t0:.2f}s)"
+    )
+    return 0
+
+
+def cmd_build(args):
+    t0 = time.time()
+    with np.load(args.events) as f:
+        keys, cycles, outcomes = f["key"], f["cycle"], f["outcome"]
+        labels, by = f["labels"], f["by"]
+    edges = cycle_edges(cycles, args.bins, args.cycle_from, args.cycle_to)
+    counts = histogram(keys, cycles, outcomes, len(labels), edges)
+    tmp = args.output + ".tmp.npz"
+    np.savez_compressed(tmp, counts=counts, labels=labels, edges=edges, outcomes=np.array(OUTCOMES), by=by)
+    os.replace(tmp, args.output)
+    print(
+        f"Aggregated {len(keys)} records into {len(labels)} rows x {len(edges) - 1} bins "
+        f"-> {args.output} ({time.time() - t0:.2f}s)"
+    )
+    return 0
+
+
+def cmd_render(args):
+    with np.load(args.heatmap) as f:
+        counts, labels, edges = f["counts"], [str(x) for x in f["labels"]], f["edges"]
+    values, row_values = cell_values(counts, args.metric)
+    rows = hottest(row_values, args.top)
+    if not len(rows):
+        print(f"No row has a nonzero {args.metric}")
+        return 0
+    print(f"Hottest rows by {args.metric}:")
+    for r in rows[: args.list]:
+        c = counts[r].sum(axis=0)
+        peak = int(np.argmax(values[r]))
+        print(
+            f"  {labels[r]}: {args.metric}={row_values[r]:.4g} "
+            + " ".join(f"{cat}={int(n)}" for cat, n in zip(OUTCOMES, c))
+            + f" peak cycles {edges[peak]}-{edges[peak + 1] - 1}"
+        )
+    if args.png:
+        write_png(colors(values[rows]), args.png, args.cell[0], args.cell[1])
+        print(f"Wrote {args.png} ({len(rows)} rows, hottest first)")
+    if args.html:
+        write_html(counts, labels, edges, rows, values, args.metric, args.html)
+        print(f"Wrote {args.html}")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Outcome heatmaps per PTX instruction or register and cycle bin.")
+    sub = parser.add_subparsers(dest="cmd")
+    sub.required = True  # the required= keyword needs Python 3.7
+
+    p = sub.add_parser("extract", help="Write the injections' event arrays (.npz)")
+    p.add_argument("--db", default="results.db", help="Results database (results_db.py)")
+    p.add_argument("--log", default="", help="Read a campaign log (inst_exec.log) instead of the database")
+    p.add_argument("--app", default="", help="Application")
+    p.add_argument("--test", default="", help="Test identifier")
+    p.add_argument("--components", default="", help="Component set")
+    p.add_argument("--bitflip", default="", help="Bit flip count")
+    p.add_argument("--by", choices=("line", "reg"), default="line", help="Rows: PTX instructions or registers")
+    p.add_argument("--output", "-o", default="events.npz", help="Event file")
+    p.set_defaults(func=cmd_extract)
+
+    p = sub.add_parser("build", help="Bin an event file into a heatmap file (.npz)")
+    p.add_argument("events", nargs="?", default="events.npz", help="Event file")
+    p.add_argument("--bins", type=int, default=100, help="Cycle bins")
+    p.add_argument("--cycle-from", type=int, default=None, help="First cycle (default: earliest injection)")
+    p.add_argument("--cycle-to", type=int, default=None, help="Last cycle (default: latest injection)")
+    p.add_argument("--output", "-o", default="heatmap.npz", help="Heatmap file")
+    p.set_defaults(func=cmd_build)
+
+    p = sub.add_parser("render", help="List the hottest rows and draw the heatmap as PNG and/or HTML")
+    p.add_argument("heatmap", nargs="?", default="heatmap.npz", help="Heatmap file")
+    p.add_argument("--metric", choices=METRICS, default="sdc", help="Cell value")
+    p.add_argument("--top", type=int, default=50, help="Rows to draw, hottest first (0: all)")
+    p.add_argument("--list", type=int, default=10, help="Rows to print")
+    p.add_argument("--png", default="", help="PNG file")
+    p.add_argument("--html", default="", help="HTML file (cells show their counts on hover)")
+    p.add_argument("--cell", type=int, nargs=2, default=(4, 8), metavar=("W", "H"), help="PNG pixels per cell")
+    p.set_defaults(func=cmd_render)
+
+    args = parser.parse_args()
+    sys.exit(args.func(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -3,13 +3,30 @@
 TEST_APP_NAME="AdamW"
 COMPONENT_SET="0" # 0:RF, 1:local_mem, 2:shared_mem, 3:L1D_cache, 4:L1C_cache, 5:L1T_cache, 6:L2_cache (e.g. components_to_flip=0:1 for both RF and local_mem)
 INJECT_BIT_FLIP_COUNT=1 # number of bits to flip per injection (e.g. 2 means flip 2 bits per injection)
+REGISTER_SAMPLING=uniform # register selection: uniform, danger (proportional to danger length) or neyman
+STOP_RULE=0 # 1: stop an epoch early once the SDC/DUE rate intervals (and p, if STOP_P_MARGIN>0) are narrow enough
+STOP_CONFIDENCE=0.95 # confidence level of the stop rule intervals
+STOP_MARGIN=0.01 # max half-width of the SDC and DUE rate confidence intervals
+STOP_P_MARGIN=0 # max half-width of p from accel.py (0: not checked)
+STOP_SCOPE=overall # overall, register or kernel
+STOP_MIN_RUNS=100 # min classified injections per checked group before the rule can stop
+STOP_CHECK_EVERY=1 # batches between two stop rule checks
+EQUIV_PRUNING=0 # 1: simulate one injection per equivalence class (same thread, value, last access and bits)
 
 RUN_PER_EPOCH=1
 GPU_ARCH=sm_75
+SIZE_INDEX="" # only inject the result files of this size_list.txt line (0-based); empty: all sizes
+SLOTS_FILE="" # worker slots granted by campaign_scheduler.py; empty: each campaign uses all cores but one
+MEM_BUDGET_MB=0 # memory for the simulator runs in flight, in MB (0: no limit, auto: 90% of MemAvailable)
+LOG_DIGEST=0 # 1: store only the outcome-relevant lines of each injection's simulator output
+SCRATCH_DIR="" # RAM-backed directory for the batches in flight, e.g. /dev/shm (empty: logs<N> on disk)
+RESULTS_DB="" # SQLite database that every finished campaign is ingested into, e.g. results.db (empty: CSVs only)
+REG_SUM_PRUNING=0 # 1: also drop declared registers the profiling run never read or wrote ([PTX_REG_SUM]) from register_used.txt
 
 
 DO_BUILD=1 # 1: build before run, 0: skip build
 DO_RESULT_GEN=1 # 1: generate result files, 0: skip result generation
+EXTRACT_DANGER_REGIONS=1 # 1: refresh cycle_region.txt/.idx and ../accel/danger.log/.idx from the profiling log
 
 
 
@@ -462,6 +479,9 @@ main() {
         a=$(echo "$filename" | cut -d'-' -f1)
         b_with_ext=$(echo "$filename" | cut -d'-' -f2)
         b=$(echo "$b_with_ext" | cut -d'.' -f1)
+        if [[ -n "$SIZE_INDEX" && "$a" != "$SIZE_INDEX" ]]; then
+            continue
+        fi
 
         echo "=== Copying result and source files ==="
         # Copy the result file to project root as result.txt
@@ -497,7 +517,17 @@ main() {
         sed -i "s|^CUDA_UUT.*|CUDA_UUT=\"./${TEST_APP_NAME} ${size_line}\"|" "$FILE"
 
         echo "=== Running campaign_profile.sh ==="
-        bash campaign_profile.sh
+        # the peak RSS of the profiling run is the first estimate for memory admission in campaign_exec.sh
+        PROFILE_RSS_MB=0
+        if [[ -x /usr/bin/time ]]; then
+            /usr/bin/time -f "%M" -o profile_rss.txt bash campaign_profile.sh
+            profile_rss_kb=$(tail -n1 profile_rss.txt 2>/dev/null)
+            [[ "$profile_rss_kb" =~ ^[0-9]+$ ]] && PROFILE_RSS_MB=$(( (profile_rss_kb + 1023) / 1024 ))
+            rm -f profile_rss.txt
+            echo "=== Profiling run peak RSS: ${PROFILE_RSS_MB} MB ==="
+        else
+            bash campaign_profile.sh
+        fi
 
         if [ ! -f "$FILE_PATH" ]; then
             echo "Error: file not found: $FILE_PATH" >&2
@@ -511,6 +541,19 @@ main() {
         touch "$app_info_file"
         { get_metrics; } > >(tee "test_apps/${TEST_APP_NAME}/app_info.txt")
 
+        if [[ $EXTRACT_DANGER_REGIONS -eq 1 ]]; then
+            echo "=== Extracting danger regions ==="
+            # Keeps the previous cycle_region.txt if the log has no [danger region] lines
+            python3 danger_regions.py extract "$FILE_PATH" -o cycle_region.txt --copy-to ../accel/danger.log \
+                || echo "=== Warning: no danger regions in $FILE_PATH, keeping existing cycle_region.txt ==="
+        fi
+
+        if [[ $REG_SUM_PRUNING -eq 1 ]]; then
+            echo "=== Pruning registers unused in the profiling run ==="
+            python3 extract_registers.py $TEST_APP_NAME --reg-sum "$FILE_PATH"
+        fi
+        # accel.py leaves registers narrower than the flip count out of p, as campaign_exec.sh never draws them
+        cp register_width.txt ../accel/register_width.txt 2>/dev/null || rm -f ../accel/register_width.txt
 
         # Read campaign_exec.sh contents into a variable
         campaign_file="campaign_exec.sh"
@@ -518,9 +561,13 @@ main() {
             echo "Error: 未找到campaign_exec.sh: $campaign_file" >&2
             exit 1
         fi
-        bash generate_cycles.sh $GLOBAL_CYCLES $GLOBAL_CYCLES
-        if [ $? -ne 0 ]; then
-            echo "Error: generate_cycles.sh failed." >&2
+        echo "=== Extracting kernel cycle domains ==="
+        # cycles.txt then only holds the "start-end" segments of kernel launches; accel.py reports p per kernel
+        rm -f kernel_domains.txt ../accel/kernel_domains.txt
+        python3 kernel_domains.py extract "$FILE_PATH" -o kernel_domains.txt --copy-to ../accel/kernel_domains.txt \
+            || echo "=== Warning: no kernel launch statistics in $FILE_PATH ==="
+        if ! python3 kernel_domains.py cycles --domains kernel_domains.txt --total "$GLOBAL_CYCLES" -o cycles.txt; then
+            echo "Error: could not write cycles.txt." >&2
             exit 1
         fi
 
@@ -536,7 +583,21 @@ main() {
             -v run_times="$RUN_PER_EPOCH" \
             -v exec_time="$GLOBAL_EXEC_TIME" \
             -v component_set="$COMPONENT_SET" \
-            -v inject_bit_flip_count="$INJECT_BIT_FLIP_COUNT" '
+            -v inject_bit_flip_count="$INJECT_BIT_FLIP_COUNT" \
+            -v register_sampling="$REGISTER_SAMPLING" \
+            -v stop_rule="$STOP_RULE" \
+            -v stop_confidence="$STOP_CONFIDENCE" \
+            -v stop_margin="$STOP_MARGIN" \
+            -v stop_p_margin="$STOP_P_MARGIN" \
+            -v stop_scope="$STOP_SCOPE" \
+            -v stop_min_runs="$STOP_MIN_RUNS" \
+            -v stop_check_every="$STOP_CHECK_EVERY" \
+            -v equiv_pruning="$EQUIV_PRUNING" \
+            -v slots_file="$SLOTS_FILE" \
+            -v mem_budget_mb="$MEM_BUDGET_MB" \
+            -v run_rss_mb="$PROFILE_RSS_MB" \
+            -v log_digest="$LOG_DIGEST" \
+            -v scratch_dir="$SCRATCH_DIR" '
         {
             # Replace CUDA_UUT
             if ($0 ~ /^CUDA_UUT=/) {
@@ -594,6 +655,68 @@ main() {
                 print "INJECT_BIT_FLIP_COUNT=" inject_bit_flip_count
                 next
             }
+            # Replace REGISTER_SAMPLING
+            if ($0 ~ /^REGISTER_SAMPLING=/) {
+                print "REGISTER_SAMPLING=" register_sampling
+                next
+            }
+            # Replace stopping rule settings
+            if ($0 ~ /^STOP_RULE=/) {
+                print "STOP_RULE=" stop_rule
+                next
+            }
+            if ($0 ~ /^STOP_CONFIDENCE=/) {
+                print "STOP_CONFIDENCE=" stop_confidence
+                next
+            }
+            if ($0 ~ /^STOP_MARGIN=/) {
+                print "STOP_MARGIN=" stop_margin " # max half-width of the SDC and DUE rate intervals"
+                next
+            }
+            if ($0 ~ /^STOP_P_MARGIN=/) {
+                print "STOP_P_MARGIN=" stop_p_margin " # max half-width of p as computed by accel.py (0: p is not checked)"
+                next
+            }
+            if ($0 ~ /^STOP_SCOPE=/) {
+                print "STOP_SCOPE=" stop_scope " # overall, register or kernel: also require the margin per register/kernel"
+                next
+            }
+            if ($0 ~ /^STOP_MIN_RUNS=/) {
+                print "STOP_MIN_RUNS=" stop_min_runs " # min classified injections per checked group"
+                next
+            }
+            if ($0 ~ /^STOP_CHECK_EVERY=/) {
+                print "STOP_CHECK_EVERY=" stop_check_every " # batches between two checks"
+                next
+            }
+            # Replace equivalence-class pruning switch
+            if ($0 ~ /^EQUIV_PRUNING=/) {
+                print "EQUIV_PRUNING=" equiv_pruning
+                next
+            }
+            # Replace the slot grant file of campaign_scheduler.py
+            if ($0 ~ /^SLOTS_FILE=/) {
+                print "SLOTS_FILE=\"" slots_file "\""
+                next
+            }
+            # Replace memory admission settings
+            if ($0 ~ /^MEM_BUDGET_MB=/) {
+                print "MEM_BUDGET_MB=" mem_budget_mb
+                next
+            }
+            if ($0 ~ /^RUN_RSS_MB=/) {
+                print "RUN_RSS_MB=" run_rss_mb
+                next
+            }
+            # Replace simulator output settings
+            if ($0 ~ /^LOG_DIGEST=/) {
+                print "LOG_DIGEST=" log_digest
+                next
+            }
+            if ($0 ~ /^SCRATCH_DIR=/) {
+                print "SCRATCH_DIR=\"" scratch_dir "\""
+                next
+            }
             # Keep other lines unchanged
             print $0
         }' "$campaign_file" > "${campaign_file}.tmp" && mv "${campaign_file}.tmp" "$campaign_file"
@@ -604,6 +727,9 @@ main() {
         PARALLEL_TASKS=$(( $(grep -c ^processor /proc/cpuinfo) - 1 ))
         # Actual total number of tasks
         TOTAL_TASKS="$RUN_PER_EPOCH"   # Total tasks defined earlier by RUN_PER_EPOCH
+        # Event stream written by campaign_exec.sh (TELEMETRY=1); used for exact progress when present
+        EVENTS_FILE="campaign_events.jsonl"
+        rm -f "$EVENTS_FILE"
 
         # Run in background; do not print logs to console
         bash campaign_exec.sh > inst_exec.log 2>&1 &
@@ -615,11 +741,20 @@ main() {
 
         # Monitor the log and update progress bar in real time
         tail -n0 -F inst_exec.log 2>/dev/null | while read -r line; do
+            # The campaign may end before TOTAL_TASKS (stopping rule): its summary starts with "Masked:"
+            if [[ "$line" =~ ^(Masked:|Probably\ ) ]]; then
+                echo
+                break
+            fi
             if [[ "$line" =~ ^\[Run[[:space:]]+([0-9]+)\] ]]; then
                 current_run=${BASH_REMATCH[1]}
                 if (( current_run != last_run )); then
                     last_run=$current_run
-                    done_tasks=$(( last_run * PARALLEL_TASKS ))
+                    if [[ -s "$EVENTS_FILE" ]]; then
+                        done_tasks=$(grep -c '"event":"run_finished"' "$EVENTS_FILE")
+                    else
+                        done_tasks=$(( last_run * PARALLEL_TASKS ))
+                    fi
                     (( done_tasks > TOTAL_TASKS )) && done_tasks=$TOTAL_TASKS
 
                     left=$(( TOTAL_TASKS - done_tasks ))
@@ -644,7 +779,23 @@ main() {
         # Wait for the main process to finish
         wait $CMD_PID
         echo "=== Fault injection for ${filename} finished ==="
+        if [[ -s "$EVENTS_FILE" ]]; then
+            python3 campaign_stats.py "$EVENTS_FILE"
+            cp "$EVENTS_FILE" "test_apps/${TEST_APP_NAME}/events_${filename_no_ext}.jsonl"
+        fi
+        if [[ "$EQUIV_PRUNING" -eq 1 ]]; then
+            python3 equivalence_classes.py
+        fi
         python3 analysis_fault.py -a $TEST_APP_NAME -t $filename_no_ext  -c $COMPONENT_SET -b $INJECT_BIT_FLIP_COUNT
+        if [[ -n "$RESULTS_DB" ]]; then
+            python3 results_db.py --db "$RESULTS_DB" ingest \
+                "test_result/test_result_${TEST_APP_NAME}_${filename_no_ext}_${COMPONENT_SET}_${INJECT_BIT_FLIP_COUNT}.csv" \
+                --app "$TEST_APP_NAME" --test "$filename_no_ext" --log inst_exec.log \
+                --app-info "test_apps/${TEST_APP_NAME}/app_info.txt" --domains kernel_domains.txt \
+                --text cycle_region.txt --index cycle_region.idx --registers register_used.txt \
+                --widths register_width.txt --invalid invalid_param_combos.txt --T "$GLOBAL_CYCLES" \
+                || echo "=== Warning: could not ingest ${filename} into ${RESULTS_DB} ==="
+        fi
     done
     rm -f $TEST_APP_NAME.1.$GPU_ARCH.ptx
     rm -f $TEST_APP_NAME.1.$GPU_ARCH.ptxas
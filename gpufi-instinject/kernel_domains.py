@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import argparse
+import os
+import re
+import subprocess
+import sys
+
+import danger_regions as dr
+
+# -----------------------------
+# Formats
+# -----------------------------
+#
+# The simulator prints a stats block after every kernel launch:
+#   kernel_name = _Z3fooPf
+#   kernel_launch_uid = 2
+#   gpu_sim_cycle = 1200          cycles of this launch
+#   gpu_tot_sim_cycle = 3723      global cycle count after it
+# Injection and danger-region cycles use the same global counter, which runs
+# from gpu_tot_sim_cycle - gpu_sim_cycle to gpu_tot_sim_cycle - 1 during the launch.
+#
+# Domain file (kernel_domains.txt), one launch per line:
+#   <launch_uid> <start> <end> <kernel_name>
+# The name is demangled like in the [REG_FI_WRITER] lines (c++filt -p), so it
+# matches the kernel column of test_result CSVs and the campaign ledger.
+
+RE_NAMES = re.compile(r"^kernel_name\s*=\s*(.*)$")
+RE_UIDS = re.compile(r"^kernel_launch_uid\s*=\s*(.*)$")
+RE_SIM_CYCLE = re.compile(r"^gpu_sim_cycle\s*=\s*(\d+)")
+RE_TOT_CYCLE = re.compile(r"^gpu_tot_sim_cycle\s*=\s*(\d+)")
+
+
+def demangle(names):
+    """{mangled: name as printed by the simulator's instruction dump (c++filt -p)}."""
+    names = sorted(set(names))
+    short = {}
+    try:
+        out = subprocess.run(
+            ["c++filt", "-p"], input="\n".join(names) + "\n", stdout=subprocess.PIPE, universal_newlines=True
+        ).stdout.splitlines()
+        if len(out) == len(names):
+            short = dict(zip(names, (line.strip() for line in out)))
+    except OSError:
+        pass
+    for name in names:
+        if name not in short:
+            # _Z13adamw_kernel2PfPKf... -> adamw_kernel2 (plain, non-nested names only)
+            m = re.match(r"_Z(\d+)", name)
+            short[name] = name[m.end():m.end() + int(m.group(1))] if m else name
+    return short
+
+
+def parse_launches(log_path: str):
+    """Return [(uid, name, start, end)] for every kernel launch of a simulator log."""
+    launches = []
+    seen = set()
+    names, uids, sim_cycles = [], [], None
+    with open(log_path, "r", encoding="utf-8", errors="ignore") as f:
+        for line in f:
+            m = RE_NAMES.match(line)
+            if m:
+                names, uids, sim_cycles = m.group(1).split(), [], None
+                continue
+            m = RE_UIDS.match(line)
+            if m:
+                uids = [int(u) for u in m.group(1).split() if u.isdigit()]
+                continue
+            m = RE_SIM_CYCLE.match(line)
+            if m and names:
+                sim_cycles = int(m.group(1))
+                continue
+            m = RE_TOT_CYCLE.match(line)
+            if m and names and sim_cycles:
+                end = int(m.group(1)) - 1
+                start = end - sim_cycles + 1
+                # concurrent kernels share one stats block and therefore one domain
+                for i, name in enumerate(names):
+                    uid = uids[i] if i < len(uids) else -1
+                    if (uid, name) not in seen:
+                        seen.add((uid, name))
+                        launches.append((uid, name, start, end))
+                names, uids, sim_cycles = [], [], None
+    short = demangle(name for _, name, _, _ in launches)
+    return [(uid, short[name], start, end) for uid, name, start, end in launches]
+
+
+def write_domains(launches, path: str):
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        for uid, name, start, end in launches:
+            f.write(f"{uid} {start} {end} {name}\n")
+    os.replace(tmp, path)
+
+
+def read_domains(path: str):
+    launches = []
+    if not path or not os.path.exists(path):
+        return launches
+    with open(path, "r", encoding="utf-8", errors="ignore") as f:
+        for line in f:
+            parts = line.rstrip("\n").split(" ", 3)
+            if len(parts) == 4:
+                try:
+                    launches.append((int(parts[0]), parts[3], int(parts[1]), int(parts[2])))
+                except ValueError:
+                    continue
+    return launches
+
+
+# -----------------------------
+# Per-kernel domains and danger regions
+# -----------------------------
+
+
+def kernel_intervals(launches, uids=None):
+    """{kernel_name: merged cycle intervals of its launches}, optionally only the given launch uids."""
+    domains = {}
+    for uid, name, start, end in launches:
+        if uids and uid not in uids:
+            continue
+        domains.setdefault(name, []).append((start, end))
+    return {name: dr.merge_intervals(ivals) for name, ivals in domains.items()}
+
+
+def intersect(a, b):
+    """Intersection of two sorted, disjoint lists of closed intervals."""
+    out = []
+    i = j = 0
+    while i < len(a) and j < len(b):
+        start = max(a[i][0], b[j][0])
+        end = min(a[i][1], b[j][1])
+        if start <= end:
+            out.append((start, end))
+        if a[i][1] < b[j][1]:
+            i += 1
+        else:
+            j += 1
+    return out
+
+
+def split_regions(regions, domains):
+    """{kernel: {reg: danger intervals inside the kernel's domain}} (registers without any omitted)."""
+    per_kernel = {}
+    for name, ivals in domains.items():
+        regs = {}
+        for reg, ranges in regions.items():
+            inside = intersect(ranges, ivals)
+            if inside:
+                regs[reg] = inside
+        per_kernel[name] = regs
+    return per_kernel
+
+
+# -----------------------------
+# CLI
+# -----------------------------
+
+
+def parse_uids(spec: str):
+    # same syntax as campaign_exec.sh kernel_n: 0 for all launches, 1:2 for launches 1 and 2
+    uids = {int(u) for u in spec.split(":") if u.strip().isdigit()}
+    return None if not uids or uids == {0} else uids
+
+
+def cmd_extract(args):
+    launches = parse_launches(args.log)
+    if not launches:
+        print(f"Error: no kernel launch statistics found in {args.log}", file=sys.stderr)
+        return 1
+    write_domains(launches, args.output)
+    for extra in args.copy_to:
+        write_domains(launches, extra)
+    domains = kernel_intervals(launches)
+    print(f"Extracted {len(launches)} kernel launches -> {args.output}")
+    for name, ivals in domains.items():
+        print(f"  {name}: T = {dr.interval_length(ivals)}")
+    return 0
+
+
+def cmd_cycles(args):
+    # range-encoded cycle domain (see danger_regions.read_cycle_domain), restricted to the launches' domains
+    domains = kernel_intervals(read_domains(args.domains), parse_uids(args.kernels))
+    merged = dr.merge_intervals([iv for ivals in domains.values() for iv in ivals])
+    if not merged and args.total > 0:
+        print(f"=== Warning: no kernel domains in {args.domains}, using cycles 0-{args.total - 1} ===")
+        merged = [(0, args.total - 1)]
+    if not merged:
+        print(f"Error: no kernel domains in {args.domains}", file=sys.stderr)
+        return 1
+    dr.write_cycle_domain(merged, args.output)
+    print(f"Wrote {dr.interval_length(merged)} cycles in {len(merged)} segments -> {args.output}")
+    return 0
+
+
+def cmd_report(args):
+    domains = kernel_intervals(read_domains(args.domains), parse_uids(args.kernels))
+    if not domains:
+        print(f"Error: no kernel domains in {args.domains}", file=sys.stderr)
+        return 1
+    per_kernel = split_regions(dr.load_regions(args.text, args.index), domains)
+    for name, ivals in domains.items():
+        regs = per_kernel[name]
+        danger = sum(dr.interval_length(v) for v in regs.values())
+        print(f"{name}: T = {dr.interval_length(ivals)}, danger cycles = {danger}, registers = {len(regs)}")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-kernel cycle domains from simulator kernel launch statistics.")
+    sub = parser.add_subparsers(dest="cmd")
+    sub.required = True  # the required= keyword needs Python 3.7
+
+    p = sub.add_parser("extract", help="Write the launch domains of a simulator log")
+    p.add_argument("log", help="Profiling log (tmp.out)")
+    p.add_argument("--output", "-o", default="kernel_domains.txt", help="Domain file")
+    p.add_argument(
+        "--copy-to", action="append", default=[], help="Also write the domain file here, e.g. ../accel/kernel_domains.txt"
+    )
+    p.set_defaults(func=cmd_extract)
+
+    p = sub.add_parser("cycles", help="Write the in-kernel cycle segments (cycles.txt)")
+    p.add_argument("--domains", default="kernel_domains.txt", help="Domain file")
+    p.add_argument("--kernels", default="0", help="Launch uids as in kernel_n (0: all)")
+    p.add_argument("--output", "-o", default="cycles.txt", help="Cycle domain file")
+    p.add_argument("--total", type=int, default=0, help="Without kernel domains, use cycles 0 to TOTAL-1")
+    p.set_defaults(func=cmd_cycles)
+
+    p = sub.add_parser("report", help="Print T and danger cycles per kernel")
+    p.add_argument("--domains", default="kernel_domains.txt", help="Domain file")
+    p.add_argument("--kernels", default="0", help="Launch uids as in kernel_n (0: all)")
+    p.add_argument("--text", default="cycle_region.txt", help="Text danger-region file")
+    p.add_argument("--index", default="cycle_region.idx", help="Binary danger-region index")
+    p.set_defaults(func=cmd_report)
+
+    args = parser.parse_args()
+    sys.exit(args.func(args))
+
+
+if __name__ == "__main__":
+    main()
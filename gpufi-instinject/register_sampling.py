@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import argparse
+import math
+import os
+import random
+import sys
+from collections import Counter
+
+import danger_regions as dr
+
+# -----------------------------
+# Allocation weights
+# -----------------------------
+#
+# accel.compute_p estimates p per register (stratum) as d_r * SDC_r / (T * N_r),
+# so any allocation with N_r > 0 keeps it unbiased; the allocation only changes
+# its variance. Registers without a danger region cannot produce an SDC inside
+# one and are never drawn by the weighted modes.
+#
+#   danger: N_r proportional to d_r
+#   neyman: N_r proportional to d_r * sqrt(p_r * (1 - p_r)), p_r from outcomes
+#           observed so far (Laplace-smoothed, so unseen registers get p_r = 0.5)
+
+MODES = ("uniform", "danger", "neyman")
+
+# bit width assumed for registers without a .reg declaration (campaign_exec.sh DATATYPE_SIZE)
+DEFAULT_WIDTH = 32
+
+
+def read_registers(path: str):
+    if not path or not os.path.exists(path):
+        return []
+    with open(path, "r", encoding="utf-8", errors="ignore") as f:
+        return [line.strip() for line in f if line.strip()]
+
+
+def read_widths(path: str):
+    """{reg: bits} from register_width.txt (extract_registers.py)."""
+    widths = {}
+    if not path or not os.path.exists(path):
+        return widths
+    with open(path, "r", encoding="utf-8", errors="ignore") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 2 and parts[1].isdigit():
+                widths[parts[0]] = int(parts[1])
+    return widths
+
+
+def register_width(reg: str, widths, default_width: int = DEFAULT_WIDTH):
+    """Declared width of reg (the narrowest of several "a:b" names), default_width if unknown."""
+    known = [widths[name] for name in reg.split(":") if name in widths]
+    return min(known) if known else default_width
+
+
+def flippable(regs, widths, bits: int = 1, default_width: int = DEFAULT_WIDTH):
+    """The registers of regs that can take bits distinct bit flips (a 1-bit predicate cannot take 2)."""
+    return [reg for reg in regs if register_width(reg, widths, default_width) >= bits]
+
+
+def read_state(path: str):
+    """
+    Read the allocation state file written by campaign_exec.sh:
+      S <reg>            one injection scheduled on <reg>
+      O <reg> <outcome>  one classified outcome (Masked / SDC / DUE / Unclassified)
+
+    Returns (scheduled Counter, {reg: Counter(outcome)}).
+    """
+    scheduled = Counter()
+    outcomes = {}
+    if not path or not os.path.exists(path):
+        return scheduled, outcomes
+    with open(path, "r", encoding="utf-8", errors="ignore") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) >= 2 and parts[0] == "S":
+                scheduled[parts[1]] += 1
+            elif len(parts) >= 3 and parts[0] == "O":
+                outcomes.setdefault(parts[1], Counter())[parts[2]] += 1
+    return scheduled, outcomes
+
+
+def allocation_weights(mode: str, danger_len, outcomes=None):
+    """Return {reg: weight} for the registers eligible under mode."""
+    weights = {}
+    for reg, d_r in danger_len.items():
+        if d_r <= 0:
+            continue
+        if mode == "danger":
+            weights[reg] = float(d_r)
+        elif mode == "neyman":
+            counts = (outcomes or {}).get(reg, Counter())
+            n = counts["Masked"] + counts["SDC"] + counts["DUE"]
+            p = (counts["SDC"] + 1.0) / (n + 2.0)
+            weights[reg] = d_r * math.sqrt(p * (1.0 - p))
+        else:
+            weights[reg] = 1.0
+    return weights
+
+
+def pick_register(weights, scheduled, min_per_reg: int = 1, rng=random):
+    """
+    Quota-based (systematic) draw: choose the register that is furthest below its
+    target share of the injections scheduled so far, breaking ties at random.
+    Every eligible register first gets min_per_reg injections so that N_r > 0.
+    """
+    total_w = sum(weights.values())
+    if total_w <= 0:
+        return None
+    pilot = [r for r in weights if scheduled.get(r, 0) < min_per_reg]
+    if pilot:
+        return rng.choice(pilot)
+    n_next = sum(scheduled.get(r, 0) for r in weights) + 1
+    best, best_deficit = [], None
+    for reg, w in weights.items():
+        deficit = w * n_next / total_w - scheduled.get(reg, 0)
+        if best_deficit is None or deficit > best_deficit + 1e-12:
+            best, best_deficit = [reg], deficit
+        elif abs(deficit - best_deficit) <= 1e-12:
+            best.append(reg)
+    return rng.choice(best)
+
+
+def plan(weights, budget: int, min_per_reg: int = 1):
+    """Integer allocation of budget injections: min_per_reg each, the rest proportional to weights."""
+    total_w = sum(weights.values())
+    if total_w <= 0 or budget <= 0:
+        return {}
+    base = min(min_per_reg, budget // len(weights))
+    spread = budget - base * len(weights)
+    raw = {r: base + spread * w / total_w for r, w in weights.items()}
+    alloc = {r: int(math.floor(v)) for r, v in raw.items()}
+    rest = budget - sum(alloc.values())
+    for r in sorted(raw, key=lambda k: raw[k] - alloc[k], reverse=True)[:rest]:
+        alloc[r] += 1
+    return alloc
+
+
+def eligible_danger_lengths(registers, regions, widths=None, bits: int = 1, default_width: int = DEFAULT_WIDTH):
+    """
+    d_r for registers in register_used.txt (all danger-region registers if the list is empty),
+    leaving out registers narrower than bits.
+    """
+    lengths = {reg: dr.interval_length(ivals) for reg, ivals in regions.items()}
+    if registers:
+        lengths = {reg: lengths.get(reg, 0) for reg in registers}
+    keep = flippable(lengths, widths or {}, bits, default_width)
+    return {reg: lengths[reg] for reg in keep}
+
+
+# -----------------------------
+# CLI
+# -----------------------------
+
+
+def cmd_pick(args):
+    widths = read_widths(args.widths)
+    registers = flippable(read_registers(args.registers), widths, args.bits, args.default_width)
+    if args.mode == "uniform":
+        print(random.choice(registers) if registers else "")
+        return 0
+    regions = dr.load_regions(args.text, args.index)
+    scheduled, outcomes = read_state(args.state)
+    lengths = eligible_danger_lengths(registers, regions, widths, args.bits, args.default_width)
+    weights = allocation_weights(args.mode, lengths, outcomes)
+    reg = pick_register(weights, scheduled, args.min_per_reg)
+    if reg is None:
+        # No danger regions known: behave like the uniform mode
+        reg = random.choice(registers) if registers else ""
+    print(reg)
+    return 0
+
+
+def cmd_plan(args):
+    registers = read_registers(args.registers)
+    widths = read_widths(args.widths)
+    regions = dr.load_regions(args.text, args.index)
+    _, outcomes = read_state(args.state)
+    lengths = eligible_danger_lengths(registers, regions, widths, args.bits, args.default_width)
+    weights = allocation_weights(args.mode, lengths, outcomes)
+    alloc = plan(weights, args.budget, args.min_per_reg)
+    skipped = sorted(r for r, d in lengths.items() if d <= 0)
+    print(f"Mode: {args.mode}, budget: {args.budget}, eligible registers: {len(weights)}")
+    for reg in sorted(alloc, key=dr.register_sort_key):
+        print(f"{reg}: d_r = {lengths[reg]:6d}, N_r = {alloc[reg]:5d}")
+    if skipped:
+        print(f"Registers without a danger region (never drawn): {len(skipped)}")
+    narrow = len(registers) - len(flippable(registers, widths, args.bits, args.default_width))
+    if narrow:
+        print(f"Registers narrower than {args.bits} bits (never drawn): {narrow}")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Danger-length-weighted register selection for campaign_exec.sh.")
+    sub = parser.add_subparsers(dest="cmd")
+    sub.required = True  # the required= keyword needs Python 3.7
+    for name, func, hlp in (
+        ("pick", cmd_pick, "Print the register for the next injection"),
+        ("plan", cmd_plan, "Print the allocation of a budget of injections"),
+    ):
+        p = sub.add_parser(name, help=hlp)
+        p.add_argument("--mode", choices=MODES, default="danger")
+        p.add_argument("--registers", default="register_used.txt", help="Candidate registers")
+        p.add_argument("--text", default="cycle_region.txt", help="Text danger-region file")
+        p.add_argument("--index", default="cycle_region.idx", help="Binary danger-region index")
+        p.add_argument("--state", default="reg_alloc.txt", help="Allocation state written by campaign_exec.sh")
+        p.add_argument("--widths", default="register_width.txt", help="Register widths (register_width.txt)")
+        p.add_argument("--bits", type=int, default=1, help="Bits flipped per injection; narrower registers are never drawn")
+        p.add_argument(
+            "--default-width", type=int, default=DEFAULT_WIDTH, help="Width of registers not in --widths (DATATYPE_SIZE)"
+        )
+        p.add_argument(
+            "--min-per-reg",
+            type=int,
+            default=1,
+            help="Pilot injections per eligible register before weighting (keeps every N_r > 0)",
+        )
+        if name == "plan":
+            p.add_argument("--budget", "-n", type=int, required=True, help="Total number of injections")
+        p.set_defaults(func=func)
+    args = parser.parse_args()
+    sys.exit(args.func(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,688 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import argparse
+import csv
+import os
+import re
+import sqlite3
+import sys
+import time
+
+import danger_regions as dr
+import kernel_domains as kd
+from analysis_fault import parse_log
+from register_sampling import read_registers
+
+# accel.py lives next to gpufi-instinject; its stratified estimator is the one reported for p
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "accel"))
+import accel  # noqa: E402
+
+# -----------------------------
+# Formats
+# -----------------------------
+#
+# One SQLite database (RESULTS_DB, default results.db) holds every ingested
+# campaign. A campaign is one test_result CSV, identified like its file name:
+#   test_result/test_result_<app>_<test>_<components>_<bitflip>.csv
+# Re-ingesting a campaign replaces it.
+#
+#   campaigns            app, test, components, bitflip, T, R, source files
+#   kernels              kernel launches (kernel_domains.txt, regs from app_info.txt)
+#   registers            candidate registers (register_used.txt / register_width.txt)
+#   danger_intervals     danger regions (cycle_region.txt / .idx)
+#   outcomes             one row per CSV row: kernel, inst_line, inst_text, outcome totals
+#   outcome_sources      per-source counts of a row (REG_*, invalid_*, ...)
+#   outcome_registers    the reg_names column of a row, one register per line
+#   injections           one row per injection of inst_exec.log, with its cycle and outcome
+#   injection_registers  the registers of an injection (reg_name=a:b)
+#   injection_effects    the instructions an injection reached ([*_FI_WRITER] / [*_FI_READER])
+#   invalid_combos       invalid_param_combos.txt
+#
+# The CSV rows are stored as write_csv wrote them (inst_line -1 for the
+# invalid_summary row), so "query inst" writes the same CSV and "query p" the
+# same p as accel.py without re-reading any file.
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS campaigns (
+    id INTEGER PRIMARY KEY,
+    app TEXT NOT NULL,
+    test TEXT NOT NULL,
+    components TEXT NOT NULL,
+    bitflip TEXT NOT NULL,
+    T INTEGER,
+    R INTEGER,
+    csv_path TEXT,
+    log_path TEXT,
+    ingested_at REAL,
+    UNIQUE (app, test, components, bitflip)
+);
+CREATE TABLE IF NOT EXISTS kernels (
+    campaign_id INTEGER NOT NULL,
+    launch_uid INTEGER,
+    name TEXT NOT NULL,
+    start_cycle INTEGER,
+    end_cycle INTEGER,
+    regs INTEGER
+);
+CREATE TABLE IF NOT EXISTS registers (
+    campaign_id INTEGER NOT NULL,
+    reg TEXT NOT NULL,
+    width INTEGER,
+    danger_cycles INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS danger_intervals (
+    campaign_id INTEGER NOT NULL,
+    reg TEXT NOT NULL,
+    start_cycle INTEGER NOT NULL,
+    end_cycle INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS outcomes (
+    id INTEGER PRIMARY KEY,
+    campaign_id INTEGER NOT NULL,
+    kernel TEXT NOT NULL,
+    inst_line INTEGER NOT NULL,
+    inst_text TEXT NOT NULL,
+    n_regs INTEGER NOT NULL,
+    masked INTEGER NOT NULL,
+    sdc INTEGER NOT NULL,
+    due INTEGER NOT NULL,
+    others INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS outcome_sources (
+    outcome_id INTEGER NOT NULL,
+    src TEXT NOT NULL,
+    masked INTEGER NOT NULL,
+    sdc INTEGER NOT NULL,
+    due INTEGER NOT NULL,
+    others INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS outcome_registers (
+    outcome_id INTEGER NOT NULL,
+    campaign_id INTEGER NOT NULL,
+    reg TEXT NOT NULL,
+    injections INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS injections (
+    id INTEGER PRIMARY KEY,
+    campaign_id INTEGER NOT NULL,
+    run INTEGER NOT NULL,
+    tmp_name TEXT NOT NULL,
+    occurrence INTEGER NOT NULL,
+    outcome TEXT NOT NULL,
+    pruned_of TEXT,
+    cycle INTEGER,
+    kernel_n TEXT,
+    thread TEXT,
+    warp TEXT,
+    block TEXT,
+    comp TEXT,
+    reg_names TEXT,
+    reg_bits TEXT,
+    params TEXT
+);
+CREATE TABLE IF NOT EXISTS injection_registers (
+    injection_id INTEGER NOT NULL,
+    campaign_id INTEGER NOT NULL,
+    reg TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS injection_effects (
+    injection_id INTEGER NOT NULL,
+    campaign_id INTEGER NOT NULL,
+    kernel TEXT NOT NULL,
+    inst_line INTEGER NOT NULL,
+    src TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS invalid_combos (
+    campaign_id INTEGER NOT NULL,
+    combo TEXT NOT NULL,
+    cycle INTEGER,
+    reg_names TEXT
+);
+CREATE INDEX IF NOT EXISTS campaigns_app ON campaigns (app);
+CREATE INDEX IF NOT EXISTS kernels_name ON kernels (campaign_id, name);
+CREATE INDEX IF NOT EXISTS kernels_cycle ON kernels (campaign_id, start_cycle, end_cycle);
+CREATE INDEX IF NOT EXISTS registers_reg ON registers (campaign_id, reg);
+CREATE INDEX IF NOT EXISTS danger_reg ON danger_intervals (campaign_id, reg);
+CREATE INDEX IF NOT EXISTS danger_cycle ON danger_intervals (campaign_id, start_cycle, end_cycle);
+CREATE INDEX IF NOT EXISTS outcomes_kernel ON outcomes (campaign_id, kernel, inst_line);
+CREATE INDEX IF NOT EXISTS outcome_sources_row ON outcome_sources (outcome_id);
+CREATE INDEX IF NOT EXISTS outcome_registers_row ON outcome_registers (outcome_id);
+CREATE INDEX IF NOT EXISTS outcome_registers_reg ON outcome_registers (campaign_id, reg);
+CREATE INDEX IF NOT EXISTS injections_cycle ON injections (campaign_id, cycle);
+CREATE INDEX IF NOT EXISTS injections_outcome ON injections (campaign_id, outcome);
+CREATE INDEX IF NOT EXISTS injection_registers_reg ON injection_registers (campaign_id, reg);
+CREATE INDEX IF NOT EXISTS injection_registers_row ON injection_registers (injection_id);
+CREATE INDEX IF NOT EXISTS injection_effects_line ON injection_effects (campaign_id, kernel, inst_line);
+CREATE INDEX IF NOT EXISTS injection_effects_row ON injection_effects (injection_id);
+CREATE INDEX IF NOT EXISTS invalid_combos_campaign ON invalid_combos (campaign_id);
+"""
+
+# tables cleared when a campaign is re-ingested, children before parents
+CHILD_TABLES = (
+    ("outcome_sources", "outcome_id IN (SELECT id FROM outcomes WHERE campaign_id = ?)"),
+    ("outcome_registers", "campaign_id = ?"),
+    ("outcomes", "campaign_id = ?"),
+    ("injection_registers", "campaign_id = ?"),
+    ("injection_effects", "campaign_id = ?"),
+    ("injections", "campaign_id = ?"),
+    ("kernels", "campaign_id = ?"),
+    ("registers", "campaign_id = ?"),
+    ("danger_intervals", "campaign_id = ?"),
+    ("invalid_combos", "campaign_id = ?"),
+)
+
+OUTCOMES = ("Masked", "SDC", "DUE", "Others")
+RE_CSV_NAME = re.compile(r"^test_result_(.+)_([^_]+)_([^_]+)\.csv$")
+RE_APP_CYCLES = re.compile(r"^CYCLES:\s*(\d+)")
+RE_APP_INVOCATION = re.compile(r"^-\s+id=(\d+)\s+name=(\S+)\s+regs=(\d+)")
+
+
+def connect(path: str):
+    # several campaigns (campaign_scheduler.py) may finish and ingest at the same time
+    conn = sqlite3.connect(path, timeout=60)
+    conn.executescript(SCHEMA)
+    return conn
+
+
+# -----------------------------
+# Source files
+# -----------------------------
+
+
+def parse_csv_name(path: str, app: str = ""):
+    """(app, test, components, bitflip) from test_result_<app>_<test>_<components>_<bitflip>.csv."""
+    m = RE_CSV_NAME.match(os.path.basename(path))
+    if not m:
+        return None
+    head, components, bitflip = m.groups()
+    if app and head.startswith(app + "_"):
+        return app, head[len(app) + 1:], components, bitflip
+    # without --app the application name is taken to end at the first "_"
+    app_name, sep, test = head.partition("_")
+    return (app_name, test, components, bitflip) if sep else None
+
+
+def read_csv_rows(path: str):
+    """[(kernel, inst_line, inst_text, {reg: n}, {src: (m, s, d, o)})] of a write_csv CSV."""
+    rows = []
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        reader = csv.DictReader(f)
+        srcs = [c[: -len("_Masked")] for c in reader.fieldnames or [] if c.endswith("_Masked")]
+        for row in reader:
+            regs = {}
+            for part in (row.get("reg_names") or "").split(","):
+                reg, sep, count = part.strip().rpartition(":")
+                if sep and reg and count.isdigit():
+                    regs[reg] = int(count)
+            counts = {}
+            for src in srcs:
+                counts[src] = tuple(int(row.get(f"{src}_{cat}") or 0) for cat in OUTCOMES)
+            inst_line = (row.get("inst_line") or "").strip()
+            rows.append((row["kernel"], int(inst_line) if inst_line else -1, row["inst_text"], regs, counts))
+    return rows
+
+
+def read_app_info(path: str):
+    """(CYCLES, {launch uid: regs}) from the metrics dump of the profiling run (app_info.txt)."""
+    cycles, regs = None, {}
+    if not path or not os.path.exists(path):
+        return cycles, regs
+    with open(path, "r", encoding="utf-8", errors="ignore") as f:
+        for line in f:
+            m = RE_APP_CYCLES.match(line)
+            if m:
+                cycles = int(m.group(1))
+                continue
+            m = RE_APP_INVOCATION.match(line)
+            if m:
+                regs[int(m.group(1))] = int(m.group(3))
+    return cycles, regs
+
+
+def read_widths(path: str):
+    widths = {}
+    if not path or not os.path.exists(path):
+        return widths
+    with open(path, "r", encoding="utf-8", errors="ignore") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 2 and parts[1].isdigit():
+                widths[parts[0]] = int(parts[1])
+    return widths
+
+
+def parse_params(combo: str):
+    """Split an [INJ_PARAMS] "k=v;k=v" line into a dict."""
+    fields = {}
+    for part in combo.split(";"):
+        name, sep, value = part.partition("=")
+        if sep:
+            fields[name.strip()] = value.strip()
+    return fields
+
+
+def to_int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+# -----------------------------
+# Ingestion
+# -----------------------------
+
+
+def ingest(conn, args, csv_path: str):
+    key = parse_csv_name(csv_path, args.app)
+    if key is None:
+        print(f"Warning: not a test_result CSV name, skipped: {csv_path}", file=sys.stderr)
+        return None
+    if args.test:
+        key = (key[0], args.test, key[2], key[3])
+    cycles, launch_regs = read_app_info(args.app_info)
+    T = args.T or cycles
+    registers = read_registers(args.registers)
+    R = args.R or len(registers) or None
+
+    cur = conn.cursor()
+    cur.execute(
+        "SELECT id FROM campaigns WHERE app = ? AND test = ? AND components = ? AND bitflip = ?", key
+    )
+    found = cur.fetchone()
+    if found:
+        cid = found[0]
+        for table, where in CHILD_TABLES:
+            cur.execute(f"DELETE FROM {table} WHERE {where}", (cid,))
+        cur.execute(
+            "UPDATE campaigns SET T = ?, R = ?, csv_path = ?, log_path = ?, ingested_at = ? WHERE id = ?",
+            (T, R, os.path.abspath(csv_path), args.log and os.path.abspath(args.log), time.time(), cid),
+        )
+    else:
+        cur.execute(
+            "INSERT INTO campaigns (app, test, components, bitflip, T, R, csv_path, log_path, ingested_at)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            key + (T, R, os.path.abspath(csv_path), args.log and os.path.abspath(args.log), time.time()),
+        )
+        cid = cur.lastrowid
+
+    # CSV rows
+    rows = read_csv_rows(csv_path)
+    for kernel, inst_line, inst_text, regs, counts in rows:
+        totals = [sum(c[i] for c in counts.values()) for i in range(len(OUTCOMES))]
+        cur.execute(
+            "INSERT INTO outcomes (campaign_id, kernel, inst_line, inst_text, n_regs, masked, sdc, due, others)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            [cid, kernel, inst_line, inst_text, len(regs)] + totals,
+        )
+        oid = cur.lastrowid
+        cur.executemany(
+            "INSERT INTO outcome_sources VALUES (?, ?, ?, ?, ?, ?)",
+            [(oid, src) + c for src, c in counts.items()],
+        )
+        cur.executemany(
+            "INSERT INTO outcome_registers VALUES (?, ?, ?, ?)",
+            [(oid, cid, reg, n) for reg, n in regs.items()],
+        )
+
+    # Kernel launches, registers and danger regions of the campaign's profiling run
+    launches = kd.read_domains(args.domains)
+    cur.executemany(
+        "INSERT INTO kernels VALUES (?, ?, ?, ?, ?, ?)",
+        [(cid, uid, name, start, end, launch_regs.get(uid)) for uid, name, start, end in launches],
+    )
+    regions = dr.load_regions(args.text, args.index)
+    cur.executemany(
+        "INSERT INTO danger_intervals VALUES (?, ?, ?, ?)",
+        [(cid, reg, start, end) for reg, ivals in regions.items() for start, end in ivals],
+    )
+    widths = read_widths(args.widths)
+    cur.executemany(
+        "INSERT INTO registers VALUES (?, ?, ?, ?)",
+        [(cid, reg, widths.get(reg), dr.interval_length(regions.get(reg, []))) for reg in registers],
+    )
+
+    # Individual injections
+    n_inj = 0
+    if args.log and os.path.exists(args.log):
+        effects_occ, results_occ, params_by_pair, pruned_occ = parse_log(args.log)
+        for (run_id, name, occ), outcome in sorted(results_occ.items()):
+            combo = params_by_pair.get((run_id, name), "")
+            params = parse_params(combo)
+            pruned = pruned_occ.get((run_id, name, occ))
+            reg_names = [r for r in params.get("reg_name", "").strip('"').split(":") if r]
+            cur.execute(
+                "INSERT INTO injections (campaign_id, run, tmp_name, occurrence, outcome, pruned_of, cycle,"
+                " kernel_n, thread, warp, block, comp, reg_names, reg_bits, params)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    cid, run_id, name, occ, outcome,
+                    f"r{pruned[0]}b{pruned[1][len('tmp.out'):]}" if pruned else None,
+                    to_int(params.get("cycle")),
+                    params.get("kernel"), params.get("thread"), params.get("warp"), params.get("block"),
+                    params.get("comp"), ":".join(reg_names), params.get("reg_bits"), combo,
+                ),
+            )
+            iid = cur.lastrowid
+            cur.executemany(
+                "INSERT INTO injection_registers VALUES (?, ?, ?)", [(iid, cid, reg) for reg in reg_names]
+            )
+            cur.executemany(
+                "INSERT INTO injection_effects VALUES (?, ?, ?, ?, ?)",
+                [
+                    (iid, cid, rec.get("kernel") or "unknown", rec.get("inst_line", -1), rec.get("src", "unknown"))
+                    for rec in effects_occ.get((run_id, name, occ), [])
+                ],
+            )
+            n_inj += 1
+
+    n_invalid = 0
+    if args.invalid and os.path.exists(args.invalid):
+        with open(args.invalid, "r", encoding="utf-8", errors="ignore") as f:
+            for line in f:
+                combo = line.strip()
+                if not combo:
+                    continue
+                params = parse_params(combo)
+                cur.execute(
+                    "INSERT INTO invalid_combos VALUES (?, ?, ?, ?)",
+                    (cid, combo, to_int(params.get("cycle")), params.get("reg_name")),
+                )
+                n_invalid += 1
+
+    conn.commit()
+    print(
+        f"Ingested {'/'.join(key)}: {len(rows)} CSV rows, {n_inj} injections, {len(launches)} kernel launches, "
+        f"{len(regions)} danger registers, {n_invalid} invalid combos"
+    )
+    return cid
+
+
+# -----------------------------
+# Queries
+# -----------------------------
+
+
+def find_campaigns(conn, app="", test="", components="", bitflip=""):
+    """[(id, app, test, components, bitflip, T, R)] matching the given fields (empty: any)."""
+    where, values = [], []
+    for column, value in (("app", app), ("test", test), ("components", components), ("bitflip", bitflip)):
+        if value:
+            where.append(f"{column} = ?")
+            values.append(value)
+    sql = "SELECT id, app, test, components, bitflip, T, R FROM campaigns"
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    return conn.execute(sql + " ORDER BY app, test, components, bitflip", values).fetchall()
+
+
+def instruction_rows(conn, campaign_ids, kernel=""):
+    """
+    The rows and columns write_csv produces, summed over the given campaigns:
+    returns (fieldnames, [row dict]).
+    """
+    marks = ",".join("?" * len(campaign_ids))
+    kernel_sql = " AND o.kernel = ?" if kernel else ""
+    values = list(campaign_ids) + ([kernel] if kernel else [])
+
+    counts = {}
+    srcs = set()
+    for k, line, text, src, m, s, d, o in conn.execute(
+        "SELECT o.kernel, o.inst_line, o.inst_text, s.src, SUM(s.masked), SUM(s.sdc), SUM(s.due), SUM(s.others)"
+        f" FROM outcomes o JOIN outcome_sources s ON s.outcome_id = o.id WHERE o.campaign_id IN ({marks}){kernel_sql}"
+        " GROUP BY o.kernel, o.inst_line, o.inst_text, s.src",
+        values,
+    ):
+        counts.setdefault((k, line, text), {})[src] = (m, s, d, o)
+        srcs.add(src)
+    regs = {}
+    for k, line, text, reg, n in conn.execute(
+        "SELECT o.kernel, o.inst_line, o.inst_text, r.reg, SUM(r.injections)"
+        f" FROM outcomes o JOIN outcome_registers r ON r.outcome_id = o.id WHERE o.campaign_id IN ({marks}){kernel_sql}"
+        " GROUP BY o.kernel, o.inst_line, o.inst_text, r.reg",
+        values,
+    ):
+        regs.setdefault((k, line, text), {})[reg] = n
+
+    src_columns = [f"{src}_{cat}" for src in sorted(srcs) for cat in OUTCOMES]
+    fieldnames = ["kernel", "inst_line", "inst_text", "reg_names"] + src_columns + list(OUTCOMES) + ["tot_inj"]
+    rows = []
+    for key in sorted(counts):
+        k, line, text = key
+        rn = sorted(regs.get(key, {}).items(), key=lambda x: (-x[1], x[0]))
+        row = {
+            "kernel": k,
+            "inst_line": "" if line < 0 else line,
+            "inst_text": text,
+            "reg_names": ",".join(f"{reg}:{n}" for reg, n in rn),
+        }
+        totals = [0] * len(OUTCOMES)
+        for src in sorted(srcs):
+            c = counts[key].get(src, (0, 0, 0, 0))
+            for i, cat in enumerate(OUTCOMES):
+                row[f"{src}_{cat}"] = c[i]
+                totals[i] += c[i]
+        for i, cat in enumerate(OUTCOMES):
+            row[cat] = totals[i]
+        row["tot_inj"] = sum(totals)
+        rows.append(row)
+    return fieldnames, rows
+
+
+def register_stats(conn, campaign_id, kernel=""):
+    """
+    {reg: {"N", "SDC"}} as accel.parse_csv builds it: only rows with a single
+    register count, with N from reg_names and SDC from the row's SDC column.
+    """
+    kernel_sql = " AND o.kernel = ?" if kernel else ""
+    stats = {}
+    for reg, n, sdc in conn.execute(
+        "SELECT r.reg, SUM(r.injections), SUM(o.sdc) FROM outcomes o JOIN outcome_registers r ON r.outcome_id = o.id"
+        f" WHERE o.campaign_id = ? AND o.n_regs = 1{kernel_sql} GROUP BY r.reg",
+        [campaign_id] + ([kernel] if kernel else []),
+    ):
+        stats[reg] = {"N": n, "SDC": sdc}
+    return stats
+
+
+def danger_intervals(conn, campaign_id):
+    regions = {}
+    for reg, start, end in conn.execute(
+        "SELECT reg, start_cycle, end_cycle FROM danger_intervals WHERE campaign_id = ? ORDER BY reg, start_cycle",
+        (campaign_id,),
+    ):
+        regions.setdefault(reg, []).append((start, end))
+    return regions
+
+
+def kernel_domain(conn, campaign_id, kernel):
+    ivals = conn.execute(
+        "SELECT start_cycle, end_cycle FROM kernels WHERE campaign_id = ? AND name = ?", (campaign_id, kernel)
+    ).fetchall()
+    return dr.merge_intervals(ivals)
+
+
+def estimate_p(conn, campaign_id, T, R, kernel=""):
+    """accel.stratified_estimate on the stored rows; with kernel, on its T_k and danger cycles (accel.report_per_kernel)."""
+    regions = danger_intervals(conn, campaign_id)
+    if kernel:
+        domain = kernel_domain(conn, campaign_id, kernel)
+        T = dr.interval_length(domain)
+        danger = {reg: accel.overlap_length(ivals, domain) for reg, ivals in regions.items()}
+        danger = {reg: d for reg, d in danger.items() if d > 0}
+    else:
+        danger = {reg: dr.interval_length(ivals) for reg, ivals in regions.items()}
+    est = accel.stratified_estimate(register_stats(conn, campaign_id, kernel), danger, T, R)
+    return T, est
+
+
+def injection_counts(conn, campaign_ids, reg="", kernel="", cycle_from=None, cycle_to=None):
+    """{outcome: count} of the individual injections matching a register, kernel launch and cycle range."""
+    marks = ",".join("?" * len(campaign_ids))
+    sql = f"SELECT i.outcome, COUNT(*) FROM injections i WHERE i.campaign_id IN ({marks})"
+    values = list(campaign_ids)
+    if reg:
+        sql += " AND i.id IN (SELECT injection_id FROM injection_registers WHERE campaign_id = i.campaign_id AND reg = ?)"
+        values.append(reg)
+    if kernel:
+        sql += (
+            " AND EXISTS (SELECT 1 FROM kernels k WHERE k.campaign_id = i.campaign_id AND k.name = ?"
+            " AND i.cycle BETWEEN k.start_cycle AND k.end_cycle)"
+        )
+        values.append(kernel)
+    if cycle_from is not None:
+        sql += " AND i.cycle >= ?"
+        values.append(cycle_from)
+    if cycle_to is not None:
+        sql += " AND i.cycle <= ?"
+        values.append(cycle_to)
+    return dict(conn.execute(sql + " GROUP BY i.outcome", values).fetchall())
+
+
+# -----------------------------
+# CLI
+# -----------------------------
+
+
+def cmd_ingest(args):
+    conn = connect(args.db)
+    ok = 0
+    for path in args.csv:
+        if not os.path.exists(path):
+            print(f"Warning: CSV not found: {path}", file=sys.stderr)
+            continue
+        ok += ingest(conn, args, path) is not None
+    conn.close()
+    return 0 if ok else 1
+
+
+def selected_campaigns(conn, args):
+    campaigns = find_campaigns(conn, args.app, args.test, args.components, args.bitflip)
+    if not campaigns:
+        print(f"Error: no matching campaigns in {args.db}", file=sys.stderr)
+    return campaigns
+
+
+def cmd_campaigns(args):
+    conn = connect(args.db)
+    for cid, app, test, components, bitflip, T, R in find_campaigns(conn, args.app, args.test, args.components, args.bitflip):
+        n_rows, n_inj = conn.execute(
+            "SELECT COALESCE(SUM(CASE WHEN kernel != 'invalid_summary' THEN 1 ELSE 0 END), 0),"
+            " COALESCE(SUM(masked + sdc + due + others), 0) FROM outcomes WHERE campaign_id = ?",
+            (cid,),
+        ).fetchone()
+        print(f"{app} test={test} components={components} bitflip={bitflip} T={T} R={R} rows={n_rows} injections={n_inj}")
+    return 0
+
+
+def cmd_inst(args):
+    conn = connect(args.db)
+    campaigns = selected_campaigns(conn, args)
+    if not campaigns:
+        return 1
+    fieldnames, rows = instruction_rows(conn, [c[0] for c in campaigns], args.kernel)
+    out = open(args.output, "w", newline="", encoding="utf-8") if args.output else sys.stdout
+    writer = csv.DictWriter(out, fieldnames=fieldnames)
+    writer.writeheader()
+    writer.writerows(rows)
+    if args.output:
+        out.close()
+    return 0
+
+
+def cmd_p(args):
+    conn = connect(args.db)
+    campaigns = selected_campaigns(conn, args)
+    if not campaigns:
+        return 1
+    for cid, app, test, components, bitflip, T, R in campaigns:
+        T = args.T or T
+        R = args.R or R
+        label = f"{app} test={test} components={components} bitflip={bitflip}"
+        if not T or not R:
+            print(f"{label}: T or R unknown, pass --T and --R", file=sys.stderr)
+            continue
+        T, est = estimate_p(conn, cid, T, R, args.kernel)
+        se = est["var"] ** 0.5
+        print(
+            f"{label}{' kernel=' + args.kernel if args.kernel else ''}: T = {T}, R = {R}, "
+            f"used_regs = {est['used_regs']}, p = {est['p']:.6e}, "
+            f"95% CI = [{max(est['p'] - accel.Z_95 * se, 0.0):.6e}, {est['p'] + accel.Z_95 * se:.6e}]"
+        )
+    return 0
+
+
+def cmd_injections(args):
+    conn = connect(args.db)
+    campaigns = selected_campaigns(conn, args)
+    if not campaigns:
+        return 1
+    counts = injection_counts(
+        conn, [c[0] for c in campaigns], args.reg, args.kernel, args.cycle_from, args.cycle_to
+    )
+    total = sum(counts.values())
+    parts = " ".join(f"{cat}={counts.get(cat, 0)}" for cat in OUTCOMES)
+    print(f"injections={total} {parts}")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SQLite warehouse of fault injection campaign results.")
+    parser.add_argument("--db", default="results.db", help="Results database")
+    sub = parser.add_subparsers(dest="cmd")
+    sub.required = True  # the required= keyword needs Python 3.7
+
+    p = sub.add_parser("ingest", help="Load test_result CSVs (and the campaign's files) into the database")
+    p.add_argument("csv", nargs="+", help="test_result_<app>_<test>_<components>_<bitflip>.csv")
+    p.add_argument("--app", default="", help="Application name (when it contains '_')")
+    p.add_argument("--test", default="", help="Test identifier (overrides the file name)")
+    p.add_argument("--log", default="", help="Campaign log (inst_exec.log) for the individual injections")
+    p.add_argument("--app-info", default="", help="Metrics of the profiling run (test_apps/<app>/app_info.txt)")
+    p.add_argument("--domains", default="", help="Kernel launch domains (kernel_domains.txt)")
+    p.add_argument("--text", default="", help="Text danger-region file (cycle_region.txt)")
+    p.add_argument("--index", default="", help="Binary danger-region index (cycle_region.idx)")
+    p.add_argument("--registers", default="", help="Candidate registers (register_used.txt)")
+    p.add_argument("--widths", default="", help="Register widths (register_width.txt)")
+    p.add_argument("--invalid", default="", help="Invalid parameter combos (invalid_param_combos.txt)")
+    p.add_argument("--T", type=int, default=0, help="Total cycles (default: CYCLES of app_info.txt)")
+    p.add_argument("--R", type=int, default=0, help="Total register count (default: registers in --registers)")
+    p.set_defaults(func=cmd_ingest)
+
+    def add_filters(p):
+        p.add_argument("--app", default="", help="Application")
+        p.add_argument("--test", default="", help="Test identifier")
+        p.add_argument("--components", default="", help="Component set")
+        p.add_argument("--bitflip", default="", help="Bit flip count")
+
+    p = sub.add_parser("campaigns", help="List the ingested campaigns")
+    add_filters(p)
+    p.set_defaults(func=cmd_campaigns)
+
+    p = sub.add_parser("inst", help="Per-instruction outcomes, as write_csv (summed over matching campaigns)")
+    add_filters(p)
+    p.add_argument("--kernel", default="", help="Only this kernel")
+    p.add_argument("--output", "-o", default="", help="CSV file (default: stdout)")
+    p.set_defaults(func=cmd_inst)
+
+    p = sub.add_parser("p", help="p and its 95%% CI per campaign, as accel.py")
+    add_filters(p)
+    p.add_argument("--kernel", default="", help="Per-kernel p on the kernel's cycle domain")
+    p.add_argument("--T", type=float, default=0.0, help="Total cycles (default: stored T)")
+    p.add_argument("--R", type=float, default=0.0, help="Total register count (default: stored R)")
+    p.set_defaults(func=cmd_p)
+
+    p = sub.add_parser("injections", help="Outcome counts of individual injections")
+    add_filters(p)
+    p.add_argument("--reg", default="", help="Injected register")
+    p.add_argument("--kernel", default="", help="Injection cycle inside a launch of this kernel")
+    p.add_argument("--cycle-from", type=int, default=None, help="First injection cycle")
+    p.add_argument("--cycle-to", type=int, default=None, help="Last injection cycle")
+    p.set_defaults(func=cmd_injections)
+
+    args = parser.parse_args()
+    sys.exit(args.func(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -624,6 +624,19 @@ class ptx_thread_info {
                                   const symbol *primary_symbol,
                                   size_t alias_count = 0);
 
+  // Def-use window of reg at the current cycle: cycle of the write that produced
+  // the live value and of its latest access (that write or the latest read).
+  // Injections with the same window, thread and bits are equivalent.
+  bool get_reg_access_window(const symbol *reg, unsigned long long &def_cycle,
+                             unsigned long long &last_access_cycle) const {
+    std::map<const symbol *, reg_danger_region_state>::const_iterator it =
+        m_reg_danger_regions.find(reg);
+    if (it == m_reg_danger_regions.end() || !it->second.active) return false;
+    def_cycle = it->second.start_cycle;
+    last_access_cycle = it->second.last_read_cycle;
+    return true;
+  }
+
   // Query last writer for a physical register slot
   reg_write_info get_last_phys_writer(ptx_reg_t *phys) const {
     std::map<ptx_reg_t *, reg_write_info>::const_iterator it =
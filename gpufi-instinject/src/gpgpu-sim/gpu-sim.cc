@@ -576,6 +576,8 @@ void gpgpu_sim_config::reg_options(option_parser_t opp) {
                          "Optional: specify PTX virtual register name(s) to inject (colon-delimited). Overrides -register_rand_n when set.", "");
   option_parser_register(opp, "-reg_bitflip_rand_n", OPT_CSTR, &reg_bitflip_rand_n,
                          "TODO", "0");
+  option_parser_register(opp, "-fi_equiv_classes", OPT_CSTR, &fi_equiv_classes,
+                         "Optional: file of simulated register injection equivalence classes. An injection whose class is listed stops the simulation.", "");
   option_parser_register(opp, "-per_warp", OPT_BOOL, &per_warp,
                          "TODO", "0");
   option_parser_register(opp, "-kernel_n", OPT_CSTR, &kernel_n,
@@ -1940,8 +1942,50 @@ tr1_hash_map<unsigned, std::vector<unsigned long long>> kernel_start_end_cycle;
 std::map<char *, unsigned, cmp_str> max_active_regs;
 std::map<char *, std::set<unsigned>, cmp_str> shaders_used;
 unsigned active_threads_sum;
-unsigned cycles_txt_lines;
-std::vector<unsigned> cycles_txt;
+unsigned long long cycles_txt_lines;
+// cycles.txt as sorted, merged [start, end] segments
+std::vector<std::pair<unsigned long long, unsigned long long>> cycles_txt;
+
+// One "start-end" segment per line; a legacy line with a single cycle is a one-cycle segment.
+void read_cycle_domain(const char *path) {
+  cycles_txt.clear();
+  cycles_txt_lines = 0;
+  FILE *file = fopen(path, "r");
+  if (file == NULL) {
+    printf("GPGPU-Sim: cannot open %s\n", path);
+    return;
+  }
+  std::vector<std::pair<unsigned long long, unsigned long long>> segments;
+  char line[256];
+  while (fgets(line, sizeof(line), file) != NULL) {
+    unsigned long long start, end;
+    int n = sscanf(line, " %llu - %llu", &start, &end);
+    if (n < 1) continue;
+    if (n == 1) end = start;
+    if (end < start) std::swap(start, end);
+    segments.push_back(std::make_pair(start, end));
+  }
+  fclose(file);
+  std::sort(segments.begin(), segments.end());
+  for (size_t i = 0; i < segments.size(); i++) {
+    if (!cycles_txt.empty() && segments[i].first <= cycles_txt.back().second + 1) {
+      cycles_txt.back().second = std::max(cycles_txt.back().second, segments[i].second);
+    } else {
+      cycles_txt.push_back(segments[i]);
+    }
+  }
+  for (size_t i = 0; i < cycles_txt.size(); i++) {
+    cycles_txt_lines += cycles_txt[i].second - cycles_txt[i].first + 1;
+  }
+}
+
+bool in_cycle_domain(unsigned long long cycle) {
+  // last segment starting at or before cycle
+  std::vector<std::pair<unsigned long long, unsigned long long>>::const_iterator it =
+      std::upper_bound(cycles_txt.begin(), cycles_txt.end(),
+                       std::make_pair(cycle, ~0ULL));
+  return it != cycles_txt.begin() && cycle <= (it - 1)->second;
+}
 
 
 void find_active_kernels_warps(tr1_hash_map<unsigned, std::vector<std::vector<ptx_thread_info*>>> &active_threads_map,
@@ -2035,7 +2079,39 @@ void find_active_shared_memories(std::vector<memory_space*> &shared_memories, tr
   }
 }
 
-void bitflip_n_nregs(std::vector<ptx_thread_info*> &threads_vector, char *register_rand_n, char *reg_bitflip_rand_n, const char *register_name) {
+// Equivalence class of a register injection: same thread, same live value
+// (def cycle) and no access between the injections (last access cycle), same
+// bits. Empty if the register holds no written value yet.
+std::string fi_class_key(ptx_thread_info *thread, const symbol *reg, const std::vector<unsigned> &bits) {
+  unsigned long long def_cycle, last_access_cycle;
+  if (!thread->get_reg_access_window(reg, def_cycle, last_access_cycle)) return "";
+  std::vector<unsigned> sorted_bits(bits);
+  std::sort(sorted_bits.begin(), sorted_bits.end());
+  std::ostringstream key;
+  key << "tid=" << thread->get_uid() << ";reg=" << reg->name() << ";def=" << def_cycle
+      << ";use=" << last_access_cycle << ";bits=";
+  for (size_t i = 0; i < sorted_bits.size(); ++i) {
+    key << (i ? ":" : "") << sorted_bits[i];
+  }
+  return key.str();
+}
+
+// True if key is the first field of a line of the class file
+bool fi_class_simulated(const char *class_file, const std::string &key) {
+  if (class_file == NULL || class_file[0] == '\0') return false;
+  FILE *fp = fopen(class_file, "r");
+  if (fp == NULL) return false;
+  char line[1024];
+  bool found = false;
+  while (!found && fgets(line, sizeof(line), fp)) {
+    found = strncmp(line, key.c_str(), key.size()) == 0 &&
+            (line[key.size()] == ' ' || line[key.size()] == '\n' || line[key.size()] == '\0');
+  }
+  fclose(fp);
+  return found;
+}
+
+void bitflip_n_nregs(std::vector<ptx_thread_info*> &threads_vector, char *register_rand_n, char *reg_bitflip_rand_n, const char *register_name, std::vector<std::string> &class_keys) {
   std::vector<unsigned> reg_bitflip_vector, register_rand_n_vector;
   read_colon_option(reg_bitflip_vector, reg_bitflip_rand_n);
   read_colon_option(register_rand_n_vector, register_rand_n);
@@ -2110,6 +2186,8 @@ void bitflip_n_nregs(std::vector<ptx_thread_info*> &threads_vector, char *regist
         ptx_thread_info::reg_write_info lastw_phys = (*threads_it)->get_last_phys_writer(phys_slot);
         (*threads_it)->register_physreg_injection(phys_slot, flipped_bits, cyc, pc,
                                                   lastw_phys, reg_symbols[chosen], alias_count);
+        // aliased slots may be read through another symbol: never treat them as equivalent
+        class_keys.push_back(alias_count > 1 ? std::string() : fi_class_key(*threads_it, reg_symbols[chosen], flipped_bits));
       }
     }
     // If selection by name produced targets, inject each
@@ -2131,6 +2209,8 @@ void bitflip_n_nregs(std::vector<ptx_thread_info*> &threads_vector, char *regist
         ptx_thread_info::reg_write_info lastw_phys = (*threads_it)->get_last_phys_writer(phys_slot);
         (*threads_it)->register_physreg_injection(phys_slot, flipped_bits, cyc, pc,
                                                   lastw_phys, reg_symbols[chosen], alias_count);
+        // aliased slots may be read through another symbol: never treat them as equivalent
+        class_keys.push_back(alias_count > 1 ? std::string() : fi_class_key(*threads_it, reg_symbols[chosen], flipped_bits));
       }
     }
 //    (*threads_it)->dump_regs(stdout);
@@ -2477,14 +2557,7 @@ void gpgpu_sim::cycle() {
 
       if (m_config.profile == 2) {
         active_threads_sum = 0;
-        FILE *file = fopen("./cycles.txt", "r");
-        cycles_txt_lines = 0;
-        int num;
-        while (fscanf(file, "%d", &num) > 0) {
-          cycles_txt_lines++;
-          cycles_txt.push_back(num);
-        }
-        fclose(file);
+        read_cycle_domain("./cycles.txt");
       }
     }
 
@@ -2496,7 +2569,7 @@ void gpgpu_sim::cycle() {
 
       find_active_threads(active_threads, active_kernels_warps, kernel_vector);
 
-      if (std::find(cycles_txt.begin(), cycles_txt.end(), current_cycle) != cycles_txt.end()) {
+      if (in_cycle_domain(current_cycle)) {
         active_threads_sum += active_threads.size();
       }
 
@@ -2612,7 +2685,18 @@ void gpgpu_sim::cycle() {
         }
 
         if (register_file) {
-          bitflip_n_nregs(threads_bitflip, m_config.register_rand_n, m_config.reg_bitflip_rand_n, m_config.register_name);
+          std::vector<std::string> class_keys;
+          bitflip_n_nregs(threads_bitflip, m_config.register_rand_n, m_config.reg_bitflip_rand_n, m_config.register_name, class_keys);
+          // Equivalence-class pruning: only single-register, register-file-only injections
+          bool reg_only = !local_memory && !shared_memory && !l1d_cache && !l1c_cache && !l1t_cache && !l2_cache_comp;
+          if (reg_only && class_keys.size() == 1 && !class_keys[0].empty()) {
+            printf("[REG_FI_CLASS] key=%s\n", class_keys[0].c_str());
+            if (fi_class_simulated(m_config.fi_equiv_classes, class_keys[0])) {
+              printf("[REG_FI_CLASS] pruned: equivalent injection already simulated (%s)\n", m_config.fi_equiv_classes);
+              fflush(stdout);
+              exit(0);
+            }
+          }
         }
         if (local_memory) {
           bitflip_n_local_mem(threads_bitflip, m_config.local_mem_bitflip_rand_n);
@@ -2695,7 +2779,7 @@ void gpgpu_sim::cycle() {
     if (current_cycle == m_config.last_cycle-1) {
       if (m_config.profile == 2) {
         if (cycles_txt_lines > 0) {
-          printf("Mean active threads = %d\n", active_threads_sum/cycles_txt_lines);
+          printf("Mean active threads = %llu\n", active_threads_sum/cycles_txt_lines);
         }
       } else if (m_config.profile == 1) {
         for(std::map<char *, unsigned>::iterator itREG = max_active_regs.begin(); itREG != max_active_regs.end(); ++itREG) {
@@ -406,6 +406,10 @@ class gpgpu_sim_config : public power_config,
   // When set (non-empty), overrides register_rand_n selection logic
   char *register_name;
   char *reg_bitflip_rand_n;
+  // Optional: file of already simulated equivalence classes (see
+  // equivalence_classes.py); a register injection whose class is listed ends
+  // the simulation right after the flip
+  char *fi_equiv_classes;
   bool per_warp;
   char *kernel_n;
   char *local_mem_bitflip_rand_n;
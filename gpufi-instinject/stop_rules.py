@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import argparse
+import math
+import os
+import sys
+from collections import Counter, defaultdict
+
+import danger_regions as dr
+from register_sampling import DEFAULT_WIDTH, flippable, read_registers, read_widths
+
+# accel.py lives next to gpufi-instinject; its stratified estimator is the one reported for p
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "accel"))
+import accel  # noqa: E402
+
+# -----------------------------
+# Confidence intervals
+# -----------------------------
+
+CLASSIFIED = ("Masked", "SDC", "DUE")
+
+
+def normal_quantile(confidence: float) -> float:
+    """Two-sided normal quantile z with P(|Z| <= z) = confidence (bisection on erf)."""
+    lo, hi = 0.0, 10.0
+    for _ in range(100):
+        mid = (lo + hi) / 2.0
+        if math.erf(mid / math.sqrt(2.0)) < confidence:
+            lo = mid
+        else:
+            hi = mid
+    return (lo + hi) / 2.0
+
+
+def wilson_interval(k: int, n: int, z: float):
+    """Wilson score interval for k successes out of n; returns (low, high)."""
+    if n <= 0:
+        return 0.0, 1.0
+    phat = k / n
+    denom = 1.0 + z * z / n
+    center = (phat + z * z / (2.0 * n)) / denom
+    half = z * math.sqrt(phat * (1.0 - phat) / n + z * z / (4.0 * n * n)) / denom
+    return max(center - half, 0.0), min(center + half, 1.0)
+
+
+# -----------------------------
+# Ledger parsing
+# -----------------------------
+
+
+def read_outcomes(path: str):
+    """
+    Read the "O <reg> <outcome> [kernel]" lines of the campaign ledger written by
+    campaign_exec.sh (REG_ALLOC_FILE); returns a list of (reg, outcome, kernel).
+    """
+    rows = []
+    if not path or not os.path.exists(path):
+        return rows
+    with open(path, "r", encoding="utf-8", errors="ignore") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) >= 3 and parts[0] == "O" and parts[2] in CLASSIFIED:
+                kernel = parts[3] if len(parts) >= 4 else "-"
+                rows.append((parts[1], parts[2], kernel))
+    return rows
+
+
+# -----------------------------
+# Stopping decision
+# -----------------------------
+
+
+def evaluate(rows, args, regions=None):
+    """
+    Return (stop, report_lines). Stop only when every checked group has at least
+    --min-runs classified injections and every interval half-width is within its margin.
+    """
+    z = normal_quantile(args.confidence)
+
+    def check_rates(label, counts):
+        n = sum(counts[c] for c in CLASSIFIED)
+        met = n >= args.min_runs
+        parts = []
+        for cat in ("SDC", "DUE"):
+            lo, hi = wilson_interval(counts[cat], n, z)
+            half = (hi - lo) / 2.0
+            parts.append(f"{cat}={counts[cat] / n if n else 0.0:.4f}±{half:.4f}")
+            met = met and half <= args.margin
+        return met, f"{label}: n={n} " + " ".join(parts)
+
+    ok, line = check_rates("overall", Counter(outcome for _, outcome, _ in rows))
+    report = [line]
+
+    if args.scope in ("register", "kernel"):
+        groups = defaultdict(Counter)
+        for reg, outcome, kernel in rows:
+            groups[reg if args.scope == "register" else kernel][outcome] += 1
+        short = []
+        for key in sorted(groups):
+            met, line = check_rates(f"{args.scope} {key}", groups[key])
+            if not met:
+                short.append(line)
+        ok = ok and not short
+        report.extend(short[: args.report_groups])
+        report.append(f"{args.scope} groups within margin: {len(groups) - len(short)}/{len(groups)}")
+
+    if args.p_margin > 0 and regions is not None:
+        reg_stats = {}
+        for reg, outcome, _ in rows:
+            st = reg_stats.setdefault(reg, {"N": 0, "SDC": 0})
+            st["N"] += 1
+            st["SDC"] += outcome == "SDC"
+        danger_stats = {reg: dr.interval_length(ivals) for reg, ivals in regions.items()}
+        est = accel.stratified_estimate(reg_stats, danger_stats, args.T, args.R, smoothing=1.0)
+        half = z * math.sqrt(est["var"])
+        report.append(
+            f"p={est['p']:.6e}±{half:.6e} (registers with injections {est['used_regs']}/{len(danger_stats)})"
+        )
+        if half > args.p_margin or est["missing"]:
+            ok = False
+
+    return ok, report
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Sequential stopping rule for campaign_exec.sh: exit 0 once the requested precision is reached, 1 otherwise."
+    )
+    parser.add_argument("--state", default="reg_alloc.txt", help="Campaign ledger written by campaign_exec.sh")
+    parser.add_argument("--confidence", type=float, default=0.95, help="Confidence level of the intervals")
+    parser.add_argument("--margin", type=float, default=0.01, help="Max half-width of the SDC and DUE rate intervals")
+    parser.add_argument("--min-runs", type=int, default=100, help="Min classified injections per checked group")
+    parser.add_argument(
+        "--scope",
+        choices=("overall", "register", "kernel"),
+        default="overall",
+        help="Also require the margin per register or per kernel",
+    )
+    parser.add_argument("--p-margin", type=float, default=0.0, help="Max half-width of p (0: do not check p)")
+    parser.add_argument("--T", type=float, default=0.0, help="Total cycles (for p)")
+    parser.add_argument("--R", type=float, default=0.0, help="Total register count (for p)")
+    parser.add_argument("--text", default="cycle_region.txt", help="Text danger-region file (for p)")
+    parser.add_argument("--index", default="cycle_region.idx", help="Binary danger-region index (for p)")
+    parser.add_argument("--registers", default="register_used.txt", help="Candidate registers (for p)")
+    parser.add_argument("--widths", default="register_width.txt", help="Register widths (for p)")
+    parser.add_argument("--bits", type=int, default=1, help="Bits flipped per injection (for p)")
+    parser.add_argument(
+        "--default-width", type=int, default=DEFAULT_WIDTH, help="Width of registers not in --widths (for p)"
+    )
+    parser.add_argument("--report-groups", type=int, default=5, help="Per-group lines to print")
+    args = parser.parse_args()
+
+    rows = read_outcomes(args.state)
+    regions = None
+    if args.p_margin > 0:
+        if args.T <= 0 or args.R <= 0:
+            print("Error: --p-margin needs --T and --R", file=sys.stderr)
+            sys.exit(2)
+        regions = dr.load_regions(args.text, args.index)
+        registers = set(read_registers(args.registers))
+        if registers:
+            regions = {reg: ivals for reg, ivals in regions.items() if reg in registers}
+        # registers too narrow for the flip count are never drawn, so they are not strata of p
+        keep = flippable(regions, read_widths(args.widths), args.bits, args.default_width)
+        regions = {reg: regions[reg] for reg in keep}
+
+    stop, report = evaluate(rows, args, regions)
+    for line in report:
+        print(f"[STOP_RULE] {line}")
+    print(f"[STOP_RULE] decision: {'stop' if stop else 'continue'}")
+    sys.exit(0 if stop else 1)
+
+
+if __name__ == "__main__":
+    main()